@@ -1,9 +1,12 @@
 """API routes for graph and problem read endpoints."""
 
+import base64
+import hashlib
 import json
 import logging
+import os
 import re
-from dataclasses import dataclass
+import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, List
@@ -20,7 +23,8 @@ from fastapi import (
     Request,
     UploadFile,
 )
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -28,13 +32,17 @@ from .auth import (
     create_access_token,
     create_refresh_token,
     decode_token,
+    get_access_token_cache,
     get_current_user,
     TokenData,
+    get_password_hasher,
     hash_password,
     hash_token,
+    password_needs_rehash,
     require_admin,
     verify_password,
 )
+from .blob_store import blob_path, store_staged
 from .db import (
     check_homework_submission_exists,
     create_homework_assignment,
@@ -43,6 +51,12 @@ from .db import (
     create_praise_sticker,
     delete_homework_assignment,
     fetch_latest_graph,
+    fetch_latest_graph_snapshot,
+    get_connection_pool_stats,
+    get_user_cache,
+    get_request_connection,
+    record_study_submission,
+    STUDY_WRONG_WINDOW_DAYS,
     fetch_problems,
     get_praise_sticker_summary,
     get_homework_assignment,
@@ -67,6 +81,7 @@ from .db import (
     list_users,
     revoke_all_refresh_tokens,
     revoke_refresh_token,
+    rotate_refresh_token,
     save_homework_submission_file,
     store_refresh_token,
     update_homework_assignment,
@@ -86,8 +101,24 @@ from .db import (
     get_database_path,
     get_connection,
 )
-from .email_service import send_homework_notification
+from .downloads import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    file_etag,
+    file_response,
+    iter_zip,
+    not_modified,
+)
+from .graph_adjacency import get_graph_adjacency_stats, get_published_graph_adjacency
+from .graph_cache import GraphSnapshot, get_graph_cache_stats
 from .graph_storage import get_graph_storage_backend, prepare_graph_storage
+from .image_variants import (
+    REQUEST_WAIT_SECONDS,
+    VARIANT_CONTENT_TYPE,
+    VARIANTS,
+    get_variant,
+    schedule_variants,
+)
 from .models import (
     AdminStudentListResponse,
     AdminStudentFeaturesUpdateRequest,
@@ -147,6 +178,9 @@ from .models import (
     StudyResponseInput,
     DiagnosisRequest,
 )
+from .notification_outbox import wake_notification_sender
+from .request_metrics import get_request_metrics
+from .uploads import StagedUpload, UploadRejected, get_staging_dir, stage_upload
 
 logger = logging.getLogger(__name__)
 
@@ -385,6 +419,13 @@ def register_user(
     )
 
 
+def _rehash_password(user_id: str, password: str) -> None:
+    try:
+        update_user_password(user_id, hash_password(password))
+    except Exception as exc:  # the old hash still works; retry on next login
+        logger.warning("Failed to rehash password for user %s: %s", user_id, exc)
+
+
 @router.post(
     "/auth/login",
     response_model=AuthTokenResponse,
@@ -393,6 +434,7 @@ def register_user(
 @limiter.limit("10/minute")
 def login_user(
     request: Request,
+    background_tasks: BackgroundTasks,
     data: AuthLoginRequest = Body(...),
 ) -> AuthTokenResponse | JSONResponse:
     username = data.username.strip()
@@ -431,6 +473,9 @@ def login_user(
         )
 
     update_last_login(user["id"])
+    if password_needs_rehash(user["password_hash"]):
+        # Move the account to the configured bcrypt cost after responding.
+        background_tasks.add_task(_rehash_password, user["id"], password)
     access_token, _ = create_access_token(
         user_id=user["id"], username=user["username"], role=user["role"]
     )
@@ -476,7 +521,7 @@ def refresh_token(
     payload = decode_token(refresh, expected_type="refresh")
     token_hash_value = hash_token(refresh)
     record = get_refresh_token_by_hash(token_hash_value)
-    if not record or record.get("revoked_at") is not None:
+    if not record:
         return JSONResponse(
             status_code=401,
             content={
@@ -509,19 +554,36 @@ def refresh_token(
             },
         )
 
-    revoke_refresh_token(token_hash_value)
-    access_token, _ = create_access_token(
-        user_id=user["id"], username=user["username"], role=user["role"]
-    )
     new_refresh_token, new_refresh_payload = create_refresh_token(
         user_id=user["id"], username=user["username"], role=user["role"]
     )
-    store_refresh_token(
-        user_id=user["id"],
-        token_hash=hash_token(new_refresh_token),
-        expires_at=datetime.fromtimestamp(
-            new_refresh_payload["exp"], tz=timezone.utc
-        ).isoformat(),
+    try:
+        rotated = rotate_refresh_token(
+            token_hash=token_hash_value,
+            new_token_hash=hash_token(new_refresh_token),
+            expires_at=datetime.fromtimestamp(
+                new_refresh_payload["exp"], tz=timezone.utc
+            ).isoformat(),
+        )
+    except ValueError:
+        logger.warning(
+            "Refresh token reuse detected for user %s; revoked family %s",
+            user["id"],
+            record.get("family_id"),
+        )
+        rotated = None
+    if rotated is None:
+        return JSONResponse(
+            status_code=401,
+            content={
+                "error": {
+                    "code": "INVALID_REFRESH",
+                    "message": "리프레시 토큰이 유효하지 않습니다.",
+                }
+            },
+        )
+    access_token, _ = create_access_token(
+        user_id=user["id"], username=user["username"], role=user["role"]
     )
     return AuthTokenResponse(
         accessToken=access_token,
@@ -733,6 +795,25 @@ def list_students_admin(user=Depends(require_admin)) -> AdminStudentListResponse
     return AdminStudentListResponse(students=students)
 
 
+@router.get("/admin/db/pool", responses={403: {"model": ErrorResponse}})
+def get_db_pool_stats(_admin=Depends(require_admin)) -> dict:
+    return {"pools": get_connection_pool_stats()}
+
+
+@router.get("/admin/metrics", responses={403: {"model": ErrorResponse}})
+def get_admin_metrics(request: Request, _admin=Depends(require_admin)) -> dict:
+    return {
+        **get_request_metrics().snapshot(),
+        "startupTimingsMs": getattr(request.app.state, "startup_timings_ms", {}),
+        "connectionPools": get_connection_pool_stats(),
+        "graphCache": get_graph_cache_stats(),
+        "graphAdjacency": get_graph_adjacency_stats(),
+        "passwordHasher": get_password_hasher().stats(),
+        "accessTokenCache": get_access_token_cache().stats(),
+        "userCache": get_user_cache().stats(),
+    }
+
+
 @router.patch(
     "/admin/students/{student_id}/features",
     response_model=AdminStudentFeaturesUpdateResponse,
@@ -891,44 +972,118 @@ def grant_bonus_sticker(
     return PraiseSticker(**sticker)
 
 
-@router.get(
-    "/graph/draft",
-    response_model=GraphResponse,
-    responses={404: {"model": ErrorResponse}},
-)
-def get_draft_graph() -> GraphResponse | JSONResponse:
-    graph = fetch_latest_graph("draft")
+def _etag_matches(if_none_match: str | None, etags: set[str]) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in etags:
+            return True
+    return False
+
+
+def _accepts_gzip(accept_encoding: str | None) -> bool:
+    """True when ``Accept-Encoding`` allows gzip with a q-value above 0.
+
+    An explicit ``gzip`` (or ``x-gzip``) entry wins over ``*``; a malformed
+    q-value counts as 0.
+    """
+    if not accept_encoding:
+        return False
+    qualities: dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def _graph_snapshot_response(request: Request, snapshot: GraphSnapshot) -> Response:
+    """Serve pre-serialized graph bytes with ETag revalidation."""
+    accepts_gzip = _accepts_gzip(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": snapshot.gzip_etag if accepts_gzip else snapshot.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(
+        request.headers.get("if-none-match"), {snapshot.etag, snapshot.gzip_etag}
+    ):
+        return Response(status_code=304, headers=headers)
+    if accepts_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(
+            content=snapshot.gzip_body, media_type="application/json", headers=headers
+        )
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+def _serve_latest_graph(
+    request: Request, status: str, *, not_found_code: str, not_found_message: str
+) -> GraphResponse | JSONResponse | Response:
+    snapshot = None
+    if get_graph_storage_backend() == "sqlite":
+        snapshot = fetch_latest_graph_snapshot(status)
+        graph = snapshot.payload if snapshot else None
+    else:
+        graph = fetch_latest_graph(status)
     if not graph:
         return JSONResponse(
             status_code=404,
             content={
                 "error": {
-                    "code": "DRAFT_NOT_FOUND",
-                    "message": "Draft graph not found",
+                    "code": not_found_code,
+                    "message": not_found_message,
                 }
             },
         )
+    if snapshot is not None:
+        return _graph_snapshot_response(request, snapshot)
     return graph
 
 
+@router.get(
+    "/graph/draft",
+    response_model=GraphResponse,
+    responses={304: {"description": "Not Modified"}, 404: {"model": ErrorResponse}},
+)
+def get_draft_graph(request: Request) -> GraphResponse | JSONResponse | Response:
+    return _serve_latest_graph(
+        request,
+        "draft",
+        not_found_code="DRAFT_NOT_FOUND",
+        not_found_message="Draft graph not found",
+    )
+
+
 @router.get(
     "/graph/published",
     response_model=GraphResponse,
-    responses={404: {"model": ErrorResponse}},
+    responses={304: {"description": "Not Modified"}, 404: {"model": ErrorResponse}},
 )
-def get_published_graph() -> GraphResponse | JSONResponse:
-    graph = fetch_latest_graph("published")
-    if not graph:
-        return JSONResponse(
-            status_code=404,
-            content={
-                "error": {
-                    "code": "PUBLISHED_NOT_FOUND",
-                    "message": "Published graph not found",
-                }
-            },
-        )
-    return graph
+def get_published_graph(request: Request) -> GraphResponse | JSONResponse | Response:
+    return _serve_latest_graph(
+        request,
+        "published",
+        not_found_code="PUBLISHED_NOT_FOUND",
+        not_found_message="Published graph not found",
+    )
 
 
 @router.get(
@@ -997,42 +1152,9 @@ def list_problems(
 # File upload constants
 MAX_FILE_COUNT = 3
 MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024  # 5MB
-ALLOWED_CONTENT_TYPES = {
-    "image/jpeg",
-    "image/jpg",
-    "image/pjpeg",
-    "image/png",
-    "image/webp",
-}
 UPLOAD_BASE_DIR = Path(__file__).resolve().parent.parent / "data" / "uploads"
 
 
-def _get_upload_dir(submission_id: str) -> Path:
-    """Get the upload directory for a submission."""
-    upload_dir = UPLOAD_BASE_DIR / submission_id
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    return upload_dir
-
-
-def _send_notification_task(submission_id: str) -> None:
-    """Background task to send email notification."""
-    submission = get_homework_submission_with_files(submission_id)
-    if not submission:
-        logger.error("Submission not found for notification: %s", submission_id)
-        return
-
-    file_paths = [f["storedPath"] for f in submission["files"]]
-
-    send_homework_notification(
-        student_id=submission["studentId"],
-        student_name=None,  # Could be enhanced to fetch student name
-        assignment_title=submission["assignmentTitle"],
-        problems=submission["problems"],
-        answers=submission["answers"],
-        file_paths=file_paths,
-    )
-
-
 def _normalize_student_ids(student_ids: List[str]) -> List[str]:
     """Trim, de-duplicate, and drop empty student ids while preserving order."""
     normalized: List[str] = []
@@ -1046,13 +1168,18 @@ def _normalize_student_ids(student_ids: List[str]) -> List[str]:
     return normalized
 
 
-@dataclass
-class ValidatedFile:
-    content: bytes
-    size_bytes: int
-    content_type: str
-    original_name: str
-    ext: str
+def _discard_staged(staged_files: List[StagedUpload]) -> None:
+    for staged in staged_files:
+        staged.discard()
+
+
+def _store_staged(staged_files: List[StagedUpload]) -> None:
+    for staged in staged_files:
+        try:
+            store_staged(staged, UPLOAD_BASE_DIR)
+        except OSError:
+            # The rows are committed; the download endpoint reports FILE_MISSING.
+            logger.exception("Failed to store staged upload %s", staged.sha256)
 
 
 @router.post(
@@ -1221,43 +1348,15 @@ def get_assignment(
     return assignment
 
 
-@router.post(
-    "/homework/assignments/{assignment_id}/submit",
-    response_model=HomeworkSubmitResponse,
-    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
-)
-async def submit_homework(
+def _check_submittable(
     assignment_id: str,
-    background_tasks: BackgroundTasks,
-    studentId: str = Form(...),
-    answersJson: str = Form(...),  # JSON string: {"p1": "answer1", "p2": "answer2"}
-    images: List[UploadFile] = File(default=[]),
-    user=Depends(get_current_user),
-) -> HomeworkSubmitResponse | JSONResponse:
-    """Submit homework with answers and optional images."""
-    if user.role != "student" or user.username != studentId:
-        return JSONResponse(
-            status_code=403,
-            content={"error": {"code": "FORBIDDEN", "message": "권한이 없습니다."}},
-        )
-    # Parse answers JSON
-    try:
-        answers = json.loads(answersJson)
-        if not isinstance(answers, dict):
-            raise ValueError("answers must be an object")
-    except (json.JSONDecodeError, ValueError):
-        return JSONResponse(
-            status_code=400,
-            content={
-                "error": {
-                    "code": "INVALID_ANSWERS",
-                    "message": "Invalid answers format. Expected JSON object.",
-                }
-            },
-        )
-
+    student_id: str,
+    answers: dict[str, Any],
+    conn: sqlite3.Connection,
+) -> JSONResponse | None:
+    """Return the error response when this student may not submit these answers."""
     # Check if assignment exists and is assigned to student
-    assignment = get_homework_assignment(assignment_id, studentId)
+    assignment = get_homework_assignment(assignment_id, student_id, conn=conn)
     if not assignment:
         return JSONResponse(
             status_code=404,
@@ -1270,7 +1369,7 @@ async def submit_homework(
         )
 
     # Check if already submitted
-    if check_homework_submission_exists(assignment_id, studentId):
+    if check_homework_submission_exists(assignment_id, student_id, conn=conn):
         return JSONResponse(
             status_code=400,
             content={
@@ -1294,6 +1393,83 @@ async def submit_homework(
                     }
                 },
             )
+    return None
+
+
+def _save_submission(
+    assignment_id: str,
+    student_id: str,
+    answers: dict[str, Any],
+    staged_files: list[StagedUpload],
+    conn: sqlite3.Connection,
+) -> str:
+    """Insert the submission and its file records, committing both or neither."""
+    try:
+        submission_id = create_homework_submission(
+            assignment_id=assignment_id,
+            student_id=student_id,
+            answers=answers,
+            conn=conn,
+        )
+        for staged in staged_files:
+            save_homework_submission_file(
+                submission_id=submission_id,
+                stored_path=str(blob_path(UPLOAD_BASE_DIR, staged.sha256, staged.content_type)),
+                original_name=staged.original_name,
+                content_type=staged.content_type,
+                size_bytes=staged.size_bytes,
+                blob_sha256=staged.sha256,
+                conn=conn,
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return submission_id
+
+
+@router.post(
+    "/homework/assignments/{assignment_id}/submit",
+    response_model=HomeworkSubmitResponse,
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+)
+async def submit_homework(
+    assignment_id: str,
+    studentId: str = Form(...),
+    answersJson: str = Form(...),  # JSON string: {"p1": "answer1", "p2": "answer2"}
+    images: List[UploadFile] = File(default=[]),
+    user=Depends(get_current_user),
+    conn: sqlite3.Connection = Depends(get_request_connection),
+) -> HomeworkSubmitResponse | JSONResponse:
+    """Submit homework with answers and optional images."""
+    if user.role != "student" or user.username != studentId:
+        return JSONResponse(
+            status_code=403,
+            content={"error": {"code": "FORBIDDEN", "message": "권한이 없습니다."}},
+        )
+    # Parse answers JSON
+    try:
+        answers = json.loads(answersJson)
+        if not isinstance(answers, dict):
+            raise ValueError("answers must be an object")
+    except (json.JSONDecodeError, ValueError):
+        return JSONResponse(
+            status_code=400,
+            content={
+                "error": {
+                    "code": "INVALID_ANSWERS",
+                    "message": "Invalid answers format. Expected JSON object.",
+                }
+            },
+        )
+
+    # Database work runs in the threadpool: a pooled checkout or a locked
+    # database can block for seconds, which must not stall the event loop.
+    rejection = await run_in_threadpool(
+        _check_submittable, assignment_id, studentId, answers, conn
+    )
+    if rejection is not None:
+        return rejection
 
     # Validate file count
     if len(images) > MAX_FILE_COUNT:
@@ -1307,102 +1483,93 @@ async def submit_homework(
             },
         )
 
-    # Validate files and pre-read contents so we can enforce the size limit
-    validated_files: list[ValidatedFile] = []
-    ext_by_content_type = {
-        "image/jpeg": ".jpg",
-        "image/jpg": ".jpg",
-        "image/pjpeg": ".jpg",
-        "image/png": ".png",
-        "image/webp": ".webp",
-    }
-    allowed_exts = {".jpg", ".jpeg", ".png", ".webp"}
-    mime_by_ext = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg",
-        ".png": "image/png",
-        ".webp": "image/webp",
+    # Stream each upload into a staging file off the event loop; the size
+    # limit and magic-byte check apply while reading.
+    upload_errors = {
+        "INVALID_FILE_TYPE": "Only jpg, png, and webp images are allowed",
+        "FILE_TOO_LARGE": f"Each file must be <= {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB",
     }
-
-    for image in images:
-        original_name = image.filename or "image.jpg"
-        ext = Path(original_name).suffix.lower()
-
-        content_type = (image.content_type or "").lower()
-        if not content_type:
-            inferred = mime_by_ext.get(ext)
-            if inferred:
-                content_type = inferred
-
-        if content_type not in ALLOWED_CONTENT_TYPES:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": {
-                        "code": "INVALID_FILE_TYPE",
-                        "message": "Only jpg, png, and webp images are allowed",
-                    }
-                },
-            )
-
-        content = await image.read()
-        size_bytes = len(content)
-        if size_bytes > MAX_FILE_SIZE_BYTES:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": {
-                        "code": "FILE_TOO_LARGE",
-                        "message": f"Each file must be <= {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB",
-                    }
-                },
-            )
-
-        if ext not in allowed_exts:
-            ext = ext_by_content_type.get(content_type, ".jpg")
-
-        validated_files.append(
-            ValidatedFile(
-                content=content,
-                size_bytes=size_bytes,
-                content_type=content_type or "image/jpeg",
-                original_name=original_name,
-                ext=ext,
+    staged_files: list[StagedUpload] = []
+    try:
+        if images:
+            staging_dir = await run_in_threadpool(get_staging_dir, UPLOAD_BASE_DIR)
+        for image in images:
+            staged_files.append(
+                await run_in_threadpool(
+                    stage_upload,
+                    image.file,
+                    staging_dir,
+                    original_name=image.filename or "image.jpg",
+                    max_bytes=MAX_FILE_SIZE_BYTES,
+                )
             )
+    except UploadRejected as exc:
+        await run_in_threadpool(_discard_staged, staged_files)
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": exc.code, "message": upload_errors[exc.code]}},
         )
+    except BaseException:
+        await run_in_threadpool(_discard_staged, staged_files)
+        raise
 
-    # Create submission
-    submission_id = create_homework_submission(
-        assignment_id=assignment_id,
-        student_id=studentId,
-        answers=answers,
-    )
-
-    # Save files
-    if validated_files:
-        upload_dir = _get_upload_dir(submission_id)
+    # Create the submission and its file records in one transaction. Staged
+    # files move into the blob store (or are dropped as duplicates) only after
+    # the commit, and are discarded if anything fails first, so nothing is
+    # left half-saved.
+    try:
+        submission_id = await run_in_threadpool(
+            _save_submission, assignment_id, studentId, answers, staged_files, conn
+        )
+    except BaseException:
+        await run_in_threadpool(_discard_staged, staged_files)
+        raise
 
-        for file_info in validated_files:
-            file_name = f"{uuid4()}{file_info.ext}"
-            file_path = upload_dir / file_name
+    if staged_files:
+        await run_in_threadpool(_store_staged, staged_files)
+        schedule_variants(
+            UPLOAD_BASE_DIR, [(staged.sha256, staged.content_type) for staged in staged_files]
+        )
 
-            # Write file
-            with open(file_path, "wb") as f:
-                f.write(file_info.content)
+    # The outbox row was committed with the submission; send it now rather
+    # than at the sender's next poll.
+    wake_notification_sender()
 
-            # Save file record
-            save_homework_submission_file(
-                submission_id=submission_id,
-                stored_path=str(file_path),
-                original_name=file_info.original_name,
-                content_type=file_info.content_type,
-                size_bytes=file_info.size_bytes,
-            )
+    return HomeworkSubmitResponse(submissionId=submission_id)
 
-    # Send email notification in background
-    background_tasks.add_task(_send_notification_task, submission_id)
 
-    return HomeworkSubmitResponse(submissionId=submission_id)
+def _grant_homework_excellent_sticker(
+    submission: dict[str, Any], conn: sqlite3.Connection
+) -> None:
+    """Grant the on-time approval sticker once per student and homework."""
+    homework_id = submission.get("assignmentId")
+    student_id = submission.get("studentId")
+    if not homework_id or not student_id:
+        return
+    target = get_user_by_username(student_id, conn=conn)
+    if not target or not bool(target.get("praise_sticker_enabled")):
+        return
+    if has_praise_sticker_for_homework(
+        student_id=student_id,
+        homework_id=homework_id,
+        reason_type="homework_excellent",
+        conn=conn,
+    ):
+        return
+    sticker_reward_count = max(
+        0, int(submission.get("assignmentStickerRewardCount") or 2)
+    )
+    if sticker_reward_count <= 0:
+        return
+    create_praise_sticker(
+        student_id=student_id,
+        count=sticker_reward_count,
+        reason=AUTO_STICKER_REASON,
+        reason_type="homework_excellent",
+        homework_id=homework_id,
+        granted_by=None,
+        conn=conn,
+    )
 
 
 @router.post(
@@ -1414,9 +1581,10 @@ def review_homework_submission(
     submission_id: str,
     data: HomeworkSubmissionReviewRequest,
     _admin=Depends(require_admin),
+    conn: sqlite3.Connection = Depends(get_request_connection),
 ) -> HomeworkSubmissionReviewResponse | JSONResponse:
     """Review a homework submission (Admin only)."""
-    submission = get_homework_submission_for_review(submission_id)
+    submission = get_homework_submission_for_review(submission_id, conn=conn)
     if not submission:
         return JSONResponse(
             status_code=404,
@@ -1510,6 +1678,7 @@ def review_homework_submission(
         review_status=status,
         problem_reviews=normalized_reviews,
         reviewed_by=reviewed_by,
+        conn=conn,
     )
     if not updated:
         return JSONResponse(
@@ -1527,32 +1696,9 @@ def review_homework_submission(
         and submission.get("reviewStatus") != "approved"
         and _is_on_time(submission.get("submittedAt"), submission.get("dueAt"))
     ):
-        homework_id = submission.get("assignmentId")
-        student_id = submission.get("studentId")
-        if homework_id and student_id:
-            target = get_user_by_username(student_id)
-            if not target or not bool(target.get("praise_sticker_enabled")):
-                return HomeworkSubmissionReviewResponse()
-            already_granted = has_praise_sticker_for_homework(
-                student_id=student_id,
-                homework_id=homework_id,
-                reason_type="homework_excellent",
-            )
-            if not already_granted:
-                sticker_reward_count = max(
-                    0, int(submission.get("assignmentStickerRewardCount") or 2)
-                )
-                if sticker_reward_count <= 0:
-                    return HomeworkSubmissionReviewResponse()
-                create_praise_sticker(
-                    student_id=student_id,
-                    count=sticker_reward_count,
-                    reason=AUTO_STICKER_REASON,
-                    reason_type="homework_excellent",
-                    homework_id=homework_id,
-                    granted_by=None,
-                )
+        _grant_homework_excellent_sticker(submission, conn)
 
+    conn.commit()
     return HomeworkSubmissionReviewResponse()
 
 
@@ -1794,10 +1940,17 @@ def get_admin_submission_answer_check_detail(
     response_model=AdminAssignmentListResponse,
 )
 def list_admin_assignments(
+    includeProblems: bool = Query(default=True),
     _admin=Depends(require_admin),
 ) -> AdminAssignmentListResponse:
-    """Admin: List all homework assignments with submission statistics."""
-    assignments = list_all_homework_assignments_admin()
+    """Admin: List all homework assignments with submission statistics.
+
+    Pass ``includeProblems=false`` to skip the problem bodies; each item still
+    carries ``problemCount``.
+    """
+    assignments = list_all_homework_assignments_admin(
+        include_problems=includeProblems
+    )
     return AdminAssignmentListResponse(assignments=assignments)
 
 
@@ -1944,15 +2097,73 @@ def get_admin_submission(
     return submission
 
 
+def _invalid_variant_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=400,
+        content={
+            "error": {
+                "code": "INVALID_VARIANT",
+                "message": f"variant must be one of original, {', '.join(VARIANTS)}",
+            }
+        },
+    )
+
+
+def _resolve_submission_file(
+    file_info: dict[str, Any], variant: str
+) -> tuple[Path, str, str, str] | None:
+    """(path, media type, download name, variant served) for a file record.
+
+    The variant served is ``original`` when the rendition cannot be rendered
+    or is not ready within ``REQUEST_WAIT_SECONDS``. Returns None when a
+    legacy ``stored_path`` points outside the upload root.
+    """
+    if file_info["blobSha256"]:
+        # Blob paths are derived from a hex digest, so they cannot escape the
+        # upload root and need no resolve().
+        sha256 = file_info["blobSha256"]
+        if variant != "original":
+            rendition = get_variant(
+                UPLOAD_BASE_DIR,
+                sha256,
+                file_info["contentType"],
+                variant,
+                timeout=REQUEST_WAIT_SECONDS,
+            )
+            if rendition is not None:
+                filename = f"{Path(file_info['originalName']).stem}-{variant}.jpg"
+                return rendition, VARIANT_CONTENT_TYPE, filename, variant
+        file_path = blob_path(UPLOAD_BASE_DIR, sha256, file_info["contentType"])
+        return file_path, file_info["contentType"], file_info["originalName"], "original"
+
+    file_path = Path(file_info["storedPath"]).resolve()
+    # Security: Verify the file is within the allowed upload directory (Path Traversal prevention)
+    try:
+        file_path.relative_to(UPLOAD_BASE_DIR.resolve())
+    except ValueError:
+        logger.warning("Path traversal attempt detected: %s", file_info["storedPath"])
+        return None
+    return file_path, file_info["contentType"], file_info["originalName"], "original"
+
+
 @router.get(
     "/homework/admin/submissions/{submission_id}/files/{file_id}",
     responses={404: {"model": ErrorResponse}},
 )
 def download_submission_file(
-    submission_id: str, file_id: str, _admin=Depends(require_admin)
-) -> JSONResponse:
-    """Admin: Download a submission file."""
-    from fastapi.responses import FileResponse
+    request: Request,
+    submission_id: str,
+    file_id: str,
+    variant: str = Query(default="original"),
+    _admin=Depends(require_admin),
+) -> Response:
+    """Admin: Download a submission file, or its ``thumb``/``review`` rendition.
+
+    Supports ``If-None-Match``/``If-Modified-Since`` (304) and single byte
+    ranges (206); blob-backed files are served as immutable.
+    """
+    if variant != "original" and variant not in VARIANTS:
+        return _invalid_variant_response()
 
     file_info = get_submission_file(file_id)
     if not file_info:
@@ -1978,13 +2189,8 @@ def download_submission_file(
             },
         )
 
-    file_path = Path(file_info["storedPath"]).resolve()
-
-    # Security: Verify the file is within the allowed upload directory (Path Traversal prevention)
-    try:
-        file_path.relative_to(UPLOAD_BASE_DIR.resolve())
-    except ValueError:
-        logger.warning("Path traversal attempt detected: %s", file_info["storedPath"])
+    resolved = _resolve_submission_file(file_info, variant)
+    if resolved is None:
         return JSONResponse(
             status_code=404,
             content={
@@ -1994,8 +2200,12 @@ def download_submission_file(
                 }
             },
         )
+    file_path, media_type, filename, served_variant = resolved
 
-    if not file_path.exists():
+    # One stat checks the file and supplies size and mtime for the validators.
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         return JSONResponse(
             status_code=404,
             content={
@@ -2006,10 +2216,89 @@ def download_submission_file(
             },
         )
 
-    return FileResponse(
-        path=file_path,
-        filename=file_info["originalName"],
-        media_type=file_info["contentType"],
+    # A fallback original must not be cached under the variant's URL, so it
+    # gets a weak, revalidated validator instead of the blob's hash.
+    exact = bool(file_info["blobSha256"]) and served_variant == variant
+    return file_response(
+        request,
+        file_path,
+        stat_result,
+        media_type=media_type,
+        filename=filename,
+        etag=file_etag(file_info["blobSha256"] if exact else None, served_variant, stat_result),
+        immutable=exact,
+    )
+
+
+@router.get(
+    "/homework/admin/submissions/{submission_id}/files.zip",
+    responses={404: {"model": ErrorResponse}},
+)
+def download_submission_files_zip(
+    request: Request,
+    submission_id: str,
+    variant: str = Query(default="original"),
+    _admin=Depends(require_admin),
+) -> Response:
+    """Admin: Stream every file of a submission as one zip.
+
+    The archive is built while it is sent. When every file is served as the
+    requested variant, its ETag is derived from the file hashes, so an
+    unchanged submission revalidates with a 304; an archive with missing
+    files or fallback originals gets no ETag and is not cached.
+    """
+    if variant != "original" and variant not in VARIANTS:
+        return _invalid_variant_response()
+
+    submission = get_homework_submission_with_files(submission_id)
+    if not submission:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "error": {
+                    "code": "SUBMISSION_NOT_FOUND",
+                    "message": "Submission not found",
+                }
+            },
+        )
+
+    files = submission["files"]
+    etag = None
+    if files and all(f["blobSha256"] for f in files):
+        digest = hashlib.sha256(variant.encode())
+        for f in files:
+            digest.update(f"\0{f['blobSha256']}\0{f['originalName']}".encode())
+        etag = f'"{digest.hexdigest()}"'
+        # Only ever sent with a complete archive of exact renditions, so a
+        # match means the client already holds those bytes.
+        if not_modified(request, etag):
+            return Response(
+                status_code=304,
+                headers={"etag": etag, "cache-control": IMMUTABLE_CACHE_CONTROL},
+            )
+
+    entries: list[tuple[str, Path]] = []
+    complete = True
+    for index, f in enumerate(files, start=1):
+        resolved = _resolve_submission_file(f, variant)
+        if resolved is None or not resolved[0].exists():
+            logger.warning("Skipping missing file %s in zip of %s", f["id"], submission_id)
+            complete = False
+            continue
+        file_path, _media_type, filename, served_variant = resolved
+        complete = complete and served_variant == variant
+        entries.append((f"{index:02d}_{Path(filename).name}", file_path))
+
+    immutable = etag is not None and complete
+    headers = {
+        "content-disposition": f'attachment; filename="submission-{submission_id}.zip"',
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if immutable:
+        headers["etag"] = etag
+    modified = datetime.fromisoformat(submission["submittedAt"])
+    return StreamingResponse(
+        iter_zip(entries, modified), media_type="application/zip", headers=headers
     )
 
 
@@ -2035,7 +2324,7 @@ def get_homework_pending_count_endpoint(
 # ── Study Sessions ────────────────────────────────────────────────
 
 @router.post("/study-sessions")
-async def upsert_study_session(
+def upsert_study_session(
     body: StudySessionUpsertRequest,
     user=Depends(get_current_user),
 ):
@@ -2084,71 +2373,172 @@ async def upsert_study_session(
                 ),
             )
 
+        cleared = False
+        if body.status == "SUBMITTED":
+            if body.gradingJson:
+                try:
+                    grading = json.loads(body.gradingJson)
+                    cleared = isinstance(grading, dict) and grading.get("cleared") is True
+                except ValueError:
+                    pass  # grading_json malformed — treat as not cleared
+            record_study_submission(
+                conn,
+                user_id=user_id,
+                node_id=body.nodeId,
+                submitted_at=now,
+                response_count=len(body.responses),
+                wrong_count=sum(1 for r in body.responses if r.isCorrect is False),
+                cleared=cleared,
+            )
+
         conn.commit()
 
         # Update skill levels if session was cleared
-        if body.status == "SUBMITTED" and body.gradingJson:
-            import json as _json
+        if cleared:
             try:
-                grading = _json.loads(body.gradingJson)
-                if grading.get("cleared") is True:
-                    _update_skill_levels(conn, user_id, body.nodeId)
-                    conn.commit()
+                _update_skill_levels(conn, user_id, body.nodeId)
+                conn.commit()
             except Exception:
-                pass  # grading_json malformed — skip skill update silently
+                conn.rollback()  # skill update is best-effort
     finally:
         conn.close()
 
     return {"sessionId": session_id, "status": body.status}
 
 
+_STUDY_RESPONSE_BATCH_SIZE = 500
+
+
+def _encode_study_session_cursor(updated_at: str, session_id: str) -> str:
+    raw = json.dumps([updated_at, session_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_study_session_cursor(cursor: str) -> tuple[str, str] | None:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    if (
+        not isinstance(decoded, list)
+        or len(decoded) != 2
+        or not all(isinstance(part, str) for part in decoded)
+    ):
+        return None
+    return decoded[0], decoded[1]
+
+
+def _load_study_responses(
+    conn, session_ids: list[str], *, include_scratchpad: bool
+) -> dict[str, list[dict[str, Any]]]:
+    """Fetch responses for many sessions at once, grouped by session id."""
+    columns = (
+        "id, session_id, problem_id, input_raw, input_normalized, "
+        "is_correct, time_spent_ms, created_at"
+    )
+    if include_scratchpad:
+        columns += ", scratchpad_strokes_json"
+
+    grouped: dict[str, list[dict[str, Any]]] = {sid: [] for sid in session_ids}
+    for offset in range(0, len(session_ids), _STUDY_RESPONSE_BATCH_SIZE):
+        batch = session_ids[offset : offset + _STUDY_RESPONSE_BATCH_SIZE]
+        placeholders = ",".join("?" for _ in batch)
+        rows = conn.execute(
+            f"SELECT {columns} FROM study_responses "
+            f"WHERE session_id IN ({placeholders}) ORDER BY session_id, rowid",
+            batch,
+        ).fetchall()
+        for r in rows:
+            item = {
+                "id": r["id"],
+                "sessionId": r["session_id"],
+                "problemId": r["problem_id"],
+                "inputRaw": r["input_raw"],
+                "inputNormalized": r["input_normalized"],
+                "isCorrect": r["is_correct"],
+                "timeSpentMs": r["time_spent_ms"],
+            }
+            if include_scratchpad:
+                item["scratchpadStrokesJson"] = r["scratchpad_strokes_json"]
+            item["createdAt"] = r["created_at"]
+            grouped[r["session_id"]].append(item)
+    return grouped
+
+
 @router.get("/study-sessions")
-async def list_study_sessions(
+def list_study_sessions(
+    limit: int | None = Query(default=None, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    since: str | None = Query(default=None),
+    includeScratchpad: bool = Query(default=True),
     user=Depends(get_current_user),
 ):
+    """List the user's study sessions, newest first.
+
+    Without ``limit`` every session is returned, as before. With ``limit`` the
+    response carries ``nextCursor`` for fetching the following page.
+    ``since`` keeps only sessions updated after the given ISO timestamp.
+    """
     user_id = user.user_id
 
+    where = ["user_id=?"]
+    params: list[Any] = [user_id]
+    if since:
+        where.append("updated_at > ?")
+        params.append(since)
+    if cursor:
+        position = _decode_study_session_cursor(cursor)
+        if position is None:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": {"code": "INVALID_CURSOR", "message": "Invalid cursor"}
+                },
+            )
+        where.append("(updated_at < ? OR (updated_at = ? AND id < ?))")
+        params.extend([position[0], position[0], position[1]])
+
+    sql = (
+        "SELECT id, user_id, node_id, status, grading_json, created_at, updated_at "
+        f"FROM study_sessions WHERE {' AND '.join(where)} "
+        "ORDER BY updated_at DESC, id DESC"
+    )
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists.
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
     conn = get_connection(get_database_path())
     try:
-        sessions = conn.execute(
-            "SELECT * FROM study_sessions WHERE user_id=? ORDER BY updated_at DESC",
-            (user_id,),
-        ).fetchall()
-
-        result = []
-        for s in sessions:
-            responses = conn.execute(
-                "SELECT * FROM study_responses WHERE session_id=?", (s["id"],)
-            ).fetchall()
-            result.append(
-                {
-                    "id": s["id"],
-                    "userId": s["user_id"],
-                    "nodeId": s["node_id"],
-                    "status": s["status"],
-                    "gradingJson": s["grading_json"],
-                    "createdAt": s["created_at"],
-                    "updatedAt": s["updated_at"],
-                    "responses": [
-                        {
-                            "id": r["id"],
-                            "sessionId": r["session_id"],
-                            "problemId": r["problem_id"],
-                            "inputRaw": r["input_raw"],
-                            "inputNormalized": r["input_normalized"],
-                            "isCorrect": r["is_correct"],
-                            "timeSpentMs": r["time_spent_ms"],
-                            "scratchpadStrokesJson": r["scratchpad_strokes_json"],
-                            "createdAt": r["created_at"],
-                        }
-                        for r in responses
-                    ],
-                }
-            )
+        sessions = conn.execute(sql, params).fetchall()
+        next_cursor = None
+        if limit is not None and len(sessions) > limit:
+            sessions = sessions[:limit]
+            last = sessions[-1]
+            next_cursor = _encode_study_session_cursor(last["updated_at"], last["id"])
+
+        responses_by_session = _load_study_responses(
+            conn,
+            [s["id"] for s in sessions],
+            include_scratchpad=includeScratchpad,
+        )
+        result = [
+            {
+                "id": s["id"],
+                "userId": s["user_id"],
+                "nodeId": s["node_id"],
+                "status": s["status"],
+                "gradingJson": s["grading_json"],
+                "createdAt": s["created_at"],
+                "updatedAt": s["updated_at"],
+                "responses": responses_by_session[s["id"]],
+            }
+            for s in sessions
+        ]
     finally:
         conn.close()
 
-    return {"sessions": result}
+    return {"sessions": result, "nextCursor": next_cursor}
 
 
 # ── Skill Levels ──────────────────────────────────────────────────
@@ -2161,51 +2551,29 @@ def _update_skill_levels(conn, user_id: str, node_id: str) -> None:
     """
     from datetime import datetime, timezone
 
-    version_row = conn.execute(
-        "SELECT id FROM graph_versions WHERE status='published' ORDER BY created_at DESC LIMIT 1"
-    ).fetchone()
-    if not version_row:
+    adjacency = get_published_graph_adjacency(conn)
+    if adjacency is None:
         return
 
-    graph_version_id = version_row["id"]
-
-    taught_rows = conn.execute(
-        """
-        SELECT target FROM edges
-        WHERE graph_version_id = ?
-          AND edge_type = 'teaches'
-          AND source = ?
-        """,
-        (graph_version_id, node_id),
-    ).fetchall()
-
-    if not taught_rows:
+    taught_skill_ids = adjacency.teaches.get(node_id, ())
+    if not taught_skill_ids:
         return
 
     now = datetime.now(timezone.utc).isoformat()
-
-    for row in taught_rows:
-        skill_id = row["target"]
-        existing = conn.execute(
-            "SELECT level FROM student_skill_levels WHERE user_id=? AND skill_id=?",
-            (user_id, skill_id),
-        ).fetchone()
-
-        if existing is None:
-            conn.execute(
-                "INSERT INTO student_skill_levels (user_id, skill_id, level, updated_at) VALUES (?,?,?,?)",
-                (user_id, skill_id, 1, now),
-            )
-        elif existing["level"] < 3:
-            conn.execute(
-                "UPDATE student_skill_levels SET level=?, updated_at=? WHERE user_id=? AND skill_id=?",
-                (existing["level"] + 1, now, user_id, skill_id),
-            )
-        # If already level 3, no-op
+    conn.executemany(
+        """
+        INSERT INTO student_skill_levels (user_id, skill_id, level, updated_at)
+        VALUES (?, ?, 1, ?)
+        ON CONFLICT(user_id, skill_id) DO UPDATE
+        SET level = level + 1, updated_at = excluded.updated_at
+        WHERE level < 3
+        """,
+        [(user_id, skill_id, now) for skill_id in taught_skill_ids],
+    )
 
 
 @router.get("/skill-levels")
-async def get_skill_levels(user=Depends(get_current_user)):
+def get_skill_levels(user=Depends(get_current_user)):
     conn = get_connection(get_database_path())
     try:
         rows = conn.execute(
@@ -2225,61 +2593,48 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
     from datetime import datetime, timezone, timedelta
 
     now = datetime.now(timezone.utc)
-    cutoff_14d = (now - timedelta(days=14)).isoformat()
+    cutoff_14d = (now - timedelta(days=STUDY_WRONG_WINDOW_DAYS)).isoformat()
 
-    rows = conn.execute(
+    # Per-node aggregates are maintained by record_study_submission, so this
+    # reads one row per attempted node rather than the full session history.
+    stats_rows = conn.execute(
         """
-        SELECT s.node_id, s.updated_at, r.is_correct
-        FROM study_sessions s
-        JOIN study_responses r ON r.session_id = s.id
-        WHERE s.user_id = ? AND s.status = 'SUBMITTED'
-        ORDER BY s.updated_at DESC
+        SELECT st.node_id, st.last_attempt_at, st.cleared,
+               COALESCE(w.wrong_recent, 0) AS wrong_recent
+        FROM study_node_stats st
+        LEFT JOIN (
+            SELECT node_id, SUM(wrong_count) AS wrong_recent
+            FROM study_node_wrong_events
+            WHERE user_id = ? AND submitted_at >= ?
+            GROUP BY node_id
+        ) w ON w.node_id = st.node_id
+        WHERE st.user_id = ?
+        ORDER BY st.last_attempt_at DESC
         """,
-        (user_id,),
+        (user_id, cutoff_14d, user_id),
     ).fetchall()
 
-    # Collect cleared node IDs (exclude from recommendations)
-    import json as _json
-    cleared_session_rows = conn.execute(
-        "SELECT node_id, grading_json FROM study_sessions WHERE user_id=? AND status='SUBMITTED'",
-        (user_id,),
-    ).fetchall()
-    cleared_node_ids: set[str] = set()
-    for sr in cleared_session_rows:
-        try:
-            g = _json.loads(sr["grading_json"] or "{}")
-            if g.get("cleared") is True:
-                cleared_node_ids.add(sr["node_id"])
-        except Exception:
-            pass
-
-    node_stats: dict[str, dict] = {}
-    for row in rows:
-        nid = row["node_id"]
-        if nid in cleared_node_ids:
-            continue
-        if nid not in node_stats:
-            node_stats[nid] = {"wrong_recent": 0, "last_at": row["updated_at"]}
-        if row["updated_at"] >= cutoff_14d and row["is_correct"] == 0:
-            node_stats[nid]["wrong_recent"] += 1
-        if row["updated_at"] > node_stats[nid]["last_at"]:
-            node_stats[nid]["last_at"] = row["updated_at"]
+    cleared_node_ids: set[str] = {r["node_id"] for r in stats_rows if r["cleared"]}
 
     scored = []
-    for node_id, stats in node_stats.items():
+    for row in stats_rows:
+        node_id = row["node_id"]
+        if row["cleared"] or row["last_attempt_at"] is None:
+            continue
+        wrong_recent = row["wrong_recent"]
         try:
-            last_dt = datetime.fromisoformat(stats["last_at"].replace("Z", "+00:00"))
+            last_dt = datetime.fromisoformat(row["last_attempt_at"].replace("Z", "+00:00"))
         except ValueError:
             continue
         if last_dt.tzinfo is None:
             last_dt = last_dt.replace(tzinfo=timezone.utc)
         days_since = (now - last_dt).days
-        score = stats["wrong_recent"] + max(0, 14 - days_since) * 0.1
+        score = wrong_recent + max(0, 14 - days_since) * 0.1
         if score <= 0:
             continue
 
-        if stats["wrong_recent"] > 0:
-            reason = f"최근 {stats['wrong_recent']}번 틀렸어요"
+        if wrong_recent > 0:
+            reason = f"최근 {wrong_recent}번 틀렸어요"
         elif days_since > 7:
             reason = "오랫동안 안 풀었어요"
         else:
@@ -2287,55 +2642,24 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
 
         scored.append({"nodeId": node_id, "reason": reason, "score": score})
 
-    # ── Skill-readiness bonus ──────────────────────────────────────────────────
-    version_row = conn.execute(
-        "SELECT id FROM graph_versions WHERE status='published' ORDER BY created_at DESC LIMIT 1"
-    ).fetchone()
-
-    if version_row:
-        gv_id = version_row["id"]
+    adjacency = get_published_graph_adjacency(conn)
 
-        skill_level_rows = conn.execute(
-            "SELECT skill_id, level FROM student_skill_levels WHERE user_id=? AND level > 0",
-            (user_id,),
-        ).fetchall()
-        student_levels: dict[str, int] = {r["skill_id"]: r["level"] for r in skill_level_rows}
-
-        if student_levels:
-            candidate_rows = conn.execute(
-                """
-                SELECT DISTINCT target AS node_id FROM edges
-                WHERE graph_version_id = ?
-                  AND edge_type = 'requires_skill'
-                """,
-                (gv_id,),
+    if adjacency is not None:
+        # ── Skill-readiness bonus ──────────────────────────────────────────────
+        ready_skill_ids = {
+            r["skill_id"]
+            for r in conn.execute(
+                "SELECT skill_id FROM student_skill_levels WHERE user_id=? AND level > 0",
+                (user_id,),
             ).fetchall()
+        }
 
+        if ready_skill_ids:
             already_scored_ids = {s["nodeId"] for s in scored}
-
-            for c_row in candidate_rows:
-                candidate_node_id = c_row["node_id"]
+            for candidate_node_id, required_skill_ids in adjacency.requires_skill.items():
                 if candidate_node_id in already_scored_ids:
                     continue
-
-                req_rows = conn.execute(
-                    """
-                    SELECT source AS skill_id FROM edges
-                    WHERE graph_version_id = ?
-                      AND edge_type = 'requires_skill'
-                      AND target = ?
-                    """,
-                    (gv_id, candidate_node_id),
-                ).fetchall()
-
-                required_skill_ids = [r["skill_id"] for r in req_rows]
-                if not required_skill_ids:
-                    continue
-
-                all_ready = all(
-                    student_levels.get(s_id, 0) >= 1 for s_id in required_skill_ids
-                )
-                if all_ready:
+                if required_skill_ids <= ready_skill_ids:
                     scored.append({
                         "nodeId": candidate_node_id,
                         "reason": "선수 스킬 준비됐어요",
@@ -2346,17 +2670,7 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
         if cleared_node_ids:
             already_scored_ids = {s["nodeId"] for s in scored}
             for cleared_nid in cleared_node_ids:
-                next_rows = conn.execute(
-                    """
-                    SELECT target FROM edges
-                    WHERE graph_version_id = ?
-                      AND edge_type = 'prepares_for'
-                      AND source = ?
-                    """,
-                    (gv_id, cleared_nid),
-                ).fetchall()
-                for nr in next_rows:
-                    next_nid = nr["target"]
+                for next_nid in adjacency.prepares_for.get(cleared_nid, ()):
                     if next_nid not in already_scored_ids and next_nid not in cleared_node_ids:
                         scored.append({
                             "nodeId": next_nid,
@@ -2369,7 +2683,7 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
     result = scored[:limit]
 
     # ── Placement-based fallback for new users ─────────────────────────────────
-    if not result and username:
+    if not result and username and adjacency is not None:
         import re as _re
         profile_row = conn.execute(
             "SELECT estimated_level FROM student_profiles WHERE student_id = ?",
@@ -2378,25 +2692,14 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
         if profile_row and profile_row["estimated_level"]:
             m = _re.match(r"E(\d+)-\d+", profile_row["estimated_level"].strip())
             if m:
-                grade = int(m.group(1))
-                gv_row = conn.execute(
-                    "SELECT id FROM graph_versions WHERE status='published' ORDER BY created_at DESC LIMIT 1"
-                ).fetchone()
-                if gv_row:
-                    node_rows = conn.execute(
-                        """
-                        SELECT id FROM nodes
-                        WHERE graph_version_id = ?
-                          AND node_type = 'course_step'
-                          AND id LIKE ?
-                        ORDER BY order_value ASC
-                        LIMIT ?
-                        """,
-                        (gv_row["id"], f"%G-{grade}-%", limit),
-                    ).fetchall()
-                    for n in node_rows:
+                # Case-insensitive substring match, as SQL LIKE '%G-n-%' did.
+                needle = f"g-{int(m.group(1))}-"
+                for node_id in adjacency.course_steps:
+                    if len(result) >= limit:
+                        break
+                    if needle in node_id.lower():
                         result.append({
-                            "nodeId": n["id"],
+                            "nodeId": node_id,
                             "reason": "학년에 맞는 첫 단원이에요",
                             "score": 1.0,
                         })
@@ -2405,7 +2708,7 @@ def _compute_recommendations(user_id: str, username: str | None, conn, limit: in
 
 
 @router.get("/recommendations")
-async def get_recommendations(user=Depends(get_current_user)):
+def get_recommendations(user=Depends(get_current_user)):
     conn = get_connection(get_database_path())
     try:
         items = _compute_recommendations(user.user_id, user.username, conn)
@@ -2417,7 +2720,7 @@ async def get_recommendations(user=Depends(get_current_user)):
 # ── Self-Diagnosis ────────────────────────────────────────────────
 
 @router.patch("/study-sessions/{session_id}/diagnosis")
-async def save_diagnosis(
+def save_diagnosis(
     session_id: str,
     body: DiagnosisRequest,
     user=Depends(get_current_user),
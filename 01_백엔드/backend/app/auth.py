@@ -3,9 +3,13 @@ from __future__ import annotations
 
 import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Dict, List, Optional, TypeVar
 from uuid import uuid4
 
 import bcrypt
@@ -13,8 +17,19 @@ import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from .metrics import (
+    PASSWORD_HASH_QUEUE_SECONDS,
+    PASSWORD_HASH_REJECTED,
+    PASSWORD_HASH_SECONDS,
+    MetricFamily,
+    cache_families,
+    register_collector,
+)
+
 JWT_ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
 
 @dataclass(frozen=True)
 class TokenData:
@@ -48,16 +63,144 @@ def get_refresh_ttl_days() -> int:
     return _get_env_int("JWT_REFRESH_TTL_DAYS", 7)
 
 
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the password hashing queue is full."""
+
+
+def get_bcrypt_rounds() -> int:
+    # bcrypt accepts 4..31; out-of-range settings fall back to the default.
+    rounds = _get_env_int("BCRYPT_ROUNDS", DEFAULT_BCRYPT_ROUNDS)
+    return rounds if 4 <= rounds <= 31 else DEFAULT_BCRYPT_ROUNDS
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt.
+
+    bcrypt releases the GIL, so ``max_workers`` caps how many cores auth
+    bursts can take. Callers block until their job finishes; once
+    ``max_queue`` jobs are waiting for a worker, new ones fail fast with
+    ``PasswordHasherBusy`` instead of piling up request threads.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    def run(self, operation: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            if self._queued + self._running >= self.max_workers + self.max_queue:
+                PASSWORD_HASH_REJECTED.inc()
+                raise PasswordHasherBusy("password hashing queue is full")
+            self._queued += 1
+        submitted = time.perf_counter()
+
+        def job() -> T:
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            PASSWORD_HASH_QUEUE_SECONDS.observe(started - submitted)
+            try:
+                with PASSWORD_HASH_SECONDS.time(operation=operation):
+                    return fn()
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            with self._lock:
+                self._queued -= 1
+            raise
+        return future.result()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "queued": self._queued,
+                "running": self._running,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_hasher: Optional[PasswordHasher] = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            workers = max(1, _get_env_int("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+            max_queue = max(0, _get_env_int("PASSWORD_HASH_MAX_QUEUE", workers * 8))
+            _hasher = PasswordHasher(workers, max_queue)
+        return _hasher
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the worker pool; the next hash call starts a fresh one."""
+    global _hasher
+    with _hasher_lock:
+        hasher, _hasher = _hasher, None
+    if hasher is not None:
+        hasher.shutdown()
+
+
+def _collect_password_hasher_families() -> List[MetricFamily]:
+    with _hasher_lock:
+        hasher = _hasher
+    stats = hasher.stats() if hasher is not None else {"queued": 0, "running": 0, "workers": 0}
+    queued = MetricFamily(
+        "bcrypt_queue_depth", "gauge", "bcrypt jobs waiting for a password hashing worker."
+    )
+    queued.add(stats["queued"])
+    running = MetricFamily("bcrypt_in_flight", "gauge", "bcrypt jobs currently running.")
+    running.add(stats["running"])
+    workers = MetricFamily("bcrypt_workers", "gauge", "Password hashing worker threads.")
+    workers.add(stats["workers"])
+    return [queued, running, workers]
+
+
+register_collector("bcrypt", _collect_password_hasher_families)
+
+
 def hash_password(password: str) -> str:
-    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    rounds = get_bcrypt_rounds()
+    hashed = get_password_hasher().run(
+        "hash", lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+    )
     return hashed.decode("utf-8")
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
-    except ValueError:
+    def check() -> bool:
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:
+            return False
+
+    return get_password_hasher().run("verify", check)
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """True when ``password_hash`` was made with a different cost than configured."""
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>.
+    parts = password_hash.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
         return False
+    return int(parts[2]) != get_bcrypt_rounds()
 
 
 def hash_token(token: str) -> str:
@@ -103,14 +246,94 @@ def create_refresh_token(*, user_id: str, username: str, role: str) -> tuple[str
     )
 
 
-def decode_token(token: str, *, expected_type: str) -> dict:
+class AccessTokenCache:
+    """LRU of verified access-token payloads keyed by the token's SHA-256.
+
+    Entries live until the token's own ``exp``, so a hit never accepts a token
+    that ``jwt.decode`` would reject. Changing JWT_SECRET drops every entry.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._secret: Optional[str] = None
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key: str, secret: str) -> Optional[dict]:
+        with self._lock:
+            if secret != self._secret:
+                self._entries.clear()
+                self._secret = secret
+            payload = self._entries.get(key)
+            if payload is not None and payload["exp"] <= time.time():
+                del self._entries[key]
+                payload = None
+            if payload is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return payload
+
+    def put(self, key: str, secret: str, payload: dict) -> None:
+        if self.max_entries <= 0 or not isinstance(payload.get("exp"), (int, float)):
+            return
+        with self._lock:
+            if secret != self._secret:
+                return
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+_access_token_cache = AccessTokenCache(_get_env_int("ACCESS_TOKEN_CACHE_SIZE", 10000))
+
+
+def get_access_token_cache() -> AccessTokenCache:
+    return _access_token_cache
+
+
+register_collector(
+    "access_token_cache",
+    lambda: cache_families(
+        "access_token_cache", "Verified access token cache", _access_token_cache.stats()
+    ),
+)
+
+
+def _decode_jwt(token: str, secret: str) -> dict:
     try:
-        payload = jwt.decode(token, get_jwt_secret(), algorithms=[JWT_ALGORITHM])
+        return jwt.decode(token, secret, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="TOKEN_EXPIRED") from exc
     except jwt.InvalidTokenError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="INVALID_TOKEN") from exc
 
+
+def decode_token(token: str, *, expected_type: str) -> dict:
+    secret = get_jwt_secret()
+    if expected_type != "access":
+        payload = _decode_jwt(token, secret)
+    else:
+        # Dashboards poll with the same access token; skip the HMAC check
+        # while it is still valid.
+        key = hash_token(token)
+        payload = _access_token_cache.get(key, secret)
+        if payload is None:
+            payload = _decode_jwt(token, secret)
+            if payload.get("type") == "access":
+                _access_token_cache.put(key, secret, payload)
+
     if payload.get("type") != expected_type:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="INVALID_TOKEN_TYPE")
     return payload
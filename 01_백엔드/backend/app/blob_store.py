@@ -0,0 +1,196 @@
+"""Content-addressed, deduplicated storage for submission files.
+
+Each distinct upload is stored once, under its SHA-256, at
+``<upload root>/blobs/<aa>/<bb>/<sha256><ext>``; the two shard levels keep
+any one directory small. ``homework_blobs.ref_count`` counts the
+``homework_submission_files`` rows pointing at a blob (kept by triggers, see
+``db.create_homework_blobs``), so a student resubmitting the same photos
+adds rows, not bytes.
+
+Downscaled renditions (see ``image_variants``) live beside their blob and
+are removed with it. ``collect_garbage`` removes blobs nothing has
+referenced for a grace period, blob files that never got a row (a crash
+between staging and commit) and abandoned staging files.
+``adopt_legacy_files`` moves files stored before the blob store into it.
+
+Everything here does blocking I/O; async callers use ``run_in_threadpool``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .db import (
+    delete_unreferenced_homework_blob,
+    list_legacy_submission_files,
+    list_released_homework_blobs,
+    set_submission_file_blob,
+)
+from .uploads import (
+    CHUNK_SIZE,
+    EXT_BY_CONTENT_TYPE,
+    STAGING_DIR_NAME,
+    StagedUpload,
+    sniff_image_type,
+)
+
+BLOBS_DIR_NAME = "blobs"
+# Long enough for any in-flight submission to commit or give up.
+DEFAULT_GC_GRACE_SECONDS = 3600
+# Same format as the release timestamp written by the ref-count triggers.
+_RELEASED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+
+
+def blob_path(upload_base_dir: Path, sha256: str, content_type: str) -> Path:
+    """Where the blob with this hash lives; the hash is hex, so no traversal."""
+    ext = EXT_BY_CONTENT_TYPE.get(content_type, "")
+    return upload_base_dir / BLOBS_DIR_NAME / sha256[:2] / sha256[2:4] / f"{sha256}{ext}"
+
+
+def store_staged(staged: StagedUpload, upload_base_dir: Path) -> Path:
+    """Move a staged upload into the blob store, or drop it if already stored.
+
+    Call only after the rows referencing the blob are committed: from then
+    on the garbage collector leaves the blob alone.
+    """
+    final_path = blob_path(upload_base_dir, staged.sha256, staged.content_type)
+    if final_path.exists():
+        staged.discard()
+    else:
+        staged.promote(final_path)
+    return final_path
+
+
+def _remove_blob_files(file_path: Path) -> None:
+    # The blob plus any renditions stored beside it as <sha256>.<variant>.jpg.
+    sha256 = file_path.name.split(".", 1)[0]
+    for sibling in file_path.parent.glob(f"{sha256}.*"):
+        sibling.unlink(missing_ok=True)
+    file_path.unlink(missing_ok=True)
+
+
+def collect_garbage(
+    upload_base_dir: Path,
+    path: Optional[Path] = None,
+    *,
+    grace_seconds: float = DEFAULT_GC_GRACE_SECONDS,
+) -> Dict[str, int]:
+    """Remove unreferenced blobs and stale staging files; returns counts."""
+    stats = {
+        "blobsRemoved": 0,
+        "orphanFilesRemoved": 0,
+        "stagingFilesRemoved": 0,
+        "bytesFreed": 0,
+    }
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    released_before = cutoff.strftime(_RELEASED_AT_FORMAT)
+
+    for blob in list_released_homework_blobs(released_before, path):
+        file_path = blob_path(upload_base_dir, blob["sha256"], blob["contentType"])
+        if delete_unreferenced_homework_blob(
+            blob["sha256"],
+            released_before=released_before,
+            remove_file=lambda file_path=file_path: _remove_blob_files(file_path),
+            path=path,
+        ):
+            stats["blobsRemoved"] += 1
+            stats["bytesFreed"] += blob["sizeBytes"]
+
+    mtime_cutoff = time.time() - grace_seconds
+    blobs_dir = upload_base_dir / BLOBS_DIR_NAME
+    if blobs_dir.is_dir():
+        for file_path in blobs_dir.glob("*/*/*"):
+            try:
+                stat = file_path.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime >= mtime_cutoff:
+                continue
+            sha256 = file_path.name.split(".", 1)[0]
+            if delete_unreferenced_homework_blob(
+                sha256,
+                released_before=released_before,
+                remove_file=lambda file_path=file_path: _remove_blob_files(file_path),
+                path=path,
+            ):
+                stats["orphanFilesRemoved"] += 1
+                stats["bytesFreed"] += stat.st_size
+
+    staging_dir = upload_base_dir / STAGING_DIR_NAME
+    if staging_dir.is_dir():
+        for file_path in staging_dir.glob("*.part"):
+            try:
+                stat = file_path.stat()
+                if stat.st_mtime >= mtime_cutoff:
+                    continue
+                file_path.unlink()
+            except FileNotFoundError:
+                continue
+            stats["stagingFilesRemoved"] += 1
+            stats["bytesFreed"] += stat.st_size
+
+    return stats
+
+
+def _hash_file(file_path: Path) -> Tuple[str, int, Optional[str]]:
+    digest = hashlib.sha256()
+    size_bytes = 0
+    with open(file_path, "rb") as source:
+        chunk = source.read(CHUNK_SIZE)
+        content_type = sniff_image_type(chunk)
+        while chunk:
+            size_bytes += len(chunk)
+            digest.update(chunk)
+            chunk = source.read(CHUNK_SIZE)
+    return digest.hexdigest(), size_bytes, content_type
+
+
+def adopt_legacy_files(upload_base_dir: Path, path: Optional[Path] = None) -> Dict[str, int]:
+    """Move files stored before the blob store into it, deduplicating them.
+
+    The blob is hard-linked into place before the row is updated and the old
+    name removed only after the commit, so a crash leaves either the old
+    record intact or an unreferenced blob for ``collect_garbage``.
+    """
+    stats = {"adopted": 0, "deduplicated": 0, "missing": 0, "skipped": 0}
+    for record in list_legacy_submission_files(path):
+        legacy_path = Path(record["storedPath"])
+        try:
+            sha256, size_bytes, content_type = _hash_file(legacy_path)
+        except FileNotFoundError:
+            stats["missing"] += 1
+            continue
+        if content_type is None:
+            stats["skipped"] += 1
+            continue
+
+        final_path = blob_path(upload_base_dir, sha256, content_type)
+        if final_path.exists():
+            stats["deduplicated"] += 1
+        else:
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            os.link(legacy_path, final_path)
+        set_submission_file_blob(
+            record["id"],
+            blob_sha256=sha256,
+            stored_path=str(final_path),
+            content_type=content_type,
+            size_bytes=size_bytes,
+            path=path,
+        )
+        if not final_path.exists():
+            # Collected between the check above and the commit; relink it.
+            final_path.parent.mkdir(parents=True, exist_ok=True)
+            os.link(legacy_path, final_path)
+        legacy_path.unlink(missing_ok=True)
+        try:
+            legacy_path.parent.rmdir()
+        except OSError:
+            pass  # Other files remain in the submission directory.
+        stats["adopted"] += 1
+    return stats
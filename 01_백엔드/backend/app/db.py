@@ -7,17 +7,36 @@ import os
 import re
 import sqlite3
 import hashlib
-from datetime import datetime, timezone
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from uuid import uuid4
 
+from .graph_cache import (
+    GraphSnapshot,
+    build_graph_snapshot,
+    get_graph_snapshot,
+    invalidate_graph_cache,
+    store_graph_snapshot,
+)
 from .graph_storage import (
     get_graph_storage_backend,
     get_neo4j_graph_store,
     prepare_graph_storage,
 )
 from .homework_grading import is_objective_answer_correct
+from .metrics import (
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_SECONDS,
+    MetricFamily,
+    cache_families,
+    register_collector,
+)
 
 DEFAULT_SCHEMA_VERSION = 1
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -68,12 +87,352 @@ def resolve_database_path(path: Optional[Path] = None) -> Path:
     return resolved
 
 
-def connect(path: Optional[Path] = None) -> sqlite3.Connection:
-    db_path = resolve_database_path(path)
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
+def _get_env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def _apply_connection_pragmas(conn: sqlite3.Connection) -> None:
+    """Per-connection tuning, applied once when the pool opens a connection."""
     conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA mmap_size = {_get_env_int('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)}")
+    # Negative cache_size is in KiB.
+    conn.execute(f"PRAGMA cache_size = {_get_env_int('SQLITE_CACHE_SIZE', -16000)}")
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool."""
+
+    _pool: Optional["ConnectionPool"] = None
+    _checked_out = False
+    _owner_thread: Optional[int] = None
+    _traced = False
+
+    def close(self) -> None:
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.release(self)
+
+    def close_physically(self) -> None:
+        self._pool = None
+        super().close()
+
+    def _sync_trace_callback(self) -> None:
+        # The trace callback costs a Python call per statement, so it is only
+        # installed while some trace_statements() block is open.
+        tracing = _active_traces > 0
+        if tracing != self._traced:
+            self.set_trace_callback(_dispatch_statement if tracing else None)
+            self._traced = tracing
+
+    def execute(self, sql: str, parameters: Any = (), /) -> sqlite3.Cursor:
+        self._sync_trace_callback()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql: str, seq_of_parameters: Any, /) -> sqlite3.Cursor:
+        self._sync_trace_callback()
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(sql, time.perf_counter() - started)
+
+
+def _record_statement(sql: str, seconds: float) -> None:
+    DB_QUERY_SECONDS.observe(seconds)
+    stats = _statement_stats.get()
+    if stats is not None:
+        stats.record(sql, seconds)
+
+
+class StatementStats:
+    """SQL activity of one unit of work (normally one HTTP request).
+
+    Time is measured around ``execute``/``executemany`` on pooled connections,
+    which covers preparing the statement and stepping to the first row.
+    """
+
+    __slots__ = ("count", "seconds", "slowest_sql", "slowest_seconds", "pool_wait_seconds", "_lock")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_sql: Optional[str] = None
+        self.slowest_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, seconds: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if seconds >= self.slowest_seconds:
+                self.slowest_seconds = seconds
+                self.slowest_sql = sql
+
+    def record_pool_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.pool_wait_seconds += seconds
+
+
+_statement_stats: ContextVar[Optional[StatementStats]] = ContextVar(
+    "sqlite_statement_stats", default=None
+)
+
+
+@contextmanager
+def collect_statement_stats() -> Iterator[StatementStats]:
+    """Count and time the statements run on pooled connections in this context.
+
+    The context is inherited by worker threads FastAPI runs sync endpoints
+    and dependencies in, so one request's statements land in one object.
+    """
+    stats = StatementStats()
+    token = _statement_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _statement_stats.reset(token)
+
+
+_statement_sinks: ContextVar[Tuple[Callable[[str], None], ...]] = ContextVar(
+    "sqlite_statement_sinks", default=()
+)
+_trace_lock = threading.Lock()
+_active_traces = 0
+
+
+def _dispatch_statement(sql: str) -> None:
+    for sink in _statement_sinks.get():
+        sink(sql)
+
+
+@contextmanager
+def trace_statements() -> Iterator[List[str]]:
+    """Collect the SQL run on pooled connections within this context.
+
+    Statements arrive with bound values inlined (``sqlite3_expanded_sql``), so
+    they can be fed straight to ``EXPLAIN QUERY PLAN``. Connections pick up the
+    trace callback on their next ``execute`` and drop it once no trace is open.
+    """
+    global _active_traces
+    statements: List[str] = []
+    with _trace_lock:
+        _active_traces += 1
+    token = _statement_sinks.set(_statement_sinks.get() + (statements.append,))
+    try:
+        yield statements
+    finally:
+        _statement_sinks.reset(token)
+        with _trace_lock:
+            _active_traces -= 1
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections for a single database file.
+
+    Idle connections are handed back to the thread that last used them when
+    possible so their page cache stays warm. When ``max_size`` connections are
+    checked out, callers wait up to ``timeout`` seconds for one to be released.
+    """
+
+    def __init__(self, db_path: Path, *, max_size: int, timeout: float) -> None:
+        self.db_path = db_path
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle: List[PooledConnection] = []
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+        self._stats: Dict[str, float] = {
+            "created": 0,
+            "reused": 0,
+            "discarded": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _open_connection(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, factory=PooledConnection
+        )
+        conn.row_factory = sqlite3.Row
+        _apply_connection_pragmas(conn)
+        conn._pool = self
+        return conn
+
+    def _take_idle(self, thread_id: int) -> PooledConnection:
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index]._owner_thread == thread_id:
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    def acquire(self) -> PooledConnection:
+        thread_id = threading.get_ident()
+        conn: Optional[PooledConnection] = None
+        with self._cond:
+            wait_started: Optional[float] = None
+            while True:
+                if self._idle:
+                    conn = self._take_idle(thread_id)
+                    self._stats["reused"] += 1
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                if wait_started is None:
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = self.timeout - (time.monotonic() - wait_started)
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"SQLite connection pool exhausted for '{self.db_path}'"
+                    )
+                self._cond.wait(remaining)
+            waited = 0.0
+            if wait_started is not None:
+                waited = time.monotonic() - wait_started
+                self._stats["wait_seconds"] += waited
+                stats = _statement_stats.get()
+                if stats is not None:
+                    stats.record_pool_wait(waited)
+            self._in_use += 1
+        DB_POOL_WAIT_SECONDS.observe(waited)
+
+        if conn is None:
+            try:
+                conn = self._open_connection()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["created"] += 1
+
+        conn._owner_thread = thread_id
+        conn._checked_out = True
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+        healthy = True
+        try:
+            # Match plain close() semantics: uncommitted work is discarded.
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            keep = healthy and not self._closed
+            if keep:
+                self._idle.append(conn)
+            else:
+                self._open -= 1
+                self._stats["discarded"] += 1
+            self._cond.notify()
+        if not keep:
+            conn.close_physically()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close_physically()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "path": str(self.db_path),
+                "maxSize": self.max_size,
+                "open": self._open,
+                "inUse": self._in_use,
+                "idle": len(self._idle),
+                "created": int(self._stats["created"]),
+                "reused": int(self._stats["reused"]),
+                "discarded": int(self._stats["discarded"]),
+                "waits": int(self._stats["waits"]),
+                "waitSeconds": round(self._stats["wait_seconds"], 6),
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(path: Optional[Path] = None) -> ConnectionPool:
+    key = str(path or get_database_path())
+    pool = _pools.get(key)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                resolve_database_path(path),
+                max_size=_get_env_int("SQLITE_POOL_SIZE", 16),
+                timeout=float(_get_env_int("SQLITE_POOL_TIMEOUT_SECONDS", 30)),
+            )
+            _pools[key] = pool
+        return pool
+
+
+def get_connection_pool_stats() -> List[Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def _collect_pool_families() -> List[MetricFamily]:
+    connections = MetricFamily(
+        "sqlite_pool_connections", "gauge", "Pooled SQLite connections by state."
+    )
+    max_size = MetricFamily("sqlite_pool_max_size", "gauge", "Configured SQLite pool size.")
+    for stats in get_connection_pool_stats():
+        connections.add(stats["inUse"], path=stats["path"], state="in_use")
+        connections.add(stats["idle"], path=stats["path"], state="idle")
+        max_size.add(stats["maxSize"], path=stats["path"])
+    return [connections, max_size]
+
+
+register_collector("sqlite_pool", _collect_pool_families)
+
+
+def close_connection_pools() -> None:
+    """Close every pooled connection; checked-out ones close when released."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    """Check a connection out of the pool; ``close()`` returns it."""
+    return _get_pool(path).acquire()
 
 
 def get_connection(path) -> sqlite3.Connection:
@@ -81,6 +440,44 @@ def get_connection(path) -> sqlite3.Connection:
     return connect(Path(path) if not isinstance(path, Path) else path)
 
 
+@contextmanager
+def transaction(path: Optional[Path] = None) -> Iterator[sqlite3.Connection]:
+    """Yield one connection whose writes commit together or not at all."""
+    conn = connect(path)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_request_connection() -> Iterator[sqlite3.Connection]:
+    """FastAPI dependency: one connection and one transaction per request.
+
+    Pass the connection to db helpers via ``conn=``. Handlers should call
+    ``conn.commit()`` before returning so the write is visible by the time the
+    response is sent; anything left uncommitted is committed on teardown, or
+    rolled back if the handler raised.
+    """
+    with transaction() as conn:
+        yield conn
+
+
+@contextmanager
+def _borrow_connection(
+    path: Optional[Path], conn: Optional[sqlite3.Connection]
+) -> Iterator[sqlite3.Connection]:
+    """Use the caller's connection, or open and commit a private one."""
+    if conn is not None:
+        yield conn
+        return
+    with transaction(path) as owned:
+        yield owned
+
+
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -160,6 +557,10 @@ def create_study_sessions_table(conn: sqlite3.Connection) -> None:
         "CREATE INDEX IF NOT EXISTS idx_study_sessions_user_node "
         "ON study_sessions(user_id, node_id)"
     )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_study_sessions_user_updated "
+        "ON study_sessions(user_id, updated_at, id)"
+    )
 
 
 def create_study_responses_table(conn: sqlite3.Connection) -> None:
@@ -183,6 +584,127 @@ def create_study_responses_table(conn: sqlite3.Connection) -> None:
     )
 
 
+# Wrong answers older than this no longer count towards recommendations.
+STUDY_WRONG_WINDOW_DAYS = 14
+
+
+def create_study_node_stats_tables(conn: sqlite3.Connection) -> None:
+    """Per-(user, node) aggregates that back /api/recommendations.
+
+    study_node_stats holds the last attempt time and cleared flag;
+    study_node_wrong_events keeps one row per submitted session with wrong
+    answers inside the recent window. Both are maintained by
+    record_study_submission and backfilled from history when first created.
+    """
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='study_node_stats'"
+    ).fetchone()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS study_node_stats (
+            user_id TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            last_attempt_at TEXT,
+            cleared INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, node_id)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS study_node_wrong_events (
+            user_id TEXT NOT NULL,
+            node_id TEXT NOT NULL,
+            submitted_at TEXT NOT NULL,
+            wrong_count INTEGER NOT NULL
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_study_node_wrong_events_user_time "
+        "ON study_node_wrong_events(user_id, submitted_at)"
+    )
+    if existed:
+        return
+
+    conn.execute("""
+        INSERT INTO study_node_stats (user_id, node_id, last_attempt_at, cleared)
+        SELECT s.user_id,
+               s.node_id,
+               MAX(CASE WHEN EXISTS (
+                       SELECT 1 FROM study_responses r WHERE r.session_id = s.id
+                   ) THEN s.updated_at END),
+               MAX(CASE WHEN json_valid(s.grading_json)
+                   THEN IFNULL(json_type(s.grading_json, '$.cleared') = 'true', 0)
+                   ELSE 0 END)
+        FROM study_sessions s
+        WHERE s.status = 'SUBMITTED'
+        GROUP BY s.user_id, s.node_id
+    """)
+    cutoff = (
+        datetime.now(timezone.utc) - timedelta(days=STUDY_WRONG_WINDOW_DAYS)
+    ).isoformat()
+    conn.execute(
+        """
+        INSERT INTO study_node_wrong_events (user_id, node_id, submitted_at, wrong_count)
+        SELECT s.user_id, s.node_id, s.updated_at, COUNT(*)
+        FROM study_sessions s
+        JOIN study_responses r ON r.session_id = s.id
+        WHERE s.status = 'SUBMITTED' AND r.is_correct = 0 AND s.updated_at >= ?
+        GROUP BY s.id
+        """,
+        (cutoff,),
+    )
+
+
+def record_study_submission(
+    conn: sqlite3.Connection,
+    *,
+    user_id: str,
+    node_id: str,
+    submitted_at: str,
+    response_count: int,
+    wrong_count: int,
+    cleared: bool,
+) -> None:
+    """Fold one SUBMITTED study session into the per-node aggregates.
+
+    Runs on the caller's connection so it commits with the session itself.
+    """
+    conn.execute(
+        """
+        INSERT INTO study_node_stats (user_id, node_id, last_attempt_at, cleared)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, node_id) DO UPDATE SET
+            last_attempt_at = CASE
+                WHEN excluded.last_attempt_at IS NULL THEN last_attempt_at
+                WHEN last_attempt_at IS NULL
+                     OR excluded.last_attempt_at > last_attempt_at
+                THEN excluded.last_attempt_at
+                ELSE last_attempt_at
+            END,
+            cleared = MAX(cleared, excluded.cleared)
+        """,
+        (
+            user_id,
+            node_id,
+            submitted_at if response_count > 0 else None,
+            1 if cleared else 0,
+        ),
+    )
+    cutoff = (
+        datetime.now(timezone.utc) - timedelta(days=STUDY_WRONG_WINDOW_DAYS)
+    ).isoformat()
+    conn.execute(
+        "DELETE FROM study_node_wrong_events WHERE user_id = ? AND submitted_at < ?",
+        (user_id, cutoff),
+    )
+    if wrong_count > 0:
+        conn.execute(
+            """
+            INSERT INTO study_node_wrong_events (user_id, node_id, submitted_at, wrong_count)
+            VALUES (?, ?, ?, ?)
+            """,
+            (user_id, node_id, submitted_at, wrong_count),
+        )
+
+
 def create_homework_label_structures_table(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
@@ -315,233 +837,782 @@ def create_homework_label_mapping_events_table(conn: sqlite3.Connection) -> None
     )
 
 
-def init_db(path=None) -> None:
-    _owns_conn = not isinstance(path, sqlite3.Connection)
-    conn = path if isinstance(path, sqlite3.Connection) else connect(path)
-    conn.executescript(
+def _evaluate_submission_problems(
+    problems: Any, answers: Any, reviews: Any
+) -> List[Dict[str, Any]]:
+    """Grade each problem of a submission the way the wrong-problem list does.
+
+    Objective problems are wrong when the answer does not match or the
+    reviewer flagged them; subjective problems only when flagged.
+    """
+    problems = problems if isinstance(problems, list) else []
+    answers = answers if isinstance(answers, dict) else {}
+    reviews = reviews if isinstance(reviews, dict) else {}
+
+    results: List[Dict[str, Any]] = []
+    for idx, problem in enumerate(problems, start=1):
+        if not isinstance(problem, dict):
+            continue
+        problem_id = str(problem.get("id") or f"p{idx}")
+        problem_type = str(problem.get("type") or "").strip()
+        options = problem.get("options")
+        options_list = options if isinstance(options, list) else None
+        correct_answer = problem.get("answer")
+        correct_answer_str = (
+            str(correct_answer) if isinstance(correct_answer, str) else None
+        )
+        student_answer_obj = answers.get(problem_id)
+        student_answer = (
+            str(student_answer_obj)
+            if isinstance(student_answer_obj, str) and student_answer_obj.strip()
+            else None
+        )
+
+        review_obj = reviews.get(problem_id)
+        needs_revision = False
+        comment = ""
+        if isinstance(review_obj, dict):
+            needs_revision = bool(review_obj.get("needsRevision"))
+            raw_comment = review_obj.get("comment")
+            if isinstance(raw_comment, str):
+                comment = raw_comment
+        review_marked_wrong = needs_revision or bool(comment.strip())
+
+        is_correct: Optional[bool] = None
+        if problem_type == "objective" and correct_answer_str is not None:
+            is_correct = is_objective_answer_correct(
+                student_answer=student_answer,
+                correct_answer=correct_answer_str,
+                options=options_list,
+            )
+
+        is_wrong = False
+        if problem_type == "objective":
+            is_wrong = is_correct is False or review_marked_wrong
+        elif problem_type == "subjective":
+            is_wrong = review_marked_wrong
+
+        results.append(
+            {
+                "problemId": problem_id,
+                "problemIndex": idx,
+                "type": problem_type,
+                "isCorrect": is_correct,
+                "needsRevision": needs_revision,
+                "comment": comment,
+                "studentAnswer": student_answer,
+                "isWrong": is_wrong,
+            }
+        )
+    return results
+
+
+def _loads_or_default(raw: Optional[str], default: Any) -> Any:
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return default
+
+
+def _write_submission_problem_results(
+    conn: sqlite3.Connection,
+    *,
+    submission_id: str,
+    assignment_id: str,
+    student_id: str,
+    problems_json: Optional[str],
+    answers_json: Optional[str],
+    problem_reviews_json: Optional[str],
+) -> None:
+    """Replace the per-problem result rows of one submission."""
+    results = _evaluate_submission_problems(
+        _loads_or_default(problems_json, []),
+        _loads_or_default(answers_json, {}),
+        _loads_or_default(problem_reviews_json, {}),
+    )
+    conn.execute(
+        "DELETE FROM homework_submission_problem_results WHERE submission_id = ?",
+        (submission_id,),
+    )
+    conn.executemany(
         """
-        CREATE TABLE IF NOT EXISTS graph_versions (
-            id TEXT PRIMARY KEY,
-            graph_id TEXT NOT NULL,
-            status TEXT NOT NULL,
-            schema_version INTEGER NOT NULL,
-            created_at TEXT NOT NULL,
-            published_at TEXT,
-            problem_set_version_id TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS schema_version (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            version INTEGER NOT NULL,
-            applied_at TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS nodes (
-            graph_version_id TEXT NOT NULL,
-            id TEXT NOT NULL,
-            node_type TEXT NOT NULL,
-            label TEXT NOT NULL,
-            text TEXT,
-            meta_json TEXT,
-            order_value REAL,
-            PRIMARY KEY (graph_version_id, id),
-            FOREIGN KEY (graph_version_id) REFERENCES graph_versions(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS edges (
-            graph_version_id TEXT NOT NULL,
-            id TEXT NOT NULL,
-            edge_type TEXT NOT NULL,
-            source TEXT NOT NULL,
-            target TEXT NOT NULL,
-            note TEXT,
-            PRIMARY KEY (graph_version_id, id),
-            FOREIGN KEY (graph_version_id) REFERENCES graph_versions(id) ON DELETE CASCADE
-        );
+        INSERT OR REPLACE INTO homework_submission_problem_results (
+            submission_id, problem_id, problem_index, assignment_id, student_id,
+            problem_type, is_correct, needs_revision, comment, student_answer, is_wrong
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                submission_id,
+                r["problemId"],
+                r["problemIndex"],
+                assignment_id,
+                student_id,
+                r["type"],
+                None if r["isCorrect"] is None else int(r["isCorrect"]),
+                int(r["needsRevision"]),
+                r["comment"],
+                r["studentAnswer"],
+                int(r["isWrong"]),
+            )
+            for r in results
+        ],
+    )
 
-        CREATE TABLE IF NOT EXISTS problems (
-            id TEXT PRIMARY KEY,
-            node_id TEXT NOT NULL,
-            order_value INTEGER NOT NULL,
-            prompt TEXT NOT NULL,
-            grading_json TEXT NOT NULL,
-            answer_json TEXT NOT NULL
-        );
 
-        CREATE TABLE IF NOT EXISTS attempts (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            graph_version_id TEXT NOT NULL,
-            node_id TEXT NOT NULL,
-            problem_id TEXT NOT NULL,
-            input_raw TEXT NOT NULL,
-            input_normalized TEXT NOT NULL,
-            is_correct INTEGER NOT NULL,
-            created_at TEXT NOT NULL
-        );
+def refresh_submission_problem_results(
+    conn: sqlite3.Connection, submission_id: str
+) -> None:
+    """Re-grade one stored submission into homework_submission_problem_results."""
+    row = conn.execute(
+        """
+        SELECT hs.assignment_id, hs.student_id, hs.answers_json,
+               hs.problem_reviews_json, ha.problems_json
+        FROM homework_submissions hs
+        INNER JOIN homework_assignments ha ON ha.id = hs.assignment_id
+        WHERE hs.id = ?
+        """,
+        (submission_id,),
+    ).fetchone()
+    if row is None:
+        return
+    _write_submission_problem_results(
+        conn,
+        submission_id=submission_id,
+        assignment_id=row["assignment_id"],
+        student_id=row["student_id"],
+        problems_json=row["problems_json"],
+        answers_json=row["answers_json"],
+        problem_reviews_json=row["problem_reviews_json"],
+    )
 
-        CREATE TABLE IF NOT EXISTS homework_assignments (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            description TEXT,
-            problems_json TEXT NOT NULL,
-            due_at TEXT,
-            scheduled_at TEXT,
-            sticker_reward_count INTEGER NOT NULL DEFAULT 2,
-            created_by TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        );
-
-        CREATE TABLE IF NOT EXISTS homework_assignment_targets (
-            assignment_id TEXT NOT NULL,
-            student_id TEXT NOT NULL,
-            assigned_at TEXT NOT NULL,
-            PRIMARY KEY (assignment_id, student_id),
-            FOREIGN KEY (assignment_id) REFERENCES homework_assignments(id) ON DELETE CASCADE
-        );
 
-        CREATE TABLE IF NOT EXISTS homework_submissions (
-            id TEXT PRIMARY KEY,
+MIGRATION_BATCH_SIZE = 500
+
+
+def _backfill_in_batches(
+    conn: sqlite3.Connection,
+    select_sql: str,
+    refresh: Callable[[sqlite3.Connection, str], None],
+) -> int:
+    """Call ``refresh(conn, id)`` for every id ``select_sql`` returns.
+
+    ``select_sql`` takes the last id seen and a limit, and must return ids
+    in ascending order; ids are fetched ``MIGRATION_BATCH_SIZE`` at a time so
+    a large table is never loaded whole. Returns how many rows were refreshed.
+    """
+    batch_size = MIGRATION_BATCH_SIZE
+    done = 0
+    last_id = ""
+    while True:
+        ids = [row[0] for row in conn.execute(select_sql, (last_id, batch_size))]
+        for row_id in ids:
+            refresh(conn, row_id)
+        done += len(ids)
+        if len(ids) < batch_size:
+            return done
+        last_id = ids[-1]
+
+
+def create_homework_submission_problem_results_table(
+    conn: sqlite3.Connection,
+) -> None:
+    """One row per (submission, problem) with its grading outcome.
+
+    Backs the admin wrong-problem list; rows are written whenever a
+    submission is created or reviewed, and backfilled here for existing ones.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS homework_submission_problem_results (
+            submission_id TEXT NOT NULL,
+            problem_id TEXT NOT NULL,
+            problem_index INTEGER NOT NULL,
             assignment_id TEXT NOT NULL,
             student_id TEXT NOT NULL,
-            answers_json TEXT NOT NULL,
-            submitted_at TEXT NOT NULL,
-            review_status TEXT NOT NULL DEFAULT 'pending',
-            reviewed_at TEXT,
-            reviewed_by TEXT,
-            problem_reviews_json TEXT,
+            problem_type TEXT NOT NULL,
+            is_correct INTEGER,
+            needs_revision INTEGER NOT NULL DEFAULT 0,
+            comment TEXT NOT NULL DEFAULT '',
+            student_answer TEXT,
+            is_wrong INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (submission_id, problem_id),
+            FOREIGN KEY (submission_id) REFERENCES homework_submissions(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_hw_problem_results_student_wrong "
+        "ON homework_submission_problem_results(student_id, is_wrong, assignment_id)"
+    )
+    _backfill_in_batches(
+        conn,
+        """
+        SELECT hs.id FROM homework_submissions hs
+        WHERE hs.id > ? AND NOT EXISTS (
+            SELECT 1 FROM homework_submission_problem_results r
+            WHERE r.submission_id = hs.id
+        )
+        ORDER BY hs.id
+        LIMIT ?
+        """,
+        refresh_submission_problem_results,
+    )
+
+
+def refresh_homework_assignment_stats(
+    conn: sqlite3.Connection, assignment_id: str
+) -> None:
+    """Recount one assignment's targets and submissions into homework_assignment_stats.
+
+    Status counts are distinct students with at least one submission in that
+    status, matching what the admin list has always reported.
+    """
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO homework_assignment_stats (
+            assignment_id, problem_count, total_students, submitted_count,
+            pending_count, approved_count, returned_count, updated_at
+        )
+        SELECT
+            ha.id,
+            CASE WHEN json_valid(ha.problems_json) AND json_type(ha.problems_json) = 'array'
+                 THEN json_array_length(ha.problems_json) ELSE 0 END,
+            (SELECT COUNT(*) FROM homework_assignment_targets hat
+             WHERE hat.assignment_id = ha.id),
+            COUNT(DISTINCT hs.student_id),
+            COUNT(DISTINCT CASE WHEN hs.review_status = 'pending' THEN hs.student_id END),
+            COUNT(DISTINCT CASE WHEN hs.review_status = 'approved' THEN hs.student_id END),
+            COUNT(DISTINCT CASE WHEN hs.review_status = 'returned' THEN hs.student_id END),
+            ?
+        FROM homework_assignments ha
+        LEFT JOIN homework_submissions hs ON hs.assignment_id = ha.id
+        WHERE ha.id = ?
+        GROUP BY ha.id
+        """,
+        (_now_iso(), assignment_id),
+    )
+
+
+def create_homework_assignment_stats_table(conn: sqlite3.Connection) -> None:
+    """Per-assignment counters for the admin assignment list.
+
+    Refreshed by the assignment create, submit and review paths; backfilled
+    here for existing assignments.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS homework_assignment_stats (
+            assignment_id TEXT PRIMARY KEY,
+            problem_count INTEGER NOT NULL DEFAULT 0,
+            total_students INTEGER NOT NULL DEFAULT 0,
+            submitted_count INTEGER NOT NULL DEFAULT 0,
+            pending_count INTEGER NOT NULL DEFAULT 0,
+            approved_count INTEGER NOT NULL DEFAULT 0,
+            returned_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL,
             FOREIGN KEY (assignment_id) REFERENCES homework_assignments(id) ON DELETE CASCADE
-        );
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_submissions_assignment_student "
+        "ON homework_submissions(assignment_id, student_id)"
+    )
+    _backfill_in_batches(
+        conn,
+        """
+        SELECT ha.id FROM homework_assignments ha
+        WHERE ha.id > ? AND NOT EXISTS (
+            SELECT 1 FROM homework_assignment_stats s
+            WHERE s.assignment_id = ha.id
+        )
+        ORDER BY ha.id
+        LIMIT ?
+        """,
+        refresh_homework_assignment_stats,
+    )
 
-        CREATE TABLE IF NOT EXISTS homework_submission_files (
-            id TEXT PRIMARY KEY,
-            submission_id TEXT NOT NULL,
-            stored_path TEXT NOT NULL,
-            original_name TEXT NOT NULL,
-            content_type TEXT NOT NULL,
-            size_bytes INTEGER NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (submission_id) REFERENCES homework_submissions(id) ON DELETE CASCADE
-        );
 
-        CREATE TABLE IF NOT EXISTS homework_import_batches (
-            id TEXT PRIMARY KEY,
-            week_key TEXT NOT NULL,
-            day_key TEXT NOT NULL,
-            payload_sha256 TEXT NOT NULL,
-            title TEXT,
-            description TEXT,
-            imported_by TEXT NOT NULL,
-            imported_at TEXT NOT NULL,
-            stats_json TEXT,
-            UNIQUE (week_key, day_key, payload_sha256)
-        );
-
-        CREATE TABLE IF NOT EXISTS homework_problems (
-            id TEXT PRIMARY KEY,
-            batch_id TEXT,
-            day_key TEXT,
-            order_index INTEGER NOT NULL,
-            type TEXT NOT NULL,
-            question TEXT NOT NULL,
-            options_json TEXT,
-            answer TEXT,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY (batch_id) REFERENCES homework_import_batches(id) ON DELETE SET NULL
-        );
+def _set_latest_submission(
+    conn: sqlite3.Connection,
+    *,
+    assignment_id: str,
+    student_id: str,
+    submission_id: str,
+) -> None:
+    conn.execute(
+        """
+        UPDATE homework_assignment_targets
+        SET latest_submission_id = ?
+        WHERE assignment_id = ? AND student_id = ?
+        """,
+        (submission_id, assignment_id, student_id),
+    )
+
+
+def create_homework_latest_submission_pointer(conn: sqlite3.Connection) -> None:
+    """Point each assignment target at its latest submission.
+
+    ``homework_assignment_targets.latest_submission_id`` is set whenever a
+    submission is created, so per-student homework queries join it directly
+    instead of picking the newest submission with a correlated subquery.
+    """
+    columns = _get_table_columns(conn, "homework_assignment_targets")
+    if "latest_submission_id" not in columns:
+        conn.execute(
+            "ALTER TABLE homework_assignment_targets ADD COLUMN latest_submission_id TEXT"
+        )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_assignment_targets_student "
+        "ON homework_assignment_targets(student_id, assignment_id, latest_submission_id)"
+    )
+    # Superset of the (assignment_id, student_id) index from 0016 that also
+    # serves the remaining "newest submission" lookups without a sort.
+    conn.execute("DROP INDEX IF EXISTS idx_homework_submissions_assignment_student")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_submissions_assignment_student_time "
+        "ON homework_submissions(assignment_id, student_id, submitted_at)"
+    )
+    conn.execute(
+        """
+        UPDATE homework_assignment_targets
+        SET latest_submission_id = (
+            SELECT hs.id
+            FROM homework_submissions hs
+            WHERE hs.assignment_id = homework_assignment_targets.assignment_id
+              AND hs.student_id = homework_assignment_targets.student_id
+            ORDER BY hs.submitted_at DESC
+            LIMIT 1
+        )
+        """
+    )
+
+
+def create_lookup_indexes(conn: sqlite3.Connection) -> None:
+    """Indexes for lookups the query-plan guard found scanning whole tables."""
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_submission_files_submission "
+        "ON homework_submission_files(submission_id, created_at)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_graph_versions_status_created "
+        "ON graph_versions(status, created_at)"
+    )
+
 
-        CREATE TABLE IF NOT EXISTS homework_labels (
+def create_refresh_token_families(conn: sqlite3.Connection) -> None:
+    """Refresh-token families for rotation with reuse detection.
+
+    Every login starts a family; each refresh revokes the presented token,
+    records its successor in ``replaced_by_id`` and issues the successor in
+    the same family. Presenting an already-rotated token revokes the family.
+    """
+    columns = _get_table_columns(conn, "refresh_tokens")
+    if "family_id" not in columns:
+        conn.execute("ALTER TABLE refresh_tokens ADD COLUMN family_id TEXT")
+    if "replaced_by_id" not in columns:
+        conn.execute("ALTER TABLE refresh_tokens ADD COLUMN replaced_by_id TEXT")
+    conn.execute("UPDATE refresh_tokens SET family_id = id WHERE family_id IS NULL")
+    # Covers the whole refresh lookup, so validation never touches the table.
+    conn.execute("DROP INDEX IF EXISTS idx_refresh_tokens_hash")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_lookup ON refresh_tokens"
+        "(token_hash, revoked_at, expires_at, user_id, family_id, replaced_by_id, id)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family ON refresh_tokens(family_id)"
+    )
+    # Sweeper access paths: expired rows, and revoked rows that were not rotated.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_expires ON refresh_tokens(expires_at)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_refresh_tokens_revoked ON refresh_tokens(revoked_at) "
+        "WHERE revoked_at IS NOT NULL AND replaced_by_id IS NULL"
+    )
+
+
+def create_notification_outbox(conn: sqlite3.Connection) -> None:
+    """Durable queue of outgoing notifications.
+
+    Rows are written in the transaction that creates what they announce and
+    drained by ``notification_outbox.NotificationSender``. ``status`` moves
+    pending -> sending -> sent | skipped | failed; a ``sending`` row whose
+    ``locked_until`` has passed belongs to a sender that died and is claimed
+    again.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification_outbox (
             id TEXT PRIMARY KEY,
-            key TEXT NOT NULL UNIQUE,
-            label TEXT NOT NULL,
             kind TEXT NOT NULL,
-            created_by TEXT NOT NULL,
+            payload_json TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TEXT NOT NULL,
+            locked_until TEXT,
+            last_error TEXT,
             created_at TEXT NOT NULL,
-            archived_at TEXT
-        );
+            finished_at TEXT
+        )
+        """
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notification_outbox_due "
+        "ON notification_outbox(status, next_attempt_at)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notification_outbox_finished "
+        "ON notification_outbox(finished_at) WHERE finished_at IS NOT NULL"
+    )
 
-        CREATE TABLE IF NOT EXISTS homework_problem_labels (
-            problem_id TEXT NOT NULL,
-            label_id TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            PRIMARY KEY (problem_id, label_id),
-            FOREIGN KEY (problem_id) REFERENCES homework_problems(id) ON DELETE CASCADE,
-            FOREIGN KEY (label_id) REFERENCES homework_labels(id) ON DELETE CASCADE
-        );
 
-        CREATE TABLE IF NOT EXISTS users (
-            id TEXT PRIMARY KEY,
-            username TEXT NOT NULL UNIQUE,
-            email TEXT NOT NULL UNIQUE,
-            name TEXT NOT NULL,
-            grade TEXT NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'active',
-            praise_sticker_enabled INTEGER NOT NULL DEFAULT 0,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            last_login_at TEXT
-        );
+def drop_admin_account_fingerprint(conn: sqlite3.Connection) -> None:
+    """Delete the admin fingerprint earlier releases stored in app_metadata.
 
-        CREATE TABLE IF NOT EXISTS refresh_tokens (
-            id TEXT PRIMARY KEY,
-            user_id TEXT NOT NULL,
-            token_hash TEXT NOT NULL,
-            expires_at TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            revoked_at TEXT,
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        );
-
-        CREATE TABLE IF NOT EXISTS student_profiles (
-            student_id TEXT PRIMARY KEY,
-            survey_json TEXT,
-            placement_json TEXT,
-            estimated_level TEXT,
-            weak_tags_json TEXT,
+    It was an HMAC of the admin password keyed with JWT_SECRET, which is fast
+    to brute-force for anyone holding the database and the environment.
+    """
+    conn.execute("DELETE FROM app_metadata WHERE key = 'admin_account_fingerprint'")
+
+
+def create_homework_blobs(conn: sqlite3.Connection) -> None:
+    """Content-addressed storage for submission files.
+
+    ``homework_blobs`` has one row per distinct file content (SHA-256).
+    ``ref_count`` counts the ``homework_submission_files`` rows pointing at it
+    and is kept by triggers, so rows removed by ``ON DELETE CASCADE`` release
+    their blob too. ``released_at`` records when the count last dropped to
+    zero; the garbage collector only removes blobs released long enough ago.
+    Rows from before this migration keep ``blob_sha256`` NULL and their
+    original ``stored_path``.
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS homework_blobs (
+            sha256 TEXT PRIMARY KEY,
+            size_bytes INTEGER NOT NULL,
+            content_type TEXT NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
             created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL,
-            FOREIGN KEY (student_id) REFERENCES users(username) ON DELETE CASCADE
-        );
+            released_at TEXT
+        )
+        """
+    )
+    if "blob_sha256" not in _get_table_columns(conn, "homework_submission_files"):
+        conn.execute("ALTER TABLE homework_submission_files ADD COLUMN blob_sha256 TEXT")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_submission_files_blob "
+        "ON homework_submission_files(blob_sha256) WHERE blob_sha256 IS NOT NULL"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_homework_blobs_released "
+        "ON homework_blobs(released_at) WHERE ref_count <= 0"
+    )
+    # Shared by the delete and update triggers: drop one reference and stamp
+    # released_at when it was the last one.
+    release = """
+            UPDATE homework_blobs
+            SET ref_count = ref_count - 1,
+                released_at = CASE
+                    WHEN ref_count <= 1 THEN strftime('%Y-%m-%dT%H:%M:%S+00:00', 'now')
+                    ELSE released_at
+                END
+            WHERE sha256 = OLD.blob_sha256;
+    """
+    acquire = """
+            UPDATE homework_blobs SET ref_count = ref_count + 1, released_at = NULL
+            WHERE sha256 = NEW.blob_sha256;
+    """
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_homework_submission_files_blob_insert "
+        "AFTER INSERT ON homework_submission_files WHEN NEW.blob_sha256 IS NOT NULL "
+        f"BEGIN {acquire} END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_homework_submission_files_blob_delete "
+        "AFTER DELETE ON homework_submission_files WHEN OLD.blob_sha256 IS NOT NULL "
+        f"BEGIN {release} END"
+    )
+    conn.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_homework_submission_files_blob_update "
+        "AFTER UPDATE OF blob_sha256 ON homework_submission_files "
+        "WHEN OLD.blob_sha256 IS NOT NEW.blob_sha256 "
+        f"BEGIN {acquire} {release} END"
+    )
 
-        CREATE TABLE IF NOT EXISTS praise_stickers (
-            id TEXT PRIMARY KEY,
-            student_id TEXT NOT NULL,
-            count INTEGER NOT NULL,
-            reason TEXT NOT NULL,
-            reason_type TEXT NOT NULL,
-            homework_id TEXT,
-            granted_by TEXT,
-            granted_at TEXT NOT NULL,
-            FOREIGN KEY (student_id) REFERENCES users(username) ON DELETE CASCADE
-        );
-
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username);
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
-        CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
-        CREATE INDEX IF NOT EXISTS idx_refresh_tokens_hash ON refresh_tokens(token_hash);
-        CREATE INDEX IF NOT EXISTS idx_student_profiles_student_id ON student_profiles(student_id);
-        CREATE INDEX IF NOT EXISTS idx_praise_stickers_student_id ON praise_stickers(student_id);
-        CREATE INDEX IF NOT EXISTS idx_praise_stickers_student_granted_at ON praise_stickers(student_id, granted_at);
-
-        CREATE INDEX IF NOT EXISTS idx_homework_problems_batch_id ON homework_problems(batch_id);
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_homework_problems_batch_order_unique ON homework_problems(batch_id, order_index);
-        CREATE INDEX IF NOT EXISTS idx_homework_problems_day_order ON homework_problems(day_key, order_index);
-        CREATE INDEX IF NOT EXISTS idx_homework_problem_labels_label_id ON homework_problem_labels(label_id);
+
+def _get_metadata(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    try:
+        row = conn.execute(
+            "SELECT value FROM app_metadata WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        # Table not created yet on a fresh database.
+        return None
+    return row["value"] if row else None
+
+
+def _set_metadata(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute(
         """
+        INSERT INTO app_metadata (key, value, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """,
+        (key, value, _now_iso()),
     )
-    _ensure_homework_review_columns(conn)
-    _ensure_homework_scheduled_at_column(conn)
-    _ensure_homework_sticker_reward_count_column(conn)
-    _ensure_user_columns(conn)
-    _ensure_refresh_token_columns(conn)
-    create_student_skill_levels_table(conn)
-    create_study_sessions_table(conn)
-    migrate_study_sessions_add_diagnosis(conn)
-    create_study_responses_table(conn)
-    create_homework_label_structures_table(conn)
-    create_homework_label_mapping_events_table(conn)
+
+
+def get_app_metadata(key: str, path: Optional[Path] = None) -> Optional[str]:
+    conn = connect(path)
+    try:
+        return _get_metadata(conn, key)
+    finally:
+        conn.close()
+
+
+def set_app_metadata(key: str, value: str, path: Optional[Path] = None) -> None:
+    conn = connect(path)
+    try:
+        _set_metadata(conn, key, value)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+CORE_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS app_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS graph_versions (
+    id TEXT PRIMARY KEY,
+    graph_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    schema_version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    published_at TEXT,
+    problem_set_version_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS schema_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    applied_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    graph_version_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    label TEXT NOT NULL,
+    text TEXT,
+    meta_json TEXT,
+    order_value REAL,
+    PRIMARY KEY (graph_version_id, id),
+    FOREIGN KEY (graph_version_id) REFERENCES graph_versions(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS edges (
+    graph_version_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    edge_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    note TEXT,
+    PRIMARY KEY (graph_version_id, id),
+    FOREIGN KEY (graph_version_id) REFERENCES graph_versions(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS problems (
+    id TEXT PRIMARY KEY,
+    node_id TEXT NOT NULL,
+    order_value INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    grading_json TEXT NOT NULL,
+    answer_json TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS attempts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    graph_version_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    problem_id TEXT NOT NULL,
+    input_raw TEXT NOT NULL,
+    input_normalized TEXT NOT NULL,
+    is_correct INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS homework_assignments (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT,
+    problems_json TEXT NOT NULL,
+    due_at TEXT,
+    scheduled_at TEXT,
+    sticker_reward_count INTEGER NOT NULL DEFAULT 2,
+    created_by TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS homework_assignment_targets (
+    assignment_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    assigned_at TEXT NOT NULL,
+    PRIMARY KEY (assignment_id, student_id),
+    FOREIGN KEY (assignment_id) REFERENCES homework_assignments(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS homework_submissions (
+    id TEXT PRIMARY KEY,
+    assignment_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    answers_json TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    review_status TEXT NOT NULL DEFAULT 'pending',
+    reviewed_at TEXT,
+    reviewed_by TEXT,
+    problem_reviews_json TEXT,
+    FOREIGN KEY (assignment_id) REFERENCES homework_assignments(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS homework_submission_files (
+    id TEXT PRIMARY KEY,
+    submission_id TEXT NOT NULL,
+    stored_path TEXT NOT NULL,
+    original_name TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (submission_id) REFERENCES homework_submissions(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS homework_import_batches (
+    id TEXT PRIMARY KEY,
+    week_key TEXT NOT NULL,
+    day_key TEXT NOT NULL,
+    payload_sha256 TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    imported_by TEXT NOT NULL,
+    imported_at TEXT NOT NULL,
+    stats_json TEXT,
+    UNIQUE (week_key, day_key, payload_sha256)
+);
+
+CREATE TABLE IF NOT EXISTS homework_problems (
+    id TEXT PRIMARY KEY,
+    batch_id TEXT,
+    day_key TEXT,
+    order_index INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    question TEXT NOT NULL,
+    options_json TEXT,
+    answer TEXT,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (batch_id) REFERENCES homework_import_batches(id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS homework_labels (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    label TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created_by TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    archived_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS homework_problem_labels (
+    problem_id TEXT NOT NULL,
+    label_id TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (problem_id, label_id),
+    FOREIGN KEY (problem_id) REFERENCES homework_problems(id) ON DELETE CASCADE,
+    FOREIGN KEY (label_id) REFERENCES homework_labels(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    praise_sticker_enabled INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    last_login_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    token_hash TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    revoked_at TEXT,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS student_profiles (
+    student_id TEXT PRIMARY KEY,
+    survey_json TEXT,
+    placement_json TEXT,
+    estimated_level TEXT,
+    weak_tags_json TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    FOREIGN KEY (student_id) REFERENCES users(username) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS praise_stickers (
+    id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    reason_type TEXT NOT NULL,
+    homework_id TEXT,
+    granted_by TEXT,
+    granted_at TEXT NOT NULL,
+    FOREIGN KEY (student_id) REFERENCES users(username) ON DELETE CASCADE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_id ON refresh_tokens(user_id);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_hash ON refresh_tokens(token_hash);
+CREATE INDEX IF NOT EXISTS idx_student_profiles_student_id ON student_profiles(student_id);
+CREATE INDEX IF NOT EXISTS idx_praise_stickers_student_id ON praise_stickers(student_id);
+CREATE INDEX IF NOT EXISTS idx_praise_stickers_student_granted_at ON praise_stickers(student_id, granted_at);
+
+CREATE INDEX IF NOT EXISTS idx_homework_problems_batch_id ON homework_problems(batch_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_homework_problems_batch_order_unique ON homework_problems(batch_id, order_index);
+CREATE INDEX IF NOT EXISTS idx_homework_problems_day_order ON homework_problems(day_key, order_index);
+CREATE INDEX IF NOT EXISTS idx_homework_problem_labels_label_id ON homework_problem_labels(label_id);
+"""
+
+
+def create_core_tables(conn: sqlite3.Connection) -> None:
+    """Run CORE_SCHEMA_SQL statement by statement.
+
+    Unlike executescript this does not commit, so it can run inside the
+    migration transaction.
+    """
+    statement = ""
+    for line in CORE_SCHEMA_SQL.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def insert_default_schema_version(conn: sqlite3.Connection) -> None:
     conn.execute(
         """
         INSERT INTO schema_version (id, version, applied_at)
@@ -550,9 +1621,23 @@ def init_db(path=None) -> None:
         """,
         (DEFAULT_SCHEMA_VERSION, _now_iso()),
     )
-    conn.commit()
-    if _owns_conn:
-        conn.close()
+
+
+def init_db(path=None, *, dry_run: bool = False) -> List[str]:
+    """Apply pending schema migrations (see app/migrations.py).
+
+    Returns the ids of the migrations applied, or of those that would be
+    applied when ``dry_run`` is set. An up-to-date database costs one query.
+    """
+    from .migrations import apply_migrations
+
+    _owns_conn = not isinstance(path, sqlite3.Connection)
+    conn = path if isinstance(path, sqlite3.Connection) else connect(path)
+    try:
+        return apply_migrations(conn, dry_run=dry_run)
+    finally:
+        if _owns_conn:
+            conn.close()
 
 
 def _set_schema_version(conn: sqlite3.Connection, version: int) -> None:
@@ -705,122 +1790,174 @@ def _normalize_nodes(nodes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return normalized
 
 
-def _normalize_edges(edges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    normalized: List[Dict[str, Any]] = []
-    for edge in edges:
-        if "id" not in edge:
-            if edge.get("source") and edge.get("target"):
-                edge_id = f"{edge.get('edgeType', 'prereq')}:{edge['source']}->{edge['target']}"
-            else:
-                raise ValueError("Edge entry missing required field 'id'")
-        else:
-            edge_id = edge["id"]
-        normalized.append(
-            {
-                "id": edge_id,
-                "edgeType": edge.get("edgeType", "prereq"),
-                "source": edge["source"],
-                "target": edge["target"],
-                "note": edge.get("note"),
-            }
-        )
-    _ensure_unique_entries(normalized, "id", "edge")
-    return normalized
+def _normalize_edges(edges: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    normalized: List[Dict[str, Any]] = []
+    for edge in edges:
+        if "id" not in edge:
+            if edge.get("source") and edge.get("target"):
+                edge_id = f"{edge.get('edgeType', 'prereq')}:{edge['source']}->{edge['target']}"
+            else:
+                raise ValueError("Edge entry missing required field 'id'")
+        else:
+            edge_id = edge["id"]
+        normalized.append(
+            {
+                "id": edge_id,
+                "edgeType": edge.get("edgeType", "prereq"),
+                "source": edge["source"],
+                "target": edge["target"],
+                "note": edge.get("note"),
+            }
+        )
+    _ensure_unique_entries(normalized, "id", "edge")
+    return normalized
+
+
+def _normalize_problems(problems: List[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    rows: List[Tuple[Any, ...]] = []
+    for problem in problems:
+        missing = [
+            key
+            for key in ("problemId", "nodeId", "order", "prompt")
+            if key not in problem
+        ]
+        if missing:
+            raise ValueError(
+                f"Problem entry missing required field(s): {', '.join(missing)}"
+            )
+        rows.append(
+            (
+                problem["problemId"],
+                problem["nodeId"],
+                int(problem["order"]),
+                problem["prompt"],
+                json.dumps(problem.get("grading", {})),
+                json.dumps(problem.get("answer", {})),
+            )
+        )
+    _ensure_unique_entries(
+        [{"id": row[0]} for row in rows], "id", "problem"
+    )
+    return rows
+
+
+def import_graph_versions(
+    conn: sqlite3.Connection, data: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Bulk-load the graph versions and problems described by a seed payload.
+
+    Everything is normalized and checked for duplicates in memory before any
+    row is written; rows are then inserted with executemany on ``conn``. The
+    caller owns the transaction. Returns row counts and timings in seconds.
+    """
+    started = time.perf_counter()
+    schema_version = int(data.get("schemaVersion", DEFAULT_SCHEMA_VERSION))
+    graph_id = _resolve_graph_id(data)
+    problem_set_version_id = data.get("problemSetVersionId")
+
+    versions: List[Tuple[str, Dict[str, Any]]] = []
+    if "draft" in data or "published" in data:
+        for status in ("draft", "published"):
+            if data.get(status):
+                versions.append((status, data[status]))
+    elif "nodes" in data and "edges" in data:
+        versions.append(("draft", data))
+    else:
+        raise ValueError("Seed data format is not supported.")
+
+    normalized = [
+        (
+            status,
+            _normalize_nodes(graph.get("nodes") or []),
+            _normalize_edges(graph.get("edges") or []),
+        )
+        for status, graph in versions
+    ]
+    problem_rows = _normalize_problems(data.get("problems", []))
+    validated = time.perf_counter()
+
+    _set_schema_version(conn, schema_version)
+    created_at = _now_iso()
+    node_count = 0
+    edge_count = 0
+    for status, nodes, edges in normalized:
+        graph_version_id = _insert_graph_version(
+            conn,
+            graph_id=graph_id,
+            status=status,
+            schema_version=schema_version,
+            created_at=created_at,
+            published_at=_now_iso() if status == "published" else None,
+            problem_set_version_id=problem_set_version_id,
+        )
+        _insert_nodes(conn, graph_version_id, nodes)
+        _insert_edges(conn, graph_version_id, edges)
+        node_count += len(nodes)
+        edge_count += len(edges)
+
+    # Problems are not versioned; a re-import refreshes existing rows.
+    conn.executemany(
+        """
+        INSERT INTO problems (id, node_id, order_value, prompt, grading_json, answer_json)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            node_id = excluded.node_id,
+            order_value = excluded.order_value,
+            prompt = excluded.prompt,
+            grading_json = excluded.grading_json,
+            answer_json = excluded.answer_json
+        """,
+        problem_rows,
+    )
+    finished = time.perf_counter()
+
+    return {
+        "graphVersions": len(normalized),
+        "nodes": node_count,
+        "edges": edge_count,
+        "problems": len(problem_rows),
+        "validateSeconds": round(validated - started, 6),
+        "insertSeconds": round(finished - validated, 6),
+    }
+
 
+def seed_db(
+    path: Optional[Path] = None, seed_path: Optional[Path] = None
+) -> Optional[Dict[str, Any]]:
+    """Load the seed curriculum into an empty database.
 
-def seed_db(path: Optional[Path] = None, seed_path: Optional[Path] = None) -> None:
+    Returns import statistics (see ``import_graph_versions``) plus parse and
+    total timings, or None when there was nothing to do.
+    """
     db_path = path or get_database_path()
     seed_file = seed_path or get_seed_path()
     if not seed_file.exists():
-        return
+        return None
 
+    started = time.perf_counter()
     conn = connect(db_path)
     try:
+        # Only an empty database is seeded, so a populated one costs this
+        # count and nothing else; newer curricula go through
+        # import_graph_versions.
         existing = conn.execute(
             "SELECT COUNT(*) AS count FROM graph_versions"
         ).fetchone()
         if existing and existing["count"] > 0:
-            return
-
-        data = json.loads(seed_file.read_text(encoding="utf-8"))
-        schema_version = int(data.get("schemaVersion", DEFAULT_SCHEMA_VERSION))
-        _set_schema_version(conn, schema_version)
-
-        graph_id = _resolve_graph_id(data)
-        created_at = _now_iso()
-        problem_set_version_id = data.get("problemSetVersionId")
-
-        if "draft" in data or "published" in data:
-            draft = data.get("draft")
-            if draft:
-                draft_nodes = _normalize_nodes(draft.get("nodes") or [])
-                draft_edges = _normalize_edges(draft.get("edges") or [])
-                draft_id = _insert_graph_version(
-                    conn,
-                    graph_id=graph_id,
-                    status="draft",
-                    schema_version=schema_version,
-                    created_at=created_at,
-                    published_at=None,
-                    problem_set_version_id=problem_set_version_id,
-                )
-                _insert_nodes(conn, draft_id, draft_nodes)
-                _insert_edges(conn, draft_id, draft_edges)
-
-            published = data.get("published")
-            if published:
-                published_nodes = _normalize_nodes(published.get("nodes") or [])
-                published_edges = _normalize_edges(published.get("edges") or [])
-                published_at = _now_iso()
-                published_id = _insert_graph_version(
-                    conn,
-                    graph_id=graph_id,
-                    status="published",
-                    schema_version=schema_version,
-                    created_at=created_at,
-                    published_at=published_at,
-                    problem_set_version_id=problem_set_version_id,
-                )
-                _insert_nodes(conn, published_id, published_nodes)
-                _insert_edges(conn, published_id, published_edges)
-        elif "nodes" in data and "edges" in data:
-            draft_nodes = _normalize_nodes(data.get("nodes") or [])
-            draft_edges = _normalize_edges(data.get("edges") or [])
-            draft_id = _insert_graph_version(
-                conn,
-                graph_id=graph_id,
-                status="draft",
-                schema_version=schema_version,
-                created_at=created_at,
-                published_at=None,
-                problem_set_version_id=problem_set_version_id,
-            )
-            _insert_nodes(conn, draft_id, draft_nodes)
-            _insert_edges(conn, draft_id, draft_edges)
-        else:
-            raise ValueError("Seed data format is not supported.")
-
-        problems = data.get("problems", [])
-        for problem in problems:
-            conn.execute(
-                """
-                INSERT INTO problems (id, node_id, order_value, prompt, grading_json, answer_json)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    problem["problemId"],
-                    problem["nodeId"],
-                    int(problem["order"]),
-                    problem["prompt"],
-                    json.dumps(problem.get("grading", {})),
-                    json.dumps(problem.get("answer", {})),
-                ),
-            )
+            return None
 
+        data = json.loads(seed_file.read_bytes().decode("utf-8"))
+        parsed = time.perf_counter()
+        stats = import_graph_versions(conn, data)
         conn.commit()
+        invalidate_graph_cache(db_path)
     finally:
         conn.close()
 
+    stats["parseSeconds"] = round(parsed - started, 6)
+    stats["totalSeconds"] = round(time.perf_counter() - started, 6)
+    return stats
+
 
 def _insert_graph_version(
     conn: sqlite3.Connection,
@@ -861,20 +1998,21 @@ def _insert_graph_version(
 def _insert_nodes(
     conn: sqlite3.Connection, graph_version_id: str, nodes: List[Dict[str, Any]]
 ) -> None:
-    for node in nodes:
-        try:
-            conn.execute(
-                """
-                INSERT INTO nodes (
-                    graph_version_id,
-                    id,
-                    node_type,
-                    label,
-                    text,
-                    meta_json,
-                    order_value
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
+    """Insert pre-validated nodes (see ``_normalize_nodes``) in one batch."""
+    try:
+        conn.executemany(
+            """
+            INSERT INTO nodes (
+                graph_version_id,
+                id,
+                node_type,
+                label,
+                text,
+                meta_json,
+                order_value
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
                 (
                     graph_version_id,
                     node["id"],
@@ -883,30 +2021,33 @@ def _insert_nodes(
                     node.get("text"),
                     json.dumps(node.get("meta", {})),
                     node.get("order"),
-                ),
-            )
-        except sqlite3.IntegrityError as exc:
-            raise ValueError(
-                f"Duplicate node id '{node['id']}' for graph version '{graph_version_id}'."
-            ) from exc
+                )
+                for node in nodes
+            ),
+        )
+    except sqlite3.IntegrityError as exc:
+        raise ValueError(
+            f"Duplicate node id for graph version '{graph_version_id}': {exc}"
+        ) from exc
 
 
 def _insert_edges(
     conn: sqlite3.Connection, graph_version_id: str, edges: List[Dict[str, Any]]
 ) -> None:
-    for edge in edges:
-        try:
-            conn.execute(
-                """
-                INSERT INTO edges (
-                    graph_version_id,
-                    id,
-                    edge_type,
-                    source,
-                    target,
-                    note
-                ) VALUES (?, ?, ?, ?, ?, ?)
-                """,
+    """Insert pre-validated edges (see ``_normalize_edges``) in one batch."""
+    try:
+        conn.executemany(
+            """
+            INSERT INTO edges (
+                graph_version_id,
+                id,
+                edge_type,
+                source,
+                target,
+                note
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
                 (
                     graph_version_id,
                     edge["id"],
@@ -914,50 +2055,59 @@ def _insert_edges(
                     edge["source"],
                     edge["target"],
                     edge.get("note"),
-                ),
-            )
-        except sqlite3.IntegrityError as exc:
-            raise ValueError(
-                f"Duplicate edge id '{edge['id']}' for graph version '{graph_version_id}'."
-            ) from exc
+                )
+                for edge in edges
+            ),
+        )
+    except sqlite3.IntegrityError as exc:
+        raise ValueError(
+            f"Duplicate edge id for graph version '{graph_version_id}': {exc}"
+        ) from exc
 
 
-def _fetch_latest_graph_sqlite(
-    status: str, path: Optional[Path] = None
-) -> Optional[Dict[str, Any]]:
-    conn = connect(path)
+def _latest_graph_version_row(
+    conn: sqlite3.Connection, status: str
+) -> Optional[sqlite3.Row]:
     order_by = (
         "published_at DESC, created_at DESC"
         if status == "published"
         else "created_at DESC"
     )
-    row = conn.execute(
+    return conn.execute(
         f"SELECT id, schema_version FROM graph_versions WHERE status = ? ORDER BY {order_by} LIMIT 1",
         (status,),
     ).fetchone()
-    if not row:
-        conn.close()
-        return None
 
-    nodes_rows = conn.execute(
-        """
-        SELECT id, node_type, label, text, meta_json, order_value
-        FROM nodes
-        WHERE graph_version_id = ?
-        ORDER BY COALESCE(order_value, 1e18), id
-        """,
-        (row["id"],),
-    ).fetchall()
-    edges_rows = conn.execute(
-        """
-        SELECT id, edge_type, source, target, note
-        FROM edges
-        WHERE graph_version_id = ?
-        ORDER BY id
-        """,
-        (row["id"],),
-    ).fetchall()
-    conn.close()
+
+def _fetch_latest_graph_sqlite(
+    status: str, path: Optional[Path] = None
+) -> Optional[GraphSnapshot]:
+    conn = connect(path)
+    try:
+        row = _latest_graph_version_row(conn, status)
+        if not row:
+            return None
+
+        nodes_rows = conn.execute(
+            """
+            SELECT id, node_type, label, text, meta_json, order_value
+            FROM nodes
+            WHERE graph_version_id = ?
+            ORDER BY COALESCE(order_value, 1e18), id
+            """,
+            (row["id"],),
+        ).fetchall()
+        edges_rows = conn.execute(
+            """
+            SELECT id, edge_type, source, target, note
+            FROM edges
+            WHERE graph_version_id = ?
+            ORDER BY id
+            """,
+            (row["id"],),
+        ).fetchall()
+    finally:
+        conn.close()
 
     nodes = [
         {
@@ -980,11 +2130,15 @@ def _fetch_latest_graph_sqlite(
         }
         for edge in edges_rows
     ]
-    return {
-        "schemaVersion": row["schema_version"],
-        "nodes": nodes,
-        "edges": edges,
-    }
+    return build_graph_snapshot(
+        graph_version_id=row["id"],
+        status=status,
+        payload={
+            "schemaVersion": row["schema_version"],
+            "nodes": nodes,
+            "edges": edges,
+        },
+    )
 
 
 def _get_active_graph_version_id(conn: sqlite3.Connection) -> Optional[str]:
@@ -1015,33 +2169,33 @@ def _fetch_problems_sqlite(
     node_id: str, path: Optional[Path] = None
 ) -> Optional[List[Dict[str, Any]]]:
     conn = connect(path)
-    active_graph_id = _get_active_graph_version_id(conn)
-    if not active_graph_id:
-        conn.close()
-        return None
+    try:
+        active_graph_id = _get_active_graph_version_id(conn)
+        if not active_graph_id:
+            return None
 
-    node_row = conn.execute(
-        """
-        SELECT 1 FROM nodes
-        WHERE graph_version_id = ? AND id = ?
-        LIMIT 1
-        """,
-        (active_graph_id, node_id),
-    ).fetchone()
-    if not node_row:
-        conn.close()
-        return None
+        node_row = conn.execute(
+            """
+            SELECT 1 FROM nodes
+            WHERE graph_version_id = ? AND id = ?
+            LIMIT 1
+            """,
+            (active_graph_id, node_id),
+        ).fetchone()
+        if not node_row:
+            return None
 
-    problem_rows = conn.execute(
-        """
-        SELECT id, node_id, order_value, prompt, grading_json, answer_json
-        FROM problems
-        WHERE node_id = ?
-        ORDER BY order_value ASC, id ASC
-        """,
-        (node_id,),
-    ).fetchall()
-    conn.close()
+        problem_rows = conn.execute(
+            """
+            SELECT id, node_id, order_value, prompt, grading_json, answer_json
+            FROM problems
+            WHERE node_id = ?
+            ORDER BY order_value ASC, id ASC
+            """,
+            (node_id,),
+        ).fetchall()
+    finally:
+        conn.close()
 
     problems = [
         {
@@ -1057,12 +2211,38 @@ def _fetch_problems_sqlite(
     return problems
 
 
+def fetch_latest_graph_snapshot(
+    status: str, path: Optional[Path] = None
+) -> Optional[GraphSnapshot]:
+    """Return the latest SQLite graph for ``status``, built once per version.
+
+    Warm calls only look up the latest version id, so versions written by
+    another process (``scripts/import_graph_version.py``) are picked up on
+    the next request; ``seed_db`` also invalidates the cache directly.
+    """
+    db_path = path or get_database_path()
+    snapshot = get_graph_snapshot(db_path, status)
+    if snapshot is not None:
+        conn = connect(db_path)
+        try:
+            row = _latest_graph_version_row(conn, status)
+        finally:
+            conn.close()
+        if row is not None and row["id"] == snapshot.graph_version_id:
+            return snapshot
+    snapshot = _fetch_latest_graph_sqlite(status, db_path)
+    if snapshot is None:
+        return None
+    return store_graph_snapshot(db_path, snapshot)
+
+
 def fetch_latest_graph(
     status: str, path: Optional[Path] = None
 ) -> Optional[Dict[str, Any]]:
     backend = get_graph_storage_backend()
     if backend == "sqlite":
-        return _fetch_latest_graph_sqlite(status, path)
+        snapshot = fetch_latest_graph_snapshot(status, path)
+        return snapshot.payload if snapshot else None
     prepare_graph_storage(path or get_database_path())
     return get_neo4j_graph_store().fetch_latest_graph(status)
 
@@ -1082,6 +2262,96 @@ def fetch_problems(
 # ============================================================
 
 
+class UserCache:
+    """LRU of ``users`` rows by id and by username, per database.
+
+    Every helper that writes ``users`` invalidates the affected row after it
+    commits. The TTL only bounds staleness for writes made outside db.py.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (db path, "id" | "username", value) -> (expires at, row)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, db_key: str, field: str, value: str) -> Optional[Dict[str, Any]]:
+        key = (db_key, field, value)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(entry[1])
+
+    def put(self, db_key: str, row: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        entry = (time.monotonic() + self.ttl_seconds, dict(row))
+        with self._lock:
+            for field in ("id", "username"):
+                key = (db_key, field, row[field])
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(
+        self, db_key: str, *, user_id: Optional[str] = None, username: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self._stats["invalidations"] += 1
+            for field, value in (("id", user_id), ("username", username)):
+                if value is None:
+                    continue
+                entry = self._entries.pop((db_key, field, value), None)
+                if entry is not None:
+                    row = entry[1]
+                    self._entries.pop((db_key, "id", row["id"]), None)
+                    self._entries.pop((db_key, "username", row["username"]), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+_user_cache = UserCache(
+    max_entries=_get_env_int("USER_CACHE_SIZE", 10000),
+    ttl_seconds=float(_get_env_int("USER_CACHE_TTL_SECONDS", 300)),
+)
+
+
+def get_user_cache() -> UserCache:
+    return _user_cache
+
+
+register_collector(
+    "user_cache",
+    lambda: cache_families("user_cache", "users row cache", _user_cache.stats()),
+)
+
+
+def _user_cache_key(path: Optional[Path]) -> str:
+    return str(path or get_database_path())
+
+
+_USER_COLUMNS = """id, username, email, name, grade, password_hash, role, status, praise_sticker_enabled,
+                   created_at, updated_at, last_login_at"""
+
+
 def create_user(
     *,
     username: str,
@@ -1131,22 +2401,24 @@ def create_user(
 
 
 def get_user_by_username(
-    username: str, path: Optional[Path] = None
+    username: str,
+    path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> Optional[Dict[str, Any]]:
-    conn = connect(path)
-    try:
+    db_key = _user_cache_key(path)
+    cached = _user_cache.get(db_key, "username", username)
+    if cached is not None:
+        return cached
+    with _borrow_connection(path, conn) as conn:
         row = conn.execute(
-            """
-            SELECT id, username, email, name, grade, password_hash, role, status, praise_sticker_enabled,
-                   created_at, updated_at, last_login_at
-            FROM users
-            WHERE username = ?
-            """,
+            f"SELECT {_USER_COLUMNS} FROM users WHERE username = ?",
             (username,),
         ).fetchone()
-        return dict(row) if row else None
-    finally:
-        conn.close()
+    if not row:
+        return None
+    user = dict(row)
+    _user_cache.put(db_key, user)
+    return user
 
 
 def get_user_by_email(
@@ -1155,12 +2427,7 @@ def get_user_by_email(
     conn = connect(path)
     try:
         row = conn.execute(
-            """
-            SELECT id, username, email, name, grade, password_hash, role, status, praise_sticker_enabled,
-                   created_at, updated_at, last_login_at
-            FROM users
-            WHERE email = ?
-            """,
+            f"SELECT {_USER_COLUMNS} FROM users WHERE email = ?",
             (email,),
         ).fetchone()
         return dict(row) if row else None
@@ -1171,20 +2438,23 @@ def get_user_by_email(
 def get_user_by_id(
     user_id: str, path: Optional[Path] = None
 ) -> Optional[Dict[str, Any]]:
+    db_key = _user_cache_key(path)
+    cached = _user_cache.get(db_key, "id", user_id)
+    if cached is not None:
+        return cached
     conn = connect(path)
     try:
         row = conn.execute(
-            """
-            SELECT id, username, email, name, grade, password_hash, role, status, praise_sticker_enabled,
-                   created_at, updated_at, last_login_at
-            FROM users
-            WHERE id = ?
-            """,
+            f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?",
             (user_id,),
         ).fetchone()
-        return dict(row) if row else None
     finally:
         conn.close()
+    if not row:
+        return None
+    user = dict(row)
+    _user_cache.put(db_key, user)
+    return user
 
 
 def list_users(
@@ -1233,6 +2503,7 @@ def update_user_praise_sticker_enabled(
             (1 if enabled else 0, now, username),
         )
         conn.commit()
+        _user_cache.invalidate(_user_cache_key(path), username=username)
         return result.rowcount > 0
     finally:
         conn.close()
@@ -1247,6 +2518,7 @@ def update_last_login(user_id: str, path: Optional[Path] = None) -> None:
             (now, now, user_id),
         )
         conn.commit()
+        _user_cache.invalidate(_user_cache_key(path), user_id=user_id)
     finally:
         conn.close()
 
@@ -1262,6 +2534,7 @@ def update_user_password(
             (password_hash, now, user_id),
         )
         conn.commit()
+        _user_cache.invalidate(_user_cache_key(path), user_id=user_id)
         return result.rowcount > 0
     finally:
         conn.close()
@@ -1272,17 +2545,20 @@ def store_refresh_token(
     user_id: str,
     token_hash: str,
     expires_at: str,
+    family_id: Optional[str] = None,
     path: Optional[Path] = None,
 ) -> str:
+    """Store a refresh token; without ``family_id`` it starts a new family."""
     conn = connect(path)
     try:
         token_id = str(uuid4())
         conn.execute(
             """
-            INSERT INTO refresh_tokens (id, user_id, token_hash, expires_at, created_at, revoked_at)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO refresh_tokens
+                (id, user_id, token_hash, expires_at, created_at, revoked_at, family_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (token_id, user_id, token_hash, expires_at, _now_iso(), None),
+            (token_id, user_id, token_hash, expires_at, _now_iso(), None, family_id or token_id),
         )
         conn.commit()
         return token_id
@@ -1297,7 +2573,7 @@ def get_refresh_token_by_hash(
     try:
         row = conn.execute(
             """
-            SELECT id, user_id, token_hash, expires_at, created_at, revoked_at
+            SELECT id, user_id, family_id, replaced_by_id, expires_at, revoked_at
             FROM refresh_tokens
             WHERE token_hash = ?
             """,
@@ -1308,6 +2584,85 @@ def get_refresh_token_by_hash(
         conn.close()
 
 
+# A token presented again this soon after its rotation is most likely a
+# second tab refreshing at the same moment, not a stolen token.
+REFRESH_REUSE_GRACE_SECONDS = 10
+
+
+def rotate_refresh_token(
+    *,
+    token_hash: str,
+    new_token_hash: str,
+    expires_at: str,
+    path: Optional[Path] = None,
+) -> Optional[str]:
+    """Replace an active refresh token with its successor in one transaction.
+
+    Returns the new token id, or None when ``token_hash`` is unknown or was
+    revoked by logout. If the token was already rotated (a replayed or stolen
+    token), every active token of its family is revoked and
+    ``ValueError("REFRESH_TOKEN_REUSED")`` is raised, unless the rotation
+    happened within ``REFRESH_REUSE_GRACE_SECONDS``: that concurrent refresh
+    just gets None and the family stays valid.
+    """
+    now = _now_iso()
+    new_id = str(uuid4())
+    reused = False
+    with transaction(path) as conn:
+        row = conn.execute(
+            """
+            SELECT id, user_id, family_id, replaced_by_id, revoked_at
+            FROM refresh_tokens
+            WHERE token_hash = ?
+            """,
+            (token_hash,),
+        ).fetchone()
+        if row is None:
+            return None
+        # Conditional so that of two concurrent refreshes with one token only
+        # the first rotates; the other falls under the reuse check below.
+        rotated = False
+        if row["revoked_at"] is None:
+            result = conn.execute(
+                "UPDATE refresh_tokens SET revoked_at = ?, replaced_by_id = ? "
+                "WHERE id = ? AND revoked_at IS NULL",
+                (now, new_id, row["id"]),
+            )
+            rotated = result.rowcount == 1
+        if rotated:
+            conn.execute(
+                """
+                INSERT INTO refresh_tokens
+                    (id, user_id, token_hash, expires_at, created_at, revoked_at, family_id)
+                VALUES (?, ?, ?, ?, ?, NULL, ?)
+                """,
+                (new_id, row["user_id"], new_token_hash, expires_at, now, row["family_id"]),
+            )
+        else:
+            current = conn.execute(
+                "SELECT replaced_by_id, revoked_at FROM refresh_tokens WHERE id = ?",
+                (row["id"],),
+            ).fetchone()
+            grace_cutoff = (
+                datetime.now(timezone.utc) - timedelta(seconds=REFRESH_REUSE_GRACE_SECONDS)
+            ).isoformat()
+            reused = (
+                current is not None
+                and current["replaced_by_id"] is not None
+                and current["revoked_at"] < grace_cutoff
+            )
+            if reused:
+                conn.execute(
+                    "UPDATE refresh_tokens SET revoked_at = ? "
+                    "WHERE family_id = ? AND revoked_at IS NULL",
+                    (now, row["family_id"]),
+                )
+    # Raised after the transaction so the family revocation is committed.
+    if reused:
+        raise ValueError("REFRESH_TOKEN_REUSED")
+    return new_id if rotated else None
+
+
 def revoke_refresh_token(token_hash: str, path: Optional[Path] = None) -> bool:
     conn = connect(path)
     try:
@@ -1334,21 +2689,46 @@ def revoke_all_refresh_tokens(user_id: str, path: Optional[Path] = None) -> int:
         conn.close()
 
 
-def cleanup_expired_refresh_tokens(path: Optional[Path] = None) -> int:
-    """Delete refresh tokens that have expired or been revoked more than 7 days ago."""
+REFRESH_TOKEN_REVOKED_RETENTION = timedelta(days=7)
+REFRESH_TOKEN_CLEANUP_BATCH_SIZE = 500
+
+
+def cleanup_expired_refresh_tokens(
+    path: Optional[Path] = None, *, batch_size: Optional[int] = None
+) -> int:
+    """Delete expired refresh tokens, and revoked ones older than 7 days.
+
+    Rotated tokens stay until they expire so that replaying them is still
+    detected. Rows are deleted ``batch_size`` at a time, each batch in its
+    own short transaction, so the sweep never holds the write lock for long.
+    """
+    if batch_size is None:
+        batch_size = REFRESH_TOKEN_CLEANUP_BATCH_SIZE
+    now = datetime.now(timezone.utc)
+    revoked_before = (now - REFRESH_TOKEN_REVOKED_RETENTION).isoformat()
+    predicates = (
+        ("expires_at < ?", now.isoformat()),
+        ("revoked_at < ? AND revoked_at IS NOT NULL AND replaced_by_id IS NULL", revoked_before),
+    )
+    deleted = 0
     conn = connect(path)
     try:
-        now = _now_iso()
-        result = conn.execute(
-            """
-            DELETE FROM refresh_tokens
-            WHERE expires_at < ?
-               OR (revoked_at IS NOT NULL AND revoked_at < datetime(?, '-7 days'))
-            """,
-            (now, now),
-        )
-        conn.commit()
-        return result.rowcount
+        for where, value in predicates:
+            while True:
+                result = conn.execute(
+                    f"""
+                    DELETE FROM refresh_tokens
+                    WHERE rowid IN (
+                        SELECT rowid FROM refresh_tokens WHERE {where} LIMIT ?
+                    )
+                    """,
+                    (value, batch_size),
+                )
+                conn.commit()
+                deleted += result.rowcount
+                if result.rowcount < batch_size:
+                    break
+        return deleted
     finally:
         conn.close()
 
@@ -1561,9 +2941,9 @@ def create_praise_sticker(
     granted_by: Optional[str] = None,
     granted_at: Optional[str] = None,
     path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> Dict[str, Any]:
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         sticker_id = str(uuid4())
         granted_at_value = granted_at or _now_iso()
         conn.execute(
@@ -1590,7 +2970,6 @@ def create_praise_sticker(
                 granted_at_value,
             ),
         )
-        conn.commit()
         return {
             "id": sticker_id,
             "studentId": student_id,
@@ -1601,8 +2980,6 @@ def create_praise_sticker(
             "grantedBy": granted_by,
             "grantedAt": granted_at_value,
         }
-    finally:
-        conn.close()
 
 
 def list_praise_stickers(
@@ -1655,9 +3032,9 @@ def has_praise_sticker_for_homework(
     *,
     reason_type: str = "homework_excellent",
     path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> bool:
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         row = conn.execute(
             """
             SELECT 1
@@ -1668,8 +3045,6 @@ def has_praise_sticker_for_homework(
             (student_id, homework_id, reason_type),
         ).fetchone()
         return row is not None
-    finally:
-        conn.close()
 
 
 # ============================================================
@@ -1742,6 +3117,7 @@ def create_homework_assignment(
                 """,
                 (assignment_id, student_id, created_at),
             )
+        refresh_homework_assignment_stats(conn, assignment_id)
 
         conn.commit()
         return assignment_id
@@ -2184,13 +3560,14 @@ def list_homework_problems_admin(
         where.append("hp.day_key = ?")
         params.append(normalized_day_key)
     if normalized_label_key is not None:
+        # Drive the lookup from the label so only its problems are visited.
         where.append(
-            """
-            EXISTS (
-                SELECT 1
-                FROM homework_problem_labels hpl
-                INNER JOIN homework_labels hl ON hl.id = hpl.label_id
-                WHERE hpl.problem_id = hp.id AND hl.key = ? AND hl.archived_at IS NULL
+            """
+            hp.id IN (
+                SELECT hpl.problem_id
+                FROM homework_labels hl
+                INNER JOIN homework_problem_labels hpl ON hpl.label_id = hl.id
+                WHERE hl.key = ? AND hl.archived_at IS NULL
             )
             """.strip()
         )
@@ -2396,18 +3773,12 @@ def list_homework_assignments_for_student(
                 CASE WHEN hs.id IS NOT NULL THEN 1 ELSE 0 END AS submitted
             FROM homework_assignments ha
             INNER JOIN homework_assignment_targets hat ON ha.id = hat.assignment_id
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = ha.id AND student_id = ?
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN homework_submissions hs ON hs.id = hat.latest_submission_id
             WHERE hat.student_id = ?
               AND (ha.scheduled_at IS NULL OR ha.scheduled_at <= ?)
             ORDER BY ha.created_at DESC
             """,
-            (student_id, student_id, now),
+            (student_id, now),
         ).fetchall()
 
         return [
@@ -2465,17 +3836,11 @@ def list_homework_assignments_for_student_admin(
                 END AS is_scheduled
             FROM homework_assignments ha
             INNER JOIN homework_assignment_targets hat ON ha.id = hat.assignment_id
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = ha.id AND student_id = ?
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN homework_submissions hs ON hs.id = hat.latest_submission_id
             WHERE hat.student_id = ?
             ORDER BY ha.created_at DESC
             """,
-            (now, student_id, student_id),
+            (now, student_id),
         ).fetchall()
 
         result: List[Dict[str, Any]] = []
@@ -2535,153 +3900,98 @@ def list_wrong_problems_for_student_admin(
 
     conn = connect(path)
     try:
-        params: list[Any] = [normalized_student_id, normalized_student_id]
+        params: list[Any] = [normalized_student_id]
         where_sql = ""
         if normalized_assignment_id is not None:
-            where_sql = "AND ha.id = ?"
+            where_sql = "AND r.assignment_id = ?"
             params.append(normalized_assignment_id)
+        params.extend([normalized_limit, normalized_offset])
 
         rows = conn.execute(
             f"""
             SELECT
-                ha.id AS assignment_id,
+                r.assignment_id,
+                r.submission_id,
+                r.problem_id,
+                r.problem_index,
+                r.problem_type,
+                r.needs_revision,
+                r.comment,
+                r.student_answer,
                 ha.title AS assignment_title,
                 ha.problems_json AS problems_json,
-                hs.id AS submission_id,
-                hs.answers_json AS answers_json,
-                hs.problem_reviews_json AS problem_reviews_json,
                 hs.submitted_at AS submitted_at,
                 hs.review_status AS review_status
-            FROM homework_assignments ha
-            INNER JOIN homework_assignment_targets hat ON ha.id = hat.assignment_id
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = ha.id AND student_id = ?
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
-            WHERE hat.student_id = ?
+            FROM homework_submission_problem_results r
+            INNER JOIN homework_assignment_targets hat
+                ON hat.assignment_id = r.assignment_id AND hat.student_id = r.student_id
+            INNER JOIN homework_assignments ha ON ha.id = r.assignment_id
+            INNER JOIN homework_submissions hs ON hs.id = r.submission_id
+            WHERE r.student_id = ?
+              AND r.is_wrong = 1
               {where_sql}
-            ORDER BY ha.created_at DESC
+              AND r.submission_id = hat.latest_submission_id
+            ORDER BY ha.created_at DESC, r.assignment_id, r.problem_index
+            LIMIT ? OFFSET ?
             """,
             tuple(params),
         ).fetchall()
 
+        # Only the assignments on this page have their problem bodies decoded.
+        problems_by_assignment: Dict[str, Dict[str, Dict[str, Any]]] = {}
         items: list[Dict[str, Any]] = []
         for row in rows:
-            submission_id = row["submission_id"]
-            if not submission_id:
-                continue
-
-            try:
-                problems_obj = json.loads(row["problems_json"])
-                problems = problems_obj if isinstance(problems_obj, list) else []
-            except Exception:
-                problems = []
-
-            try:
-                answers_obj = (
-                    json.loads(row["answers_json"]) if row["answers_json"] else {}
-                )
-                answers = answers_obj if isinstance(answers_obj, dict) else {}
-            except Exception:
-                answers = {}
-
-            try:
-                reviews_obj = (
-                    json.loads(row["problem_reviews_json"])
-                    if row["problem_reviews_json"]
-                    else {}
-                )
-                reviews = reviews_obj if isinstance(reviews_obj, dict) else {}
-            except Exception:
-                reviews = {}
-
             assignment_id_value = str(row["assignment_id"])
-            assignment_title_value = str(row["assignment_title"])
-            submitted_at_value = str(row["submitted_at"])
-            review_status_value = str(row["review_status"] or "pending")
-
-            for idx, problem_obj in enumerate(problems, start=1):
-                if not isinstance(problem_obj, dict):
-                    continue
-                problem = dict(problem_obj)
-                problem_id = str(problem.get("id") or f"p{idx}")
-                problem_type = str(problem.get("type") or "").strip()
-                question = str(problem.get("question") or "")
-                options = problem.get("options")
-                options_list = options if isinstance(options, list) else None
-                correct_answer = problem.get("answer")
-                correct_answer_str = (
-                    str(correct_answer) if isinstance(correct_answer, str) else None
-                )
-                student_answer_obj = answers.get(problem_id)
-                student_answer = (
-                    str(student_answer_obj)
-                    if isinstance(student_answer_obj, str)
-                    and student_answer_obj.strip()
-                    else None
-                )
-
-                review_obj = reviews.get(problem_id)
-                needs_revision = False
-                comment = ""
-                if isinstance(review_obj, dict):
-                    needs_revision = bool(review_obj.get("needsRevision"))
-                    raw_comment = review_obj.get("comment")
-                    if isinstance(raw_comment, str):
-                        comment = raw_comment
-                review_marked_wrong = needs_revision or bool(comment.strip())
-
-                is_wrong = False
-                if problem_type == "objective":
-                    if correct_answer_str is not None:
-                        if not is_objective_answer_correct(
-                            student_answer=student_answer,
-                            correct_answer=correct_answer_str,
-                            options=options_list,
-                        ):
-                            is_wrong = True
-                    if review_marked_wrong:
-                        is_wrong = True
-                elif problem_type == "subjective":
-                    if review_marked_wrong:
-                        is_wrong = True
-
-                if not is_wrong:
-                    continue
-
-                items.append(
-                    {
-                        "assignmentId": assignment_id_value,
-                        "assignmentTitle": assignment_title_value,
-                        "submissionId": str(submission_id),
-                        "submittedAt": submitted_at_value,
-                        "reviewStatus": review_status_value,
-                        "problemId": problem_id,
-                        "problemIndex": idx,
-                        "type": problem_type,
-                        "question": question,
-                        "options": options_list,
-                        "correctAnswer": correct_answer_str,
-                        "studentAnswer": student_answer,
-                        "review": {"needsRevision": needs_revision, "comment": comment},
-                    }
-                )
+            problems = problems_by_assignment.get(assignment_id_value)
+            if problems is None:
+                decoded = _loads_or_default(row["problems_json"], [])
+                problems = {}
+                for idx, problem_obj in enumerate(
+                    decoded if isinstance(decoded, list) else [], start=1
+                ):
+                    if isinstance(problem_obj, dict):
+                        problems[str(problem_obj.get("id") or f"p{idx}")] = problem_obj
+                problems_by_assignment[assignment_id_value] = problems
+
+            problem = problems.get(row["problem_id"], {})
+            options = problem.get("options")
+            correct_answer = problem.get("answer")
+            items.append(
+                {
+                    "assignmentId": assignment_id_value,
+                    "assignmentTitle": str(row["assignment_title"]),
+                    "submissionId": str(row["submission_id"]),
+                    "submittedAt": str(row["submitted_at"]),
+                    "reviewStatus": str(row["review_status"] or "pending"),
+                    "problemId": row["problem_id"],
+                    "problemIndex": row["problem_index"],
+                    "type": row["problem_type"],
+                    "question": str(problem.get("question") or ""),
+                    "options": options if isinstance(options, list) else None,
+                    "correctAnswer": (
+                        str(correct_answer) if isinstance(correct_answer, str) else None
+                    ),
+                    "studentAnswer": row["student_answer"],
+                    "review": {
+                        "needsRevision": bool(row["needs_revision"]),
+                        "comment": row["comment"],
+                    },
+                }
+            )
 
-        sliced = items[normalized_offset : normalized_offset + normalized_limit]
-        return {"studentId": normalized_student_id, "wrongProblems": sliced}
+        return {"studentId": normalized_student_id, "wrongProblems": items}
     finally:
         conn.close()
 
 
 def get_homework_assignment(
-    assignment_id: str, student_id: str, path: Optional[Path] = None
+    assignment_id: str,
+    student_id: str,
+    path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> Optional[Dict[str, Any]]:
     """Get a single homework assignment with submission status for a student."""
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         # Check if student is assigned to this homework
         target_row = conn.execute(
             """
@@ -2772,16 +4082,16 @@ def get_homework_assignment(
             "createdAt": row["created_at"],
             "submission": submission,
         }
-    finally:
-        conn.close()
 
 
 def check_homework_submission_exists(
-    assignment_id: str, student_id: str, path: Optional[Path] = None
+    assignment_id: str,
+    student_id: str,
+    path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> bool:
     """Check if a student has already submitted for an assignment."""
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         row = conn.execute(
             """
             SELECT review_status
@@ -2796,8 +4106,9 @@ def check_homework_submission_exists(
             return False
         review_status = row["review_status"] or "pending"
         return review_status != "returned"
-    finally:
-        conn.close()
+
+
+NOTIFICATION_HOMEWORK_SUBMITTED = "homework_submitted"
 
 
 def create_homework_submission(
@@ -2805,10 +4116,10 @@ def create_homework_submission(
     student_id: str,
     answers: Dict[str, str],
     path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> str:
     """Create a new homework submission."""
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         submission_id = str(uuid4())
         submitted_at = _now_iso()
         answers_json = json.dumps(answers, ensure_ascii=False)
@@ -2828,11 +4139,33 @@ def create_homework_submission(
                 "pending",
             ),
         )
+        problems_row = conn.execute(
+            "SELECT problems_json FROM homework_assignments WHERE id = ?",
+            (assignment_id,),
+        ).fetchone()
+        _write_submission_problem_results(
+            conn,
+            submission_id=submission_id,
+            assignment_id=assignment_id,
+            student_id=student_id,
+            problems_json=problems_row["problems_json"] if problems_row else None,
+            answers_json=answers_json,
+            problem_reviews_json=None,
+        )
+        _set_latest_submission(
+            conn,
+            assignment_id=assignment_id,
+            student_id=student_id,
+            submission_id=submission_id,
+        )
+        refresh_homework_assignment_stats(conn, assignment_id)
+        # Committed (or rolled back) with the submission itself, so the admin
+        # is notified exactly when a submission exists.
+        enqueue_notification(
+            conn, NOTIFICATION_HOMEWORK_SUBMITTED, {"submissionId": submission_id}
+        )
 
-        conn.commit()
         return submission_id
-    finally:
-        conn.close()
 
 
 def save_homework_submission_file(
@@ -2841,19 +4174,27 @@ def save_homework_submission_file(
     original_name: str,
     content_type: str,
     size_bytes: int,
+    blob_sha256: Optional[str] = None,
     path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> str:
-    """Save a file record for a homework submission."""
-    conn = connect(path)
-    try:
+    """Save a file record for a homework submission.
+
+    With ``blob_sha256`` the record references a content-addressed blob,
+    registered here if this is its first reference.
+    """
+    with _borrow_connection(path, conn) as conn:
         file_id = str(uuid4())
         created_at = _now_iso()
 
+        if blob_sha256 is not None:
+            _register_homework_blob(conn, blob_sha256, size_bytes, content_type)
         conn.execute(
             """
             INSERT INTO homework_submission_files
-            (id, submission_id, stored_path, original_name, content_type, size_bytes, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            (id, submission_id, stored_path, original_name, content_type, size_bytes,
+             created_at, blob_sha256)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 file_id,
@@ -2863,21 +4204,334 @@ def save_homework_submission_file(
                 content_type,
                 size_bytes,
                 created_at,
+                blob_sha256,
             ),
         )
 
-        conn.commit()
         return file_id
+
+
+def _register_homework_blob(
+    conn: sqlite3.Connection, sha256: str, size_bytes: int, content_type: str
+) -> None:
+    # ref_count starts at 0; the homework_submission_files triggers count references.
+    conn.execute(
+        """
+        INSERT INTO homework_blobs (sha256, size_bytes, content_type, ref_count, created_at)
+        VALUES (?, ?, ?, 0, ?)
+        ON CONFLICT(sha256) DO NOTHING
+        """,
+        (sha256, size_bytes, content_type, _now_iso()),
+    )
+
+
+def get_homework_blob(sha256: str, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    conn = connect(path)
+    try:
+        row = conn.execute(
+            """
+            SELECT sha256, size_bytes, content_type, ref_count, created_at, released_at
+            FROM homework_blobs
+            WHERE sha256 = ?
+            """,
+            (sha256,),
+        ).fetchone()
+        if not row:
+            return None
+        return {
+            "sha256": row["sha256"],
+            "sizeBytes": row["size_bytes"],
+            "contentType": row["content_type"],
+            "refCount": row["ref_count"],
+            "createdAt": row["created_at"],
+            "releasedAt": row["released_at"],
+        }
+    finally:
+        conn.close()
+
+
+def list_released_homework_blobs(
+    released_before: str, path: Optional[Path] = None
+) -> List[Dict[str, Any]]:
+    """Blobs nothing has referenced since before ``released_before``."""
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT sha256, content_type, size_bytes
+            FROM homework_blobs
+            WHERE ref_count <= 0 AND released_at < ?
+            """,
+            (released_before,),
+        ).fetchall()
+        return [
+            {
+                "sha256": row["sha256"],
+                "contentType": row["content_type"],
+                "sizeBytes": row["size_bytes"],
+            }
+            for row in rows
+        ]
+    finally:
+        conn.close()
+
+
+def delete_unreferenced_homework_blob(
+    sha256: str,
+    *,
+    released_before: str,
+    remove_file: Callable[[], None],
+    path: Optional[Path] = None,
+) -> bool:
+    """Delete a blob's row and file if nothing references it.
+
+    A blob qualifies when its row was released before ``released_before``,
+    or when it has no row at all (a file left behind by a crash). The file
+    is removed while this transaction holds the write lock, so a submission
+    reusing the same content either commits first (and the blob is kept) or
+    commits afterwards and writes the file again.
+    """
+    with transaction(path) as conn:
+        deleted = conn.execute(
+            """
+            DELETE FROM homework_blobs
+            WHERE sha256 = ? AND ref_count <= 0 AND released_at < ?
+            """,
+            (sha256, released_before),
+        ).rowcount
+        if not deleted:
+            exists = conn.execute(
+                "SELECT 1 FROM homework_blobs WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if exists:
+                return False
+        remove_file()
+        return True
+
+
+def list_legacy_submission_files(path: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """File records written before the blob store (``blob_sha256`` NULL)."""
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT id, stored_path
+            FROM homework_submission_files
+            WHERE blob_sha256 IS NULL
+            """
+        ).fetchall()
+        return [{"id": row["id"], "storedPath": row["stored_path"]} for row in rows]
+    finally:
+        conn.close()
+
+
+def set_submission_file_blob(
+    file_id: str,
+    *,
+    blob_sha256: str,
+    stored_path: str,
+    content_type: str,
+    size_bytes: int,
+    path: Optional[Path] = None,
+) -> None:
+    """Point an existing file record at a blob (used to adopt legacy files)."""
+    with transaction(path) as conn:
+        _register_homework_blob(conn, blob_sha256, size_bytes, content_type)
+        conn.execute(
+            """
+            UPDATE homework_submission_files
+            SET blob_sha256 = ?, stored_path = ?, content_type = ?, size_bytes = ?
+            WHERE id = ?
+            """,
+            (blob_sha256, stored_path, content_type, size_bytes, file_id),
+        )
+
+
+def enqueue_notification(
+    conn: sqlite3.Connection, kind: str, payload: Dict[str, Any]
+) -> str:
+    """Add a notification to the outbox inside the caller's transaction."""
+    notification_id = str(uuid4())
+    now = _now_iso()
+    conn.execute(
+        """
+        INSERT INTO notification_outbox
+        (id, kind, payload_json, status, attempts, next_attempt_at, created_at)
+        VALUES (?, ?, ?, 'pending', 0, ?, ?)
+        """,
+        (notification_id, kind, json.dumps(payload, ensure_ascii=False), now, now),
+    )
+    return notification_id
+
+
+def claim_notifications(
+    *,
+    limit: int,
+    lease_seconds: float,
+    max_attempts: int,
+    path: Optional[Path] = None,
+) -> List[Dict[str, Any]]:
+    """Lease up to ``limit`` due notifications to the calling sender.
+
+    A single UPDATE both selects and marks the rows, so concurrent senders
+    (one per worker process) never claim the same notification. Due rows
+    that already used ``max_attempts`` (say, a sender died on them every
+    time) are marked ``failed`` instead of being leased again.
+
+    Each row carries its ``lease`` (the ``locked_until`` written here); the
+    sender passes it back so a row re-claimed after the lease ran out is not
+    sent or finished twice.
+    """
+    now = datetime.now(timezone.utc)
+    locked_until = (now + timedelta(seconds=lease_seconds)).isoformat()
+    with transaction(path) as conn:
+        conn.execute(
+            """
+            UPDATE notification_outbox
+            SET status = 'failed', locked_until = NULL, finished_at = ?,
+                last_error = COALESCE(last_error || '; ', '') || 'gave up after lease expired'
+            WHERE ((status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND locked_until < ?))
+              AND attempts >= ?
+            """,
+            (now.isoformat(), now.isoformat(), now.isoformat(), max_attempts),
+        )
+        rows = conn.execute(
+            """
+            UPDATE notification_outbox
+            SET status = 'sending', attempts = attempts + 1, locked_until = ?
+            WHERE id IN (
+                SELECT id FROM notification_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND locked_until < ?)
+                ORDER BY next_attempt_at
+                LIMIT ?
+            )
+            RETURNING id, kind, payload_json, attempts, locked_until
+            """,
+            (locked_until, now.isoformat(), now.isoformat(), limit),
+        ).fetchall()
+    return [
+        {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload_json"]),
+            "attempts": row["attempts"],
+            "lease": row["locked_until"],
+        }
+        for row in rows
+    ]
+
+
+def renew_notification_lease(
+    notification_id: str,
+    *,
+    lease: str,
+    lease_seconds: float,
+    path: Optional[Path] = None,
+) -> Optional[str]:
+    """Extend a lease still held as ``lease``; returns the new one.
+
+    None means another sender has claimed the row since (or it was given
+    up on), so the caller must not send it.
+    """
+    locked_until = (
+        datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+    ).isoformat()
+    with transaction(path) as conn:
+        row = conn.execute(
+            """
+            UPDATE notification_outbox
+            SET locked_until = ?
+            WHERE id = ? AND status = 'sending' AND locked_until = ?
+            RETURNING locked_until
+            """,
+            (locked_until, notification_id, lease),
+        ).fetchone()
+    return row["locked_until"] if row else None
+
+
+def finish_notification(
+    notification_id: str,
+    *,
+    status: str,
+    lease: str,
+    error: Optional[str] = None,
+    next_attempt_at: Optional[str] = None,
+    path: Optional[Path] = None,
+) -> bool:
+    """Record a send outcome if the row is still held as ``lease``.
+
+    ``status`` is ``pending`` (retry at ``next_attempt_at``), ``sent``,
+    ``skipped`` or ``failed``. Returns False when the lease was lost and
+    nothing was written.
+    """
+    finished_at = None if status == "pending" else _now_iso()
+    with transaction(path) as conn:
+        return conn.execute(
+            """
+            UPDATE notification_outbox
+            SET status = ?, last_error = ?, locked_until = NULL,
+                next_attempt_at = COALESCE(?, next_attempt_at), finished_at = ?
+            WHERE id = ? AND status = 'sending' AND locked_until = ?
+            """,
+            (status, error, next_attempt_at, finished_at, notification_id, lease),
+        ).rowcount > 0
+
+
+def release_notifications(
+    leases: List[Tuple[str, str]], path: Optional[Path] = None
+) -> None:
+    """Hand claimed ``(id, lease)`` notifications back untried.
+
+    The attempt is not used up. Rows whose lease was lost are left alone.
+    """
+    if not leases:
+        return
+    with transaction(path) as conn:
+        conn.executemany(
+            """
+            UPDATE notification_outbox
+            SET status = 'pending', attempts = attempts - 1, locked_until = NULL
+            WHERE id = ? AND status = 'sending' AND locked_until = ?
+            """,
+            leases,
+        )
+
+
+def get_notification_outbox_counts(path: Optional[Path] = None) -> Dict[str, int]:
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM notification_outbox GROUP BY status"
+        ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
     finally:
         conn.close()
 
 
+def prune_notifications(finished_before: str, path: Optional[Path] = None) -> int:
+    """Delete sent/skipped notifications finished before ``finished_before``.
+
+    Failed rows are kept for inspection.
+    """
+    with transaction(path) as conn:
+        return conn.execute(
+            """
+            DELETE FROM notification_outbox
+            WHERE finished_at < ? AND status IN ('sent', 'skipped')
+            """,
+            (finished_before,),
+        ).rowcount
+
+
 def get_homework_submission_for_review(
-    submission_id: str, path: Optional[Path] = None
+    submission_id: str,
+    path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> Optional[Dict[str, Any]]:
     """Get a submission with assignment problems for review validation."""
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         row = conn.execute(
             """
             SELECT
@@ -2925,8 +4579,6 @@ def get_homework_submission_for_review(
             if row["sticker_reward_count"] is not None
             else 2,
         }
-    finally:
-        conn.close()
 
 
 def update_homework_submission_review(
@@ -2935,10 +4587,10 @@ def update_homework_submission_review(
     problem_reviews: Dict[str, Any],
     reviewed_by: str,
     path: Optional[Path] = None,
+    conn: Optional[sqlite3.Connection] = None,
 ) -> bool:
     """Update review status and comments for a submission."""
-    conn = connect(path)
-    try:
+    with _borrow_connection(path, conn) as conn:
         reviewed_at = _now_iso()
         problem_reviews_json = (
             json.dumps(problem_reviews, ensure_ascii=False) if problem_reviews else None
@@ -2957,10 +4609,14 @@ def update_homework_submission_review(
                 submission_id,
             ),
         )
-        conn.commit()
+        if result.rowcount > 0:
+            refresh_submission_problem_results(conn, submission_id)
+            assignment_row = conn.execute(
+                "SELECT assignment_id FROM homework_submissions WHERE id = ?",
+                (submission_id,),
+            ).fetchone()
+            refresh_homework_assignment_stats(conn, assignment_row["assignment_id"])
         return result.rowcount > 0
-    finally:
-        conn.close()
 
 
 def get_homework_submission_with_files(
@@ -2991,7 +4647,7 @@ def get_homework_submission_with_files(
 
         file_rows = conn.execute(
             """
-            SELECT id, stored_path, original_name, content_type, size_bytes
+            SELECT id, stored_path, original_name, content_type, size_bytes, blob_sha256
             FROM homework_submission_files
             WHERE submission_id = ?
             """,
@@ -3013,6 +4669,7 @@ def get_homework_submission_with_files(
                     "originalName": f["original_name"],
                     "contentType": f["content_type"],
                     "sizeBytes": f["size_bytes"],
+                    "blobSha256": f["blob_sha256"],
                 }
                 for f in file_rows
             ],
@@ -3045,64 +4702,55 @@ def list_all_students(path: Optional[Path] = None) -> List[Dict[str, Any]]:
 
 def list_all_homework_assignments_admin(
     path: Optional[Path] = None,
+    *,
+    include_problems: bool = True,
 ) -> List[Dict[str, Any]]:
-    """Admin: List all homework assignments with submission statistics."""
+    """Admin: List all homework assignments with submission statistics.
+
+    Counts come from homework_assignment_stats. With ``include_problems=False``
+    the problem bodies are neither read nor decoded; ``problemCount`` is always
+    present.
+    """
     conn = connect(path)
     try:
         now = _now_iso()
+        problems_column = "ha.problems_json" if include_problems else "NULL"
         rows = conn.execute(
-            """
+            f"""
             SELECT
                 ha.id,
                 ha.title,
                 ha.description,
-                ha.problems_json,
+                {problems_column} AS problems_json,
                 ha.due_at,
                 ha.scheduled_at,
                 ha.sticker_reward_count,
                 ha.created_by,
                 ha.created_at,
-                (
-                    SELECT COUNT(*)
-                    FROM homework_assignment_targets hat
-                    WHERE hat.assignment_id = ha.id
-                ) AS total_students,
-                (
-                    SELECT COUNT(DISTINCT hs.student_id)
-                    FROM homework_submissions hs
-                    WHERE hs.assignment_id = ha.id
-                ) AS submitted_count,
-                (
-                    SELECT COUNT(DISTINCT hs.student_id)
-                    FROM homework_submissions hs
-                    WHERE hs.assignment_id = ha.id AND hs.review_status = 'pending'
-                ) AS pending_count,
-                (
-                    SELECT COUNT(DISTINCT hs.student_id)
-                    FROM homework_submissions hs
-                    WHERE hs.assignment_id = ha.id AND hs.review_status = 'approved'
-                ) AS approved_count,
-                (
-                    SELECT COUNT(DISTINCT hs.student_id)
-                    FROM homework_submissions hs
-                    WHERE hs.assignment_id = ha.id AND hs.review_status = 'returned'
-                ) AS returned_count,
+                COALESCE(s.problem_count, 0) AS problem_count,
+                COALESCE(s.total_students, 0) AS total_students,
+                COALESCE(s.submitted_count, 0) AS submitted_count,
+                COALESCE(s.pending_count, 0) AS pending_count,
+                COALESCE(s.approved_count, 0) AS approved_count,
+                COALESCE(s.returned_count, 0) AS returned_count,
                 CASE
                     WHEN ha.scheduled_at IS NOT NULL AND ha.scheduled_at > ? THEN 1
                     ELSE 0
                 END AS is_scheduled
             FROM homework_assignments ha
+            LEFT JOIN homework_assignment_stats s ON s.assignment_id = ha.id
             ORDER BY ha.created_at DESC
             """,
             (now,),
         ).fetchall()
 
-        return [
-            {
+        assignments: List[Dict[str, Any]] = []
+        for row in rows:
+            item: Dict[str, Any] = {
                 "id": row["id"],
                 "title": row["title"],
                 "description": row["description"],
-                "problems": json.loads(row["problems_json"]),
+                "problemCount": row["problem_count"],
                 "dueAt": row["due_at"],
                 "scheduledAt": row["scheduled_at"],
                 "stickerRewardCount": row["sticker_reward_count"]
@@ -3117,8 +4765,10 @@ def list_all_homework_assignments_admin(
                 "returnedCount": row["returned_count"],
                 "isScheduled": bool(row["is_scheduled"]),
             }
-            for row in rows
-        ]
+            if include_problems:
+                item["problems"] = json.loads(row["problems_json"])
+            assignments.append(item)
+        return assignments
     finally:
         conn.close()
 
@@ -3154,13 +4804,7 @@ def get_homework_assignment_admin(
                 hs.reviewed_at,
                 hs.reviewed_by
             FROM homework_assignment_targets hat
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = hat.assignment_id AND student_id = hat.student_id
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN homework_submissions hs ON hs.id = hat.latest_submission_id
             WHERE hat.assignment_id = ?
             ORDER BY hat.student_id
             """,
@@ -3286,7 +4930,8 @@ def get_submission_file(
     try:
         row = conn.execute(
             """
-            SELECT id, submission_id, stored_path, original_name, content_type, size_bytes
+            SELECT id, submission_id, stored_path, original_name, content_type, size_bytes,
+                   blob_sha256
             FROM homework_submission_files
             WHERE id = ?
             """,
@@ -3303,6 +4948,7 @@ def get_submission_file(
             "originalName": row["original_name"],
             "contentType": row["content_type"],
             "sizeBytes": row["size_bytes"],
+            "blobSha256": row["blob_sha256"],
         }
     finally:
         conn.close()
@@ -3339,13 +4985,7 @@ def list_admin_daily_homework_summary_for_student(
                 hs.review_status AS review_status
             FROM homework_assignments ha
             INNER JOIN homework_assignment_targets hat ON ha.id = hat.assignment_id
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = ha.id AND student_id = hat.student_id
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN homework_submissions hs ON hs.id = hat.latest_submission_id
             WHERE hat.student_id = ?
             ORDER BY COALESCE(ha.due_at, ha.created_at) ASC, ha.created_at ASC, ha.id ASC
             """,
@@ -3512,13 +5152,7 @@ def get_pending_homework_count(
                     ELSE 0
                 END) AS approved
             FROM homework_assignment_targets hat
-            LEFT JOIN homework_submissions hs ON hs.id = (
-                SELECT id
-                FROM homework_submissions
-                WHERE assignment_id = hat.assignment_id AND student_id = hat.student_id
-                ORDER BY submitted_at DESC
-                LIMIT 1
-            )
+            LEFT JOIN homework_submissions hs ON hs.id = hat.latest_submission_id
             INNER JOIN homework_assignments ha ON ha.id = hat.assignment_id
             WHERE hat.student_id = ?
               AND (ha.scheduled_at IS NULL OR ha.scheduled_at <= ?)
@@ -0,0 +1,214 @@
+"""Cache-friendly responses for stored submission files.
+
+Starlette's ``FileResponse`` (0.27) sends ``Last-Modified`` and an ``ETag``
+but never answers ``304 Not Modified`` or ``206 Partial Content``, so every
+re-opened review page downloaded every image again. ``file_response`` adds:
+
+* validators: a strong ``ETag`` from the blob's SHA-256 (plus the variant
+  name for renditions), or a weak mtime/size tag for files stored before
+  the blob store;
+* conditional GET: ``If-None-Match``, falling back to ``If-Modified-Since``;
+* a single byte range (``Range``, honouring ``If-Range``); multi-range
+  requests get the whole file, which RFC 9110 allows;
+* ``Cache-Control``: blobs never change under their hash, so they are
+  ``immutable``; legacy files must be revalidated.
+
+``iter_zip`` streams several files as one uncompressed zip (photos do not
+compress) without buffering it or knowing its size in advance.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+import zipfile
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from .uploads import CHUNK_SIZE
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(sha256: Optional[str], variant: str, stat_result: os.stat_result) -> str:
+    if sha256:
+        return f'"{sha256}"' if variant == "original" else f'"{sha256}.{variant}"'
+    return f'W/"{int(stat_result.st_mtime)}-{stat_result.st_size}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires."""
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(candidate.strip()) for candidate in header.split(",")}
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` of a single range; None to send everything.
+
+    Raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if match is None:
+        return None  # Malformed or multi-range: ignore it.
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - suffix), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+def _if_range_allows(request: Request, etag: str, last_modified: str) -> bool:
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        # Ranges need a strong match.
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+
+def _iter_file_range(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    stat_result: os.stat_result,
+    *,
+    media_type: str,
+    filename: str,
+    etag: str,
+    immutable: bool,
+) -> Response:
+    last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+    headers = {
+        "etag": etag,
+        "last-modified": last_modified,
+        "cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "accept-ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # FileResponse builds Content-Disposition (RFC 5987 for non-ASCII names).
+    full = FileResponse(
+        path,
+        headers=headers,
+        media_type=media_type,
+        filename=filename,
+        stat_result=stat_result,
+    )
+    range_header = request.headers.get("range")
+    if not range_header or not _if_range_allows(request, etag, last_modified):
+        return full
+
+    size = stat_result.st_size
+    try:
+        byte_range = _parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+    if byte_range is None:
+        return full
+    start, end = byte_range
+    partial_headers = {
+        **headers,
+        "content-disposition": full.headers["content-disposition"],
+        "content-range": f"bytes {start}-{end}/{size}",
+        "content-length": str(end - start + 1),
+    }
+    return StreamingResponse(
+        _iter_file_range(path, start, end - start + 1),
+        status_code=206,
+        headers=partial_headers,
+        media_type=media_type,
+    )
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """True when ``If-None-Match`` already names ``etag``."""
+    if_none_match = request.headers.get("if-none-match")
+    return if_none_match is not None and _etag_matches(if_none_match, etag)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer that ``iter_zip`` drains after each write."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, Path]], modified: datetime) -> Iterator[bytes]:
+    """Stream ``(archive name, path)`` entries as a stored (uncompressed) zip.
+
+    Every entry gets the ``modified`` timestamp, so the same files always
+    produce the same bytes.
+    """
+    sink = _ChunkSink()
+    date_time = modified.timetuple()[:6]
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, path in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.file_size = path.stat().st_size
+            with open(path, "rb") as source, archive.open(info, "w") as target:
+                while chunk := source.read(CHUNK_SIZE):
+                    target.write(chunk)
+                    if data := sink.drain():
+                        yield data
+    # Trailing data descriptor and central directory.
+    yield sink.drain()
@@ -5,14 +5,18 @@ from __future__ import annotations
 import logging
 import os
 import smtplib
+import time
 from email.message import EmailMessage
 from pathlib import Path
 from typing import Any, List, Optional, TypedDict
 
 from .homework_grading import is_objective_answer_correct
+from .metrics import EMAIL_SEND_RESULTS, EMAIL_SEND_SECONDS
 
 logger = logging.getLogger(__name__)
 
+SMTP_TIMEOUT_SECONDS = 30
+
 
 class SMTPConfig(TypedDict):
     host: str
@@ -47,16 +51,16 @@ def is_email_configured() -> bool:
     )
 
 
-def send_homework_notification(
+def build_homework_notification(
     student_id: str,
     student_name: Optional[str],
     assignment_title: str,
     problems: List[dict[str, Any]],
     answers: dict[str, str],
     file_paths: List[str],
-) -> bool:
+) -> EmailMessage:
     """
-    Send homework submission notification email to admin.
+    Build the homework submission notification email to admin.
 
     Args:
         student_id: The student's ID
@@ -67,12 +71,8 @@ def send_homework_notification(
         file_paths: List of absolute paths to attached files
 
     Returns:
-        True if email was sent successfully, False otherwise
+        The message, addressed from SMTP_FROM to ADMIN_EMAIL
     """
-    if not is_email_configured():
-        logger.warning("Email service not configured. Skipping notification.")
-        return False
-
     config = get_smtp_config()
     admin_email = get_admin_email()
 
@@ -175,25 +175,100 @@ def send_homework_notification(
         except Exception as e:
             logger.error("Failed to attach file %s: %s", file_path, str(e))
 
-    # Send email
-    try:
-        smtp_host = str(config["host"])
-        smtp_port = int(config["port"])
-        smtp_user = str(config["user"])
-        smtp_password = str(config["password"])
+    return msg
 
-        with smtplib.SMTP(smtp_host, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_user, smtp_password)
-            server.send_message(msg)
 
-        logger.info(
-            "Homework notification sent for student %s, assignment %s",
-            student_id,
-            assignment_title,
+class SMTPSession:
+    """One SMTP connection (STARTTLS + login) reused for many messages.
+
+    Connects on the first ``send``. A server that dropped an idle session is
+    reconnected once; any other error closes the session and is raised, so
+    the next ``send`` starts from a fresh connection.
+    """
+
+    def __init__(self, config: Optional[SMTPConfig] = None) -> None:
+        # None: read the environment on each connect.
+        self._config = config
+        self._server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    @property
+    def connected(self) -> bool:
+        return self._server is not None
+
+    def _connect(self) -> smtplib.SMTP:
+        config = self._config or get_smtp_config()
+        server = smtplib.SMTP(
+            str(config["host"]), int(config["port"]), timeout=SMTP_TIMEOUT_SECONDS
         )
-        return True
+        try:
+            server.starttls()
+            server.login(str(config["user"]), str(config["password"]))
+        except BaseException:
+            server.close()
+            raise
+        return server
+
+    def send(self, msg: EmailMessage) -> None:
+        started = time.perf_counter()
+        sent = False
+        try:
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                self._server = self._connect()
+                self._server.send_message(msg)
+            sent = True
+        except BaseException:
+            self.close()
+            raise
+        finally:
+            self.last_used = time.monotonic()
+            EMAIL_SEND_SECONDS.observe(time.perf_counter() - started)
+            EMAIL_SEND_RESULTS.inc(outcome="sent" if sent else "failed")
+
+    def close(self) -> None:
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def __enter__(self) -> "SMTPSession":
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
 
+
+def send_homework_notification(
+    student_id: str,
+    student_name: Optional[str],
+    assignment_title: str,
+    problems: List[dict[str, Any]],
+    answers: dict[str, str],
+    file_paths: List[str],
+) -> bool:
+    """Send one notification on its own connection; True if it was sent.
+
+    Submissions are notified through the outbox (``notification_outbox``),
+    which reuses one session for many emails.
+    """
+    if not is_email_configured():
+        logger.warning("Email service not configured. Skipping notification.")
+        EMAIL_SEND_RESULTS.inc(outcome="skipped")
+        return False
+
+    msg = build_homework_notification(
+        student_id, student_name, assignment_title, problems, answers, file_paths
+    )
+    try:
+        with SMTPSession() as session:
+            session.send(msg)
     except smtplib.SMTPAuthenticationError as e:
         logger.error("SMTP authentication failed: %s", str(e))
         return False
@@ -203,3 +278,10 @@ def send_homework_notification(
     except Exception as e:
         logger.error("Unexpected error sending email: %s", str(e))
         return False
+
+    logger.info(
+        "Homework notification sent for student %s, assignment %s",
+        student_id,
+        assignment_title,
+    )
+    return True
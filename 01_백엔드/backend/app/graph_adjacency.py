@@ -0,0 +1,132 @@
+"""In-memory adjacency indexes for the published graph, used by recommendations.
+
+Graph versions are immutable once written, so an index is built once per
+(database, graph version) and reused until a newer version is published.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .metrics import cache_families, register_collector
+
+PUBLISHED_GRAPH_VERSION_SQL = (
+    "SELECT id FROM graph_versions WHERE status='published' "
+    "ORDER BY created_at DESC LIMIT 1"
+)
+
+
+@dataclass(frozen=True)
+class GraphAdjacency:
+    graph_version_id: str
+    # node id -> skills it requires (requires_skill edges are skill -> node)
+    requires_skill: Dict[str, FrozenSet[str]] = field(default_factory=dict)
+    # node id -> nodes it prepares for, in edge order
+    prepares_for: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    # node id -> skills it teaches, in edge order
+    teaches: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    # course_step node ids sorted by order_value (NULLs first, like SQLite)
+    course_steps: Tuple[str, ...] = ()
+
+
+def build_graph_adjacency(
+    conn: sqlite3.Connection, graph_version_id: str
+) -> GraphAdjacency:
+    requires: Dict[str, List[str]] = {}
+    prepares: Dict[str, List[str]] = {}
+    teaches: Dict[str, List[str]] = {}
+    rows = conn.execute(
+        """
+        SELECT edge_type, source, target FROM edges
+        WHERE graph_version_id = ?
+          AND edge_type IN ('requires_skill', 'prepares_for', 'teaches')
+        ORDER BY rowid
+        """,
+        (graph_version_id,),
+    ).fetchall()
+    for row in rows:
+        edge_type, source, target = row["edge_type"], row["source"], row["target"]
+        if edge_type == "requires_skill":
+            requires.setdefault(target, []).append(source)
+        elif edge_type == "prepares_for":
+            prepares.setdefault(source, []).append(target)
+        else:
+            teaches.setdefault(source, []).append(target)
+
+    step_rows = conn.execute(
+        """
+        SELECT id, order_value FROM nodes
+        WHERE graph_version_id = ? AND node_type = 'course_step'
+        ORDER BY rowid
+        """,
+        (graph_version_id,),
+    ).fetchall()
+    steps = sorted(
+        step_rows,
+        key=lambda r: (r["order_value"] is not None, r["order_value"] or 0),
+    )
+
+    return GraphAdjacency(
+        graph_version_id=graph_version_id,
+        requires_skill={k: frozenset(v) for k, v in requires.items()},
+        prepares_for={k: tuple(dict.fromkeys(v)) for k, v in prepares.items()},
+        teaches={k: tuple(dict.fromkeys(v)) for k, v in teaches.items()},
+        course_steps=tuple(r["id"] for r in steps),
+    )
+
+
+_lock = threading.Lock()
+# database file -> adjacency of the latest published version seen for it.
+_adjacency: Dict[str, GraphAdjacency] = {}
+_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _database_file(conn: sqlite3.Connection) -> str:
+    row = conn.execute("PRAGMA database_list").fetchone()
+    return row["file"] if row else ""
+
+
+def get_published_graph_adjacency(
+    conn: sqlite3.Connection,
+) -> Optional[GraphAdjacency]:
+    """Return the adjacency index for the latest published graph, or None."""
+    version_row = conn.execute(PUBLISHED_GRAPH_VERSION_SQL).fetchone()
+    if not version_row:
+        return None
+    graph_version_id = version_row["id"]
+
+    db_file = _database_file(conn)
+    if db_file:
+        with _lock:
+            cached = _adjacency.get(db_file)
+            if cached is not None and cached.graph_version_id == graph_version_id:
+                _stats["hits"] += 1
+                return cached
+            _stats["misses"] += 1
+
+    adjacency = build_graph_adjacency(conn, graph_version_id)
+    if db_file:
+        with _lock:
+            _adjacency[db_file] = adjacency
+    return adjacency
+
+
+def invalidate_graph_adjacency_cache() -> None:
+    with _lock:
+        _adjacency.clear()
+
+
+def get_graph_adjacency_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "entries": len(_adjacency)}
+
+
+register_collector(
+    "graph_adjacency_cache",
+    lambda: cache_families(
+        "graph_adjacency_cache", "Published graph adjacency cache", get_graph_adjacency_stats()
+    ),
+)
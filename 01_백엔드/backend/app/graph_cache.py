@@ -0,0 +1,102 @@
+"""In-process snapshot cache for the latest published/draft curriculum graph."""
+
+from __future__ import annotations
+
+import gzip
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import cache_families, register_collector
+from .models import GraphResponse
+
+
+@dataclass(frozen=True)
+class GraphSnapshot:
+    graph_version_id: str
+    status: str
+    payload: Dict[str, Any]
+    body: bytes = b""
+    gzip_body: bytes = b""
+
+    @property
+    def etag(self) -> str:
+        return f'"graph-{self.graph_version_id}"'
+
+    @property
+    def gzip_etag(self) -> str:
+        return f'"graph-{self.graph_version_id}-gzip"'
+
+
+def build_graph_snapshot(
+    *, graph_version_id: str, status: str, payload: Dict[str, Any]
+) -> GraphSnapshot:
+    """Serialize ``payload`` once so every request for this version reuses the bytes."""
+    body = GraphResponse.model_validate(payload).model_dump_json().encode("utf-8")
+    return GraphSnapshot(
+        graph_version_id=graph_version_id,
+        status=status,
+        payload=payload,
+        body=body,
+        gzip_body=gzip.compress(body, compresslevel=6, mtime=0),
+    )
+
+
+_lock = threading.Lock()
+# (db path, status) -> snapshot of the latest graph version for that status.
+_snapshots: Dict[Tuple[str, str], GraphSnapshot] = {}
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _cache_key(db_path: Path, status: str) -> Tuple[str, str]:
+    return (str(db_path), status)
+
+
+def get_graph_snapshot(db_path: Path, status: str) -> Optional[GraphSnapshot]:
+    """Return the cached snapshot for ``status`` or None on a cold cache.
+
+    The snapshot payload is shared between requests and must be treated as
+    read-only by callers.
+    """
+    with _lock:
+        snapshot = _snapshots.get(_cache_key(db_path, status))
+        if snapshot is None:
+            _stats["misses"] += 1
+        else:
+            _stats["hits"] += 1
+        return snapshot
+
+
+def store_graph_snapshot(db_path: Path, snapshot: GraphSnapshot) -> GraphSnapshot:
+    with _lock:
+        _snapshots[_cache_key(db_path, snapshot.status)] = snapshot
+    return snapshot
+
+
+def invalidate_graph_cache(db_path: Optional[Path] = None) -> None:
+    """Drop cached snapshots after a graph_versions row is written.
+
+    Passing no path clears every database's snapshots (used by tooling that
+    writes graph versions out of band).
+    """
+    with _lock:
+        if db_path is None:
+            _snapshots.clear()
+        else:
+            for key in [k for k in _snapshots if k[0] == str(db_path)]:
+                del _snapshots[key]
+        _stats["invalidations"] += 1
+
+
+def get_graph_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "entries": len(_snapshots)}
+
+
+register_collector(
+    "graph_snapshot_cache",
+    lambda: cache_families(
+        "graph_snapshot_cache", "Published graph snapshot cache", get_graph_cache_stats()
+    ),
+)
@@ -0,0 +1,230 @@
+"""Downscaled renditions of submission photos.
+
+Besides the original upload, every image blob gets two JPEG renditions:
+
+* ``review``: at most 1600px on the long edge, for the admin review page
+  and notification email attachments;
+* ``thumb``: at most 320px, for submission lists.
+
+Both are rendered from one decode, rotated according to EXIF, flattened
+onto white and stripped of metadata (phone photos carry GPS tags). They are
+stored beside the blob as ``<sha256>.<variant>.jpg``, so identical uploads
+share them and the blob garbage collector removes them with the blob.
+
+Rendering runs on a small dedicated pool (``IMAGE_VARIANT_WORKERS``,
+default 1) so a burst of uploads cannot take over the request thread pool.
+``schedule_variants`` queues a blob once its submission commits;
+``get_variant`` joins a queued job, or starts one, when a rendition is
+requested before it exists, so a restart with work still queued loses
+nothing.
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from PIL import Image, ImageOps
+
+from .blob_store import blob_path
+from .metrics import IMAGE_VARIANT_SECONDS, MetricFamily, register_collector
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class VariantSpec:
+    max_edge: int
+    quality: int
+
+
+VARIANTS: Dict[str, VariantSpec] = {
+    "review": VariantSpec(max_edge=1600, quality=82),
+    "thumb": VariantSpec(max_edge=320, quality=70),
+}
+VARIANT_CONTENT_TYPE = "image/jpeg"
+# A 5 MB upload can still decode to gigabytes; refuse anything past 64 MP
+# (phone cameras top out around 50 MP).
+MAX_SOURCE_PIXELS = 64_000_000
+# How long a caller waits for a rendition before using the original.
+DEFAULT_WAIT_SECONDS = 30.0
+# Downloads wait much less: a list page asks for many thumbnails at once and
+# each wait holds a request thread. The fallback original is served
+# uncacheable, so the browser picks up the rendition on a later load.
+REQUEST_WAIT_SECONDS = 2.0
+
+
+def _get_env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def variant_path(upload_base_dir: Path, sha256: str, variant: str) -> Path:
+    blob = blob_path(upload_base_dir, sha256, VARIANT_CONTENT_TYPE)
+    return blob.with_name(f"{sha256}.{variant}.jpg")
+
+
+def render_variants(source: Path) -> Dict[str, bytes]:
+    """Encode every variant of the image at ``source``, largest first."""
+    with Image.open(source) as opened:
+        width, height = opened.size
+        if width * height > MAX_SOURCE_PIXELS:
+            raise ValueError(f"image too large to render ({width}x{height})")
+        largest = max(spec.max_edge for spec in VARIANTS.values())
+        # JPEG only: let the decoder downscale by a power of two while reading.
+        opened.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(opened)
+
+    if image.mode not in ("RGB", "L"):
+        rgba = image.convert("RGBA")
+        image = Image.new("RGB", rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel("A"))
+
+    rendered: Dict[str, bytes] = {}
+    for name, spec in sorted(VARIANTS.items(), key=lambda item: -item[1].max_edge):
+        # In place and never upscales, so each step starts from the last one.
+        image.thumbnail((spec.max_edge, spec.max_edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=spec.quality, optimize=True, progressive=True)
+        rendered[name] = buffer.getvalue()
+    return rendered
+
+
+def _write_atomic(target: Path, data: bytes) -> None:
+    temp_path = target.with_name(f".{uuid4()}.tmp")
+    try:
+        temp_path.write_bytes(data)
+        os.replace(temp_path, target)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def ensure_variants(upload_base_dir: Path, sha256: str, content_type: str) -> Dict[str, Path]:
+    """Render any missing variants of a blob; returns their paths."""
+    paths = {name: variant_path(upload_base_dir, sha256, name) for name in VARIANTS}
+    if all(path.exists() for path in paths.values()):
+        return paths
+    with IMAGE_VARIANT_SECONDS.time():
+        rendered = render_variants(blob_path(upload_base_dir, sha256, content_type))
+    for name, data in rendered.items():
+        _write_atomic(paths[name], data)
+    return paths
+
+
+class VariantRenderer:
+    """Runs ``ensure_variants`` on a private pool, one job per blob at a time."""
+
+    def __init__(self, max_workers: int) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-variants"
+        )
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future[Dict[str, Path]]] = {}
+
+    def submit(
+        self, upload_base_dir: Path, sha256: str, content_type: str
+    ) -> Future[Dict[str, Path]]:
+        with self._lock:
+            future = self._inflight.get(sha256)
+            if future is not None:
+                return future
+            future = self._executor.submit(ensure_variants, upload_base_dir, sha256, content_type)
+            self._inflight[sha256] = future
+        # Outside the lock: runs immediately if the job already finished.
+        future.add_done_callback(lambda _done: self._forget(sha256))
+        return future
+
+    def _forget(self, sha256: str) -> None:
+        with self._lock:
+            self._inflight.pop(sha256, None)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_renderer: Optional[VariantRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_variant_renderer() -> VariantRenderer:
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = VariantRenderer(max(1, _get_env_int("IMAGE_VARIANT_WORKERS", 1)))
+        return _renderer
+
+
+def shutdown_variant_renderer() -> None:
+    """Drop queued jobs; missing renditions are rendered on first request."""
+    global _renderer
+    with _renderer_lock:
+        renderer, _renderer = _renderer, None
+    if renderer is not None:
+        renderer.shutdown()
+
+
+def _log_failure(sha256: str, future: Future[Dict[str, Path]]) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Failed to render variants of %s: %s", sha256, future.exception())
+
+
+def schedule_variants(upload_base_dir: Path, blobs: Iterable[Tuple[str, str]]) -> None:
+    """Queue rendering for ``(sha256, content_type)`` pairs without waiting."""
+    renderer = get_variant_renderer()
+    for sha256, content_type in blobs:
+        future = renderer.submit(upload_base_dir, sha256, content_type)
+        future.add_done_callback(lambda done, sha256=sha256: _log_failure(sha256, done))
+
+
+def get_variant(
+    upload_base_dir: Path,
+    sha256: str,
+    content_type: str,
+    variant: str,
+    *,
+    timeout: float = DEFAULT_WAIT_SECONDS,
+) -> Optional[Path]:
+    """Path of a rendition, rendering it first if needed.
+
+    Returns None when the image cannot be rendered (corrupt, too large, or
+    still busy after ``timeout``); callers fall back to the original.
+    """
+    path = variant_path(upload_base_dir, sha256, variant)
+    if path.exists():
+        return path
+    future = get_variant_renderer().submit(upload_base_dir, sha256, content_type)
+    try:
+        return future.result(timeout=timeout)[variant]
+    except Exception as exc:
+        logger.warning("Variant %s of %s unavailable: %r", variant, sha256, exc)
+        return None
+
+
+def _collect_variant_families() -> List[MetricFamily]:
+    with _renderer_lock:
+        renderer = _renderer
+    pending = MetricFamily(
+        "image_variant_jobs_pending", "gauge", "Submission photos queued or being rendered."
+    )
+    pending.add(renderer.pending() if renderer is not None else 0)
+    return [pending]
+
+
+register_collector("image_variants", _collect_variant_families)
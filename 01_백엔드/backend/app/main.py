@@ -2,31 +2,51 @@
 
 from __future__ import annotations
 
+import asyncio
+import hmac
 import importlib
 import logging
 import os
-from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from .api import limiter as api_limiter
-from .api import router
-from .auth import hash_password, verify_password
+from .api import UPLOAD_BASE_DIR, router
+from .auth import (
+    PasswordHasherBusy,
+    hash_password,
+    shutdown_password_hasher,
+    verify_password,
+)
+from .blob_store import collect_garbage as collect_blob_garbage
 from .db import (
     cleanup_expired_refresh_tokens,
+    close_connection_pools,
     ensure_admin_user,
+    get_app_metadata,
+    get_user_cache,
     get_user_by_username,
     init_db,
     resolve_database_path,
     seed_db,
+    set_app_metadata,
     update_user_password,
 )
 from .graph_storage import shutdown_graph_storage
+from .image_variants import shutdown_variant_renderer
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import render as render_metrics
+from .notification_outbox import start_notification_sender, stop_notification_sender
+from .request_metrics import RequestMetricsMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +81,19 @@ def _resolve_rate_limit_dependencies() -> tuple[Any, Any]:
 _rate_limit_exceeded_handler, RateLimitExceeded = _resolve_rate_limit_dependencies()
 
 
+def _password_hasher_busy_handler(_request: Request, _exc: Exception) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={
+            "error": {
+                "code": "AUTH_BUSY",
+                "message": "로그인 요청이 많습니다. 잠시 후 다시 시도하세요.",
+            }
+        },
+    )
+
+
 def get_cors_origins() -> list[str]:
     """Get CORS origins from environment variable plus defaults for dev."""
     env_origins = os.getenv("CORS_ORIGINS", "")
@@ -95,6 +128,10 @@ def _load_env_file() -> None:
     logger.info("Loaded environment variables from %s", env_path)
 
 
+TOKEN_CLEANUP_AT_KEY = "refresh_token_cleanup_at"
+TOKEN_CLEANUP_INTERVAL = timedelta(hours=1)
+
+
 def _ensure_admin_account(db_path: Path) -> None:
     username = os.getenv("ADMIN_USERNAME", "").strip()
     password = os.getenv("ADMIN_PASSWORD", "").strip()
@@ -110,16 +147,19 @@ def _ensure_admin_account(db_path: Path) -> None:
         # Check if admin already exists
         existing = get_user_by_username(username, db_path)
         if existing:
-            # Verify password matches, update if different
+            # Verify password matches, update if different. This costs one
+            # bcrypt verify per boot; nothing derived from the plaintext
+            # password is stored to skip it.
             if not verify_password(password, existing["password_hash"]):
                 update_user_password(existing["id"], hash_password(password), db_path)
                 logger.info("Admin password updated: %s", username)
             return
 
         # Create new admin user
+        password_hash = hash_password(password)
         created = ensure_admin_user(
             username=username,
-            password_hash=hash_password(password),
+            password_hash=password_hash,
             email=email,
             name=name,
             grade=grade,
@@ -131,26 +171,168 @@ def _ensure_admin_account(db_path: Path) -> None:
         logger.warning("Failed to ensure admin account: %s", exc)
 
 
+def _cleanup_refresh_tokens_if_due(db_path: Path) -> None:
+    """Purge expired refresh tokens at most once per TOKEN_CLEANUP_INTERVAL."""
+    now = datetime.now(timezone.utc)
+    last_run = get_app_metadata(TOKEN_CLEANUP_AT_KEY, db_path)
+    if last_run:
+        try:
+            if now - datetime.fromisoformat(last_run) < TOKEN_CLEANUP_INTERVAL:
+                return
+        except ValueError:
+            pass
+    cleaned = cleanup_expired_refresh_tokens(db_path)
+    set_app_metadata(TOKEN_CLEANUP_AT_KEY, now.isoformat(), db_path)
+    if cleaned > 0:
+        logger.info("Cleaned up %d expired refresh tokens", cleaned)
+
+
+def get_refresh_token_sweep_seconds() -> float:
+    """Seconds between sweeper wake-ups; 0 disables the in-process sweeper."""
+    raw = os.getenv("REFRESH_TOKEN_SWEEP_INTERVAL_SECONDS", "").strip()
+    try:
+        return max(0.0, float(raw)) if raw else 600.0
+    except ValueError:
+        return 600.0
+
+
+async def _sweep_refresh_tokens_forever(db_path: Path, interval_seconds: float) -> None:
+    # Wakes more often than TOKEN_CLEANUP_INTERVAL; the shared app_metadata
+    # timestamp limits all workers to one sweep per interval.
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(_cleanup_refresh_tokens_if_due, db_path)
+        except Exception as exc:
+            logger.warning("Failed to cleanup expired tokens: %s", exc)
+
+
+def get_blob_gc_seconds() -> float:
+    """Seconds between upload blob garbage collections; 0 disables them."""
+    raw = os.getenv("BLOB_GC_INTERVAL_SECONDS", "").strip()
+    try:
+        return max(0.0, float(raw)) if raw else 3600.0
+    except ValueError:
+        return 3600.0
+
+
+async def _collect_blob_garbage_forever(db_path: Path, interval_seconds: float) -> None:
+    # Safe to run from every worker at once: each deletion re-checks the
+    # reference count under the database write lock.
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            stats = await run_in_threadpool(collect_blob_garbage, UPLOAD_BASE_DIR, db_path)
+        except Exception as exc:
+            logger.warning("Failed to collect upload blobs: %s", exc)
+            continue
+        if stats["bytesFreed"]:
+            logger.info(
+                "Collected upload blobs: %d unreferenced, %d orphaned, %d staged, %d bytes",
+                stats["blobsRemoved"],
+                stats["orphanFilesRemoved"],
+                stats["stagingFilesRemoved"],
+                stats["bytesFreed"],
+            )
+
+
+def get_notification_poll_seconds() -> float:
+    """Seconds between outbox polls; 0 disables sending from this process."""
+    raw = os.getenv("NOTIFICATION_POLL_SECONDS", "").strip()
+    try:
+        return max(0.0, float(raw)) if raw else 5.0
+    except ValueError:
+        return 5.0
+
+
+@contextmanager
+def _startup_phase(timings: dict[str, float], name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    _load_env_file()
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    with _startup_phase(timings, "env"):
+        _load_env_file()
     db_path = resolve_database_path()
     app.state.database_path = str(db_path)
     logger.info("Database path resolved to %s", db_path)
-    init_db(db_path)
-    seed_db(db_path)
-    _ensure_admin_account(db_path)
-    # Cleanup expired refresh tokens on startup
-    try:
-        cleaned = cleanup_expired_refresh_tokens(db_path)
-        if cleaned > 0:
-            logger.info("Cleaned up %d expired refresh tokens", cleaned)
-    except Exception as exc:
-        logger.warning("Failed to cleanup expired tokens: %s", exc)
+    with _startup_phase(timings, "init_db"):
+        init_db(db_path)
+    with _startup_phase(timings, "seed"):
+        seed_stats = seed_db(db_path)
+    if seed_stats:
+        logger.info(
+            "Seeded %d graph version(s): %d nodes, %d edges, %d problems in %.3fs",
+            seed_stats["graphVersions"],
+            seed_stats["nodes"],
+            seed_stats["edges"],
+            seed_stats["problems"],
+            seed_stats["totalSeconds"],
+        )
+    with _startup_phase(timings, "admin"):
+        _ensure_admin_account(db_path)
+    with _startup_phase(timings, "token_cleanup"):
+        try:
+            _cleanup_refresh_tokens_if_due(db_path)
+        except Exception as exc:
+            logger.warning("Failed to cleanup expired tokens: %s", exc)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+    app.state.startup_timings_ms = timings
+    logger.info(
+        "Startup phases (ms): %s",
+        " ".join(f"{name}={value}" for name, value in timings.items()),
+    )
+    background: list[asyncio.Task[None]] = []
+    sweep_seconds = get_refresh_token_sweep_seconds()
+    if sweep_seconds:
+        background.append(
+            asyncio.create_task(_sweep_refresh_tokens_forever(db_path, sweep_seconds))
+        )
+    blob_gc_seconds = get_blob_gc_seconds()
+    if blob_gc_seconds:
+        background.append(
+            asyncio.create_task(_collect_blob_garbage_forever(db_path, blob_gc_seconds))
+        )
+    poll_seconds = get_notification_poll_seconds()
+    if poll_seconds:
+        background.append(start_notification_sender(db_path, UPLOAD_BASE_DIR, poll_seconds))
     try:
         yield
     finally:
+        stop_notification_sender()
+        for task in background:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
         shutdown_graph_storage()
+        shutdown_password_hasher()
+        shutdown_variant_renderer()
+        get_user_cache().clear()
+        close_connection_pools()
+
+
+def metrics_endpoint(request: Request) -> Response:
+    """Prometheus text exposition; set METRICS_TOKEN to require a bearer token."""
+    token = os.getenv("METRICS_TOKEN", "").strip()
+    if token:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return JSONResponse(
+                status_code=401,
+                content={
+                    "error": {"code": "INVALID_TOKEN", "message": "메트릭 토큰이 올바르지 않습니다."}
+                },
+            )
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
 
 
 def create_app() -> FastAPI:
@@ -161,6 +343,7 @@ def create_app() -> FastAPI:
         api_limiter.enabled = False
     app.state.limiter = api_limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.add_exception_handler(PasswordHasherBusy, _password_hasher_busy_handler)
 
     app.add_middleware(
         CORSMiddleware,
@@ -169,8 +352,11 @@ def create_app() -> FastAPI:
         allow_methods=get_allowed_methods(),
         allow_headers=get_allowed_headers(),
     )
+    # Added last so it wraps CORS and times the whole request.
+    app.add_middleware(RequestMetricsMiddleware)
 
     app.include_router(router)
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
     return app
 
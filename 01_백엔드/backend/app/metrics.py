@@ -0,0 +1,309 @@
+"""Minimal Prometheus text-format metrics (no client library needed).
+
+Counters and histograms defined here are updated in-process by the code they
+measure. Values that already live elsewhere (per-route request aggregates,
+pool and graph cache stats) are pulled at scrape time by collectors
+registered with ``register_collector``. ``render()`` produces the
+``text/plain; version=0.0.4`` exposition served at ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for sub-millisecond SQLite statements and slow SMTP.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+@dataclass
+class Sample:
+    name: str
+    labels: Dict[str, str]
+    value: float
+
+
+@dataclass
+class MetricFamily:
+    name: str
+    kind: str  # "counter" | "gauge" | "histogram"
+    help: str
+    samples: List[Sample] = field(default_factory=list)
+
+    def add(self, value: float, suffix: str = "", **labels: str) -> None:
+        self.samples.append(Sample(self.name + suffix, labels, value))
+
+
+def histogram_samples(
+    family: MetricFamily,
+    labels: Dict[str, str],
+    bounds: Sequence[float],
+    bucket_counts: Sequence[int],
+    total: float,
+) -> None:
+    """Append cumulative ``_bucket``/``_sum``/``_count`` samples to ``family``.
+
+    ``bucket_counts`` holds one non-cumulative count per bound plus a final
+    +Inf count.
+    """
+    running = 0
+    for bound, count in zip((*bounds, math.inf), bucket_counts):
+        running += count
+        family.add(running, "_bucket", **labels, le=_format_value(bound))
+    family.add(total, "_sum", **labels)
+    family.add(running, "_count", **labels)
+
+
+def cache_families(name: str, description: str, stats: Dict[str, int]) -> List[MetricFamily]:
+    """Lookup counters, hit ratio and size for a cache exposing hits/misses/entries."""
+    hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+    lookups = MetricFamily(f"{name}_lookups_total", "counter", f"{description} lookups by result.")
+    lookups.add(hits, result="hit")
+    lookups.add(misses, result="miss")
+    ratio = MetricFamily(f"{name}_hit_ratio", "gauge", f"{description} hits / lookups since start.")
+    ratio.add(hits / (hits + misses) if hits + misses else 0.0)
+    entries = MetricFamily(f"{name}_entries", "gauge", f"{description} entries currently held.")
+    entries.add(stats.get("entries", 0))
+    return [lookups, ratio, entries]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> MetricFamily:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            family.add(value, **dict(zip(self.labelnames, key)))
+        return family
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket, one for +Inf, then the running sum.
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return int(sum(series[:-1])) if series else 0
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.kind, self.help)
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            histogram_samples(
+                family,
+                dict(zip(self.labelnames, key)),
+                self.buckets,
+                [int(v) for v in values[:-1]],
+                values[-1],
+            )
+        return family
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Add (or replace) a scrape-time collector under ``name``."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def collect(self) -> List[MetricFamily]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for sample in family.samples:
+                lines.append(
+                    f"{sample.name}{_format_labels(sample.labels)} {_format_value(sample.value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, help, labelnames)
+    REGISTRY.register(metric)
+    return metric
+
+
+def histogram(
+    name: str,
+    help: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    metric = Histogram(name, help, labelnames, buckets)
+    REGISTRY.register(metric)
+    return metric
+
+
+def register_collector(name: str, collector: Collector) -> None:
+    REGISTRY.register_collector(name, collector)
+
+
+def render(registry: Optional[MetricsRegistry] = None) -> str:
+    return (registry or REGISTRY).render()
+
+
+# Observed directly by db, auth, email_service and image_variants.
+DB_QUERY_SECONDS = histogram(
+    "sqlite_query_duration_seconds",
+    "Time spent in execute/executemany on pooled SQLite connections.",
+)
+DB_POOL_WAIT_SECONDS = histogram(
+    "sqlite_pool_wait_seconds",
+    "Time spent waiting to check out a pooled SQLite connection.",
+)
+PASSWORD_HASH_SECONDS = histogram(
+    "bcrypt_duration_seconds",
+    "Time spent in bcrypt hashing and verification.",
+    ("operation",),
+)
+PASSWORD_HASH_QUEUE_SECONDS = histogram(
+    "bcrypt_queue_wait_seconds",
+    "Time bcrypt jobs waited for a free password hashing worker.",
+)
+PASSWORD_HASH_REJECTED = counter(
+    "bcrypt_rejected_total",
+    "bcrypt jobs refused because the password hashing queue was full.",
+)
+EMAIL_SEND_SECONDS = histogram(
+    "email_send_duration_seconds",
+    "Time spent delivering homework notification emails over SMTP.",
+)
+EMAIL_SEND_RESULTS = counter(
+    "email_send_total",
+    "Homework notification emails by outcome (sent, failed, skipped).",
+    ("outcome",),
+)
+IMAGE_VARIANT_SECONDS = histogram(
+    "image_variant_render_seconds",
+    "Time spent decoding a submission photo and rendering its downscaled variants.",
+)
@@ -0,0 +1,188 @@
+"""Ordered schema migrations, applied once per database.
+
+Each migration has a stable id and is recorded in ``schema_migrations`` when
+applied, so startup only has to read that table to know the schema is current.
+Migrations never change once released; schema changes are added as new
+entries at the end of ``MIGRATIONS``.
+
+The early entries wrap the idempotent ``CREATE ... IF NOT EXISTS`` and
+column-check helpers that ``init_db`` used to run on every boot, so databases
+created before this runner existed upgrade cleanly.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Set, Tuple
+
+from . import db
+
+
+@dataclass(frozen=True)
+class Migration:
+    id: str
+    description: str
+    apply: Callable[[sqlite3.Connection], None]
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration("0001_core_tables", "Core graph, user and homework tables", db.create_core_tables),
+    Migration(
+        "0002_homework_review_columns",
+        "Review tracking columns on homework_submissions",
+        db._ensure_homework_review_columns,
+    ),
+    Migration(
+        "0003_homework_scheduled_at",
+        "homework_assignments.scheduled_at",
+        db._ensure_homework_scheduled_at_column,
+    ),
+    Migration(
+        "0004_homework_sticker_reward_count",
+        "homework_assignments.sticker_reward_count",
+        db._ensure_homework_sticker_reward_count_column,
+    ),
+    Migration("0005_user_columns", "Backfill legacy users columns", db._ensure_user_columns),
+    Migration(
+        "0006_refresh_token_columns",
+        "Backfill legacy refresh_tokens columns",
+        db._ensure_refresh_token_columns,
+    ),
+    Migration(
+        "0007_student_skill_levels",
+        "student_skill_levels table",
+        db.create_student_skill_levels_table,
+    ),
+    Migration("0008_study_sessions", "study_sessions table", db.create_study_sessions_table),
+    Migration(
+        "0009_study_sessions_diagnosis",
+        "study_sessions.diagnosis_json",
+        db.migrate_study_sessions_add_diagnosis,
+    ),
+    Migration("0010_study_responses", "study_responses table", db.create_study_responses_table),
+    Migration(
+        "0011_study_node_stats",
+        "Per-node recommendation aggregates, backfilled from history",
+        db.create_study_node_stats_tables,
+    ),
+    Migration(
+        "0012_homework_label_structures",
+        "homework_label_structures table",
+        db.create_homework_label_structures_table,
+    ),
+    Migration(
+        "0013_homework_label_mapping_events",
+        "homework_label_mapping_events table",
+        db.create_homework_label_mapping_events_table,
+    ),
+    Migration(
+        "0014_default_schema_version",
+        "Seed the schema_version row",
+        db.insert_default_schema_version,
+    ),
+    Migration(
+        "0015_homework_submission_problem_results",
+        "Per-problem submission results, backfilled from existing submissions",
+        db.create_homework_submission_problem_results_table,
+    ),
+    Migration(
+        "0016_homework_assignment_stats",
+        "Per-assignment submission counters, backfilled from existing rows",
+        db.create_homework_assignment_stats_table,
+    ),
+    Migration(
+        "0017_homework_latest_submission",
+        "homework_assignment_targets.latest_submission_id and per-student indexes",
+        db.create_homework_latest_submission_pointer,
+    ),
+    Migration(
+        "0018_lookup_indexes",
+        "Indexes for submission files by submission and graph versions by status",
+        db.create_lookup_indexes,
+    ),
+    Migration(
+        "0019_refresh_token_families",
+        "Refresh-token families, covering lookup index and sweeper indexes",
+        db.create_refresh_token_families,
+    ),
+    Migration(
+        "0020_homework_blobs",
+        "Content-addressed submission file blobs with trigger-kept reference counts",
+        db.create_homework_blobs,
+    ),
+    Migration(
+        "0021_notification_outbox",
+        "Durable outbox for notifications, written with the submission",
+        db.create_notification_outbox,
+    ),
+    Migration(
+        "0022_drop_admin_fingerprint",
+        "Remove the stored password-derived admin fingerprint",
+        db.drop_admin_account_fingerprint,
+    ),
+)
+
+
+def _ensure_migrations_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            id TEXT PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+def applied_migration_ids(conn: sqlite3.Connection) -> Set[str]:
+    try:
+        rows = conn.execute("SELECT id FROM schema_migrations").fetchall()
+    except sqlite3.OperationalError:
+        # Fresh database, or one created before migrations were recorded.
+        return set()
+    return {row[0] for row in rows}
+
+
+def plan_migrations(conn: sqlite3.Connection) -> List[Migration]:
+    """Return the migrations not yet applied to ``conn``, in order."""
+    applied = applied_migration_ids(conn)
+    return [migration for migration in MIGRATIONS if migration.id not in applied]
+
+
+def apply_migrations(conn: sqlite3.Connection, *, dry_run: bool = False) -> List[str]:
+    """Apply every pending migration in a single transaction.
+
+    Returns the ids applied (or pending, with ``dry_run``). On failure the
+    whole batch is rolled back and nothing is recorded. ``conn`` must not
+    have a transaction open, since the migrations need one of their own.
+    """
+    pending = plan_migrations(conn)
+    if dry_run or not pending:
+        return [migration.id for migration in pending]
+
+    if conn.in_transaction:
+        raise RuntimeError("apply_migrations needs a connection with no open transaction")
+    # IMMEDIATE takes the write lock up front so concurrent boots serialize;
+    # re-plan afterwards in case another process got there first.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _ensure_migrations_table(conn)
+        pending = plan_migrations(conn)
+        for migration in pending:
+            migration.apply(conn)
+            conn.execute(
+                "INSERT INTO schema_migrations (id, description, applied_at) VALUES (?, ?, ?)",
+                (
+                    migration.id,
+                    migration.description,
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return [migration.id for migration in pending]
@@ -333,7 +333,9 @@ class AdminAssignmentSummary(BaseModel):
     id: str
     title: str
     description: Optional[str] = None
-    problems: List[HomeworkProblem]
+    # Omitted (null) when the list is requested with includeProblems=false.
+    problems: Optional[List[HomeworkProblem]] = None
+    problemCount: int = 0
     dueAt: Optional[str] = None
     scheduledAt: Optional[str] = None
     stickerRewardCount: int = 2
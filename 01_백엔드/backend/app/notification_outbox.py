@@ -0,0 +1,311 @@
+"""Background sender for the ``notification_outbox`` table.
+
+``create_homework_submission`` writes an outbox row in the submission's own
+transaction, so a notification can neither be lost on restart nor sent for
+a submission that rolled back. ``NotificationSender`` drains the table in
+batches over one reused SMTP session. Failed sends are retried with
+exponential backoff and jitter, up to ``MAX_ATTEMPTS``; after that the row
+is kept as ``failed`` for inspection.
+
+Each worker process runs one sender (see ``main.lifespan``). Rows are leased
+with an atomic UPDATE, so several senders can share one database. A sender
+renews a row's lease just before sending it and records the outcome only
+while it still holds that lease, so a row another sender re-claimed after
+the lease ran out is not emailed twice. The submit handler calls
+``wake_notification_sender`` to skip the poll delay.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import smtplib
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .db import (
+    NOTIFICATION_HOMEWORK_SUBMITTED,
+    claim_notifications,
+    finish_notification,
+    get_homework_submission_with_files,
+    get_notification_outbox_counts,
+    prune_notifications,
+    release_notifications,
+    renew_notification_lease,
+)
+from .email_service import (
+    SMTPSession,
+    build_homework_notification,
+    is_email_configured,
+)
+from .image_variants import get_variant
+from .metrics import EMAIL_SEND_RESULTS, MetricFamily, register_collector
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 30.0
+MAX_BACKOFF_SECONDS = 3600.0
+# A claimed row is retried by any sender once its lease runs out.
+LEASE_SECONDS = 300.0
+# How long to wait for an attachment's review rendition before attaching the
+# original; every wait eats into the rest of the batch's lease.
+ATTACHMENT_WAIT_SECONDS = 5.0
+# Keep the SMTP session open this long after the last email, so a burst that
+# arrives in several batches still uses one connection.
+SMTP_IDLE_SECONDS = 30.0
+# Sent and skipped rows are deleted after this long.
+RETENTION = timedelta(days=7)
+PRUNE_INTERVAL_SECONDS = 3600.0
+
+
+# Errors that say nothing about the message itself: the rest of the batch
+# would fail the same way, so it is handed back untried.
+SERVER_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    smtplib.SMTPAuthenticationError,
+    smtplib.SMTPNotSupportedError,
+)
+
+
+# Errors from the notification itself (unknown kind, malformed payload).
+PERMANENT_ERRORS = (ValueError, KeyError, TypeError)
+
+
+def _is_server_error(exc: BaseException) -> bool:
+    # SMTPException subclasses OSError, so plain socket errors are the
+    # OSErrors that are not SMTP replies.
+    return isinstance(exc, SERVER_ERRORS) or (
+        isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+    )
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before retry number ``attempts`` (1-based), with +-20% jitter."""
+    delay = min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _attachment_path(upload_base_dir: Path, file_info: Dict[str, Any]) -> str:
+    """Attach the review rendition instead of the full-size original when possible."""
+    if file_info["blobSha256"]:
+        review = get_variant(
+            upload_base_dir,
+            file_info["blobSha256"],
+            file_info["contentType"],
+            "review",
+            timeout=ATTACHMENT_WAIT_SECONDS,
+        )
+        if review is not None:
+            return str(review)
+    return file_info["storedPath"]
+
+
+class NotificationSender:
+    def __init__(
+        self,
+        db_path: Optional[Path],
+        upload_base_dir: Path,
+        *,
+        batch_size: int = BATCH_SIZE,
+    ) -> None:
+        self.db_path = db_path
+        self.upload_base_dir = upload_base_dir
+        self.batch_size = batch_size
+        self._session = SMTPSession()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_prune = 0.0
+        self._server_down = False
+
+    def _build_message(self, notification: Dict[str, Any]) -> Optional[EmailMessage]:
+        if notification["kind"] != NOTIFICATION_HOMEWORK_SUBMITTED:
+            raise ValueError(f"unknown notification kind {notification['kind']!r}")
+        submission = get_homework_submission_with_files(
+            notification["payload"]["submissionId"], self.db_path
+        )
+        if not submission:
+            return None
+        return build_homework_notification(
+            student_id=submission["studentId"],
+            student_name=None,  # Could be enhanced to fetch student name
+            assignment_title=submission["assignmentTitle"],
+            problems=submission["problems"],
+            answers=submission["answers"],
+            file_paths=[
+                _attachment_path(self.upload_base_dir, f) for f in submission["files"]
+            ],
+        )
+
+    def _finish(self, notification: Dict[str, Any], status: str, **kwargs: Any) -> None:
+        if not finish_notification(
+            notification["id"],
+            status=status,
+            lease=notification["lease"],
+            path=self.db_path,
+            **kwargs,
+        ):
+            logger.warning(
+                "Lost the lease on notification %s before recording %s",
+                notification["id"],
+                status,
+            )
+
+    def _deliver(self, notification: Dict[str, Any]) -> str:
+        """Send one claimed notification and record the outcome; returns it."""
+        notification_id = notification["id"]
+        if not is_email_configured():
+            EMAIL_SEND_RESULTS.inc(outcome="skipped")
+            self._finish(notification, "skipped")
+            return "skipped"
+        try:
+            msg = self._build_message(notification)
+            if msg is None:
+                # The submission was deleted before we got to it.
+                self._finish(notification, "skipped")
+                return "skipped"
+            # Building may have waited on renditions; make sure no other
+            # sender took the row over meanwhile, and restart the lease.
+            lease = renew_notification_lease(
+                notification_id,
+                lease=notification["lease"],
+                lease_seconds=LEASE_SECONDS,
+                path=self.db_path,
+            )
+            if lease is None:
+                logger.warning("Lost the lease on notification %s; not sending", notification_id)
+                return "lost"
+            notification["lease"] = lease
+            self._session.send(msg)
+        except Exception as exc:
+            # Anything else (a locked database, say) is retried like an SMTP
+            # error; a malformed notification never will succeed.
+            self._server_down = _is_server_error(exc)
+            attempts = notification["attempts"]
+            error = f"{type(exc).__name__}: {exc}"
+            if attempts >= MAX_ATTEMPTS or isinstance(exc, PERMANENT_ERRORS):
+                logger.error(
+                    "Giving up on notification %s after %d attempts: %s",
+                    notification_id,
+                    attempts,
+                    error,
+                )
+                self._finish(notification, "failed", error=error)
+                return "failed"
+            retry_at = datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds(attempts))
+            logger.warning(
+                "Notification %s failed (attempt %d), retrying at %s: %s",
+                notification_id,
+                attempts,
+                retry_at.isoformat(),
+                error,
+            )
+            self._finish(
+                notification, "pending", error=error, next_attempt_at=retry_at.isoformat()
+            )
+            return "retried"
+        self._finish(notification, "sent")
+        return "sent"
+
+    def drain_once(self) -> Dict[str, int]:
+        """Send everything that is due now; blocking, call from a thread."""
+        counts = {"sent": 0, "retried": 0, "failed": 0, "skipped": 0, "lost": 0}
+        self._server_down = False
+        while not self._server_down:
+            batch = claim_notifications(
+                limit=self.batch_size,
+                lease_seconds=LEASE_SECONDS,
+                max_attempts=MAX_ATTEMPTS,
+                path=self.db_path,
+            )
+            if not batch:
+                break
+            for index, notification in enumerate(batch):
+                untried = [(pending["id"], pending["lease"]) for pending in batch[index + 1 :]]
+                try:
+                    counts[self._deliver(notification)] += 1
+                except Exception:
+                    # Recording the outcome failed. This row waits out its
+                    # lease; the rest need not.
+                    release_notifications(untried, self.db_path)
+                    raise
+                if self._server_down:
+                    release_notifications(untried, self.db_path)
+                    break
+        if self._session.connected and time.monotonic() - self._session.last_used > (
+            SMTP_IDLE_SECONDS
+        ):
+            self._session.close()
+        if time.monotonic() - self._last_prune > PRUNE_INTERVAL_SECONDS:
+            self._last_prune = time.monotonic()
+            cutoff = (datetime.now(timezone.utc) - RETENTION).isoformat()
+            prune_notifications(cutoff, self.db_path)
+        return counts
+
+    def wake(self) -> None:
+        """Ask the running sender to drain now instead of at its next poll."""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run_forever(self, poll_seconds: float) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await run_in_threadpool(self.drain_once)
+                except Exception as exc:
+                    logger.warning("Notification sender failed: %s", exc)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+        finally:
+            self._loop = None
+            self._session.close()
+
+
+_sender: Optional[NotificationSender] = None
+
+
+def start_notification_sender(
+    db_path: Optional[Path], upload_base_dir: Path, poll_seconds: float
+) -> "asyncio.Task[None]":
+    """Run this process's sender as a task on the current event loop."""
+    global _sender
+    _sender = NotificationSender(db_path, upload_base_dir)
+    return asyncio.create_task(_sender.run_forever(poll_seconds))
+
+
+def stop_notification_sender() -> None:
+    global _sender
+    _sender = None
+
+
+def wake_notification_sender() -> None:
+    if _sender is not None:
+        _sender.wake()
+
+
+def _collect_outbox_families() -> List[MetricFamily]:
+    sender = _sender
+    outbox = MetricFamily(
+        "notification_outbox_rows", "gauge", "Notification outbox rows by status."
+    )
+    if sender is not None:
+        for status, count in sorted(get_notification_outbox_counts(sender.db_path).items()):
+            outbox.add(count, status=status)
+    return [outbox]
+
+
+register_collector("notification_outbox", _collect_outbox_families)
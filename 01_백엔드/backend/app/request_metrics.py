@@ -0,0 +1,268 @@
+"""Per-request timing and SQL accounting.
+
+``RequestMetricsMiddleware`` runs every HTTP request inside
+``db.collect_statement_stats``. It adds a ``Server-Timing`` header, logs one
+JSON line per request (WARNING once a request is slower than
+``SLOW_REQUEST_MS``) and folds the numbers into a per-route registry that
+``/api/admin/metrics`` serves.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .db import StatementStats, collect_statement_stats
+from .metrics import MetricFamily, histogram_samples, register_collector
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram kept per route.
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Route label for requests that matched no route, so 404 probes cannot grow
+# the registry without bound.
+UNMATCHED_ROUTE = "<unmatched>"
+_SQL_PREVIEW_CHARS = 300
+
+
+def _sql_preview(sql: Optional[str]) -> Optional[str]:
+    if sql is None:
+        return None
+    return " ".join(sql.split())[:_SQL_PREVIEW_CHARS]
+
+
+@dataclass
+class RouteMetrics:
+    count: int = 0
+    server_errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    sql_statements: int = 0
+    sql_ms: float = 0.0
+    max_sql_statements: int = 0
+    pool_wait_ms: float = 0.0
+    slowest_sql: Optional[str] = None
+    slowest_sql_ms: float = 0.0
+    # One count per LATENCY_BUCKETS_MS bound plus a final +Inf bucket.
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+    def observe(self, status: int, duration_ms: float, stats: StatementStats) -> None:
+        self.count += 1
+        if status >= 500:
+            self.server_errors += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.sql_statements += stats.count
+        self.sql_ms += stats.seconds * 1000
+        self.max_sql_statements = max(self.max_sql_statements, stats.count)
+        self.pool_wait_ms += stats.pool_wait_seconds * 1000
+        if stats.slowest_sql is not None and stats.slowest_seconds * 1000 >= self.slowest_sql_ms:
+            self.slowest_sql_ms = stats.slowest_seconds * 1000
+            self.slowest_sql = _sql_preview(stats.slowest_sql)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, count in zip((*LATENCY_BUCKETS_MS, "+Inf"), self.buckets):
+            running += count
+            cumulative[str(bound)] = running
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "serverErrors": self.server_errors,
+            "meanMs": round(self.total_ms / count, 3),
+            "maxMs": round(self.max_ms, 3),
+            "sqlStatements": self.sql_statements,
+            "meanSqlStatements": round(self.sql_statements / count, 2),
+            "maxSqlStatements": self.max_sql_statements,
+            "sqlMs": round(self.sql_ms, 3),
+            "meanSqlMs": round(self.sql_ms / count, 3),
+            "poolWaitMs": round(self.pool_wait_ms, 3),
+            "slowestSql": self.slowest_sql,
+            "slowestSqlMs": round(self.slowest_sql_ms, 3),
+            "latencyBucketsMs": cumulative,
+        }
+
+
+class RequestMetricsRegistry:
+    """Thread-safe per-(method, route) aggregates since process start."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._started = time.monotonic()
+
+    def observe(
+        self, method: str, route: str, status: int, duration_ms: float, stats: StatementStats
+    ) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.observe(status, duration_ms, stats)
+
+    def routes(self) -> Dict[Tuple[str, str], RouteMetrics]:
+        """Copies of the current aggregates, keyed by (method, route)."""
+        with self._lock:
+            return {
+                key: RouteMetrics(**{**vars(value), "buckets": list(value.buckets)})
+                for key, value in self._routes.items()
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        routes = self.routes()
+        return {
+            "uptimeSeconds": round(time.monotonic() - self._started, 3),
+            "routes": [
+                {"method": method, "route": route, **metrics.snapshot()}
+                for (method, route), metrics in sorted(routes.items(), key=lambda item: item[0][1])
+            ],
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+            self._started = time.monotonic()
+
+
+_registry = RequestMetricsRegistry()
+
+
+def get_request_metrics() -> RequestMetricsRegistry:
+    return _registry
+
+
+def _collect_request_families() -> List[MetricFamily]:
+    duration = MetricFamily(
+        "http_request_duration_seconds", "histogram", "HTTP request latency by route template."
+    )
+    errors = MetricFamily(
+        "http_request_server_errors_total", "counter", "HTTP 5xx responses by route template."
+    )
+    sql = MetricFamily(
+        "http_request_sql_statements_total", "counter", "SQL statements issued by route template."
+    )
+    bounds = [bound / 1000 for bound in LATENCY_BUCKETS_MS]
+    for (method, route), metrics in sorted(_registry.routes().items()):
+        labels = {"method": method, "route": route}
+        histogram_samples(duration, labels, bounds, metrics.buckets, metrics.total_ms / 1000)
+        errors.add(metrics.server_errors, **labels)
+        sql.add(metrics.sql_statements, **labels)
+    return [duration, errors, sql]
+
+
+register_collector("http_requests", _collect_request_families)
+
+
+def _route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if isinstance(path, str) else UNMATCHED_ROUTE
+
+
+def _server_timing(stats: StatementStats, duration_ms: float) -> str:
+    parts = [
+        f"app;dur={duration_ms:.1f}",
+        f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"',
+    ]
+    if stats.pool_wait_seconds:
+        parts.append(f"pool;dur={stats.pool_wait_seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _get_slow_request_ms() -> float:
+    raw = os.getenv("SLOW_REQUEST_MS", "").strip()
+    try:
+        return float(raw) if raw else 1000.0
+    except ValueError:
+        return 1000.0
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are not buffered."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        registry: Optional[RequestMetricsRegistry] = None,
+        slow_request_ms: Optional[float] = None,
+    ) -> None:
+        self.app = app
+        self.registry = registry or _registry
+        self.slow_request_ms = (
+            slow_request_ms if slow_request_ms is not None else _get_slow_request_ms()
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        with collect_statement_stats() as stats:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        _server_timing(stats, (time.perf_counter() - started) * 1000),
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                duration_ms = (time.perf_counter() - started) * 1000
+                route = _route_template(scope)
+                method = scope.get("method", "")
+                self.registry.observe(method, route, status, duration_ms, stats)
+                self._log(method, route, scope.get("path", ""), status, duration_ms, stats)
+
+    def _log(
+        self,
+        method: str,
+        route: str,
+        path: str,
+        status: int,
+        duration_ms: float,
+        stats: StatementStats,
+    ) -> None:
+        slow = duration_ms >= self.slow_request_ms
+        level = logging.WARNING if slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        payload: Dict[str, Any] = {
+            "event": "request",
+            "method": method,
+            "route": route,
+            "path": path,
+            "status": status,
+            "durationMs": round(duration_ms, 3),
+            "sqlStatements": stats.count,
+            "sqlMs": round(stats.seconds * 1000, 3),
+            "slowestSqlMs": round(stats.slowest_seconds * 1000, 3),
+        }
+        if stats.pool_wait_seconds:
+            payload["poolWaitMs"] = round(stats.pool_wait_seconds * 1000, 3)
+        if slow:
+            payload["slowestSql"] = _sql_preview(stats.slowest_sql)
+        logger.log(level, json.dumps(payload, ensure_ascii=False))
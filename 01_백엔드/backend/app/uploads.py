@@ -0,0 +1,122 @@
+"""Streaming staging of uploaded homework images.
+
+Uploads are copied chunk by chunk from the request's spooled file into a
+temporary file next to their final location, so the size limit is enforced
+while reading and no upload is ever held in memory whole. The image type is
+taken from the file's magic bytes, not from the client's ``content_type``,
+and the SHA-256 that keys the blob store is computed on the same pass.
+A staged file only gets its final name (an atomic ``os.replace``) once the
+database rows pointing at it are committed.
+
+Everything here does blocking I/O; async handlers call it through
+``run_in_threadpool``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional
+from uuid import uuid4
+
+CHUNK_SIZE = 64 * 1024
+STAGING_DIR_NAME = ".staging"
+
+EXT_BY_CONTENT_TYPE = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+
+
+class UploadRejected(ValueError):
+    """Raised with an API error code (``FILE_TOO_LARGE``, ``INVALID_FILE_TYPE``)."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Return the MIME type of a jpeg/png/webp header, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass
+class StagedUpload:
+    temp_path: Path
+    size_bytes: int
+    content_type: str
+    original_name: str
+    sha256: str
+
+    @property
+    def ext(self) -> str:
+        return EXT_BY_CONTENT_TYPE[self.content_type]
+
+    def promote(self, final_path: Path) -> None:
+        """Atomically move the staged file to ``final_path``."""
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.temp_path, final_path)
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+def get_staging_dir(upload_base_dir: Path) -> Path:
+    # Inside the upload root so promote() never crosses a filesystem.
+    staging_dir = upload_base_dir / STAGING_DIR_NAME
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    return staging_dir
+
+
+def stage_upload(
+    source: BinaryIO,
+    staging_dir: Path,
+    *,
+    original_name: str,
+    max_bytes: int,
+    chunk_size: int = CHUNK_SIZE,
+) -> StagedUpload:
+    """Copy ``source`` into ``staging_dir``, validating type and size as it goes.
+
+    Raises ``UploadRejected`` (after removing the partial file) when the
+    magic bytes are not jpeg/png/webp or the upload exceeds ``max_bytes``.
+    """
+    source.seek(0)
+    head = source.read(chunk_size)
+    content_type = sniff_image_type(head)
+    if content_type is None:
+        raise UploadRejected("INVALID_FILE_TYPE")
+
+    temp_path = staging_dir / f"{uuid4()}.part"
+    size_bytes = 0
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, "wb") as out:
+            chunk = head
+            while chunk:
+                size_bytes += len(chunk)
+                if size_bytes > max_bytes:
+                    raise UploadRejected("FILE_TOO_LARGE")
+                out.write(chunk)
+                digest.update(chunk)
+                chunk = source.read(chunk_size)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return StagedUpload(
+        temp_path=temp_path,
+        size_bytes=size_bytes,
+        content_type=content_type,
+        original_name=original_name,
+        sha256=digest.hexdigest(),
+    )
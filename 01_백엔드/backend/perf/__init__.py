@@ -0,0 +1 @@
+"""Performance tooling: synthetic datasets, query-plan guards and benchmarks."""
@@ -0,0 +1,416 @@
+"""End-to-end API benchmark against a synthetic database.
+
+Builds a synthetic dataset (see ``perf.synthetic``), boots ``create_app()`` on
+it in-process and drives a weighted mix of login, graph, homework, review,
+study-session and recommendation traffic with a fixed number of concurrent
+clients. Prints (or writes) per-endpoint p50/p95/p99 latency and throughput as
+JSON; ``--compare`` adds deltas against a previous report.
+
+    python -m perf.load --requests 2000 --concurrency 8 --output bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app import db  # noqa: E402
+from perf.synthetic import SyntheticDataset, SyntheticScale, build_synthetic_db  # noqa: E402
+
+DEFAULT_MIX: Dict[str, int] = {
+    "login": 1,
+    "graph": 3,
+    "homework_list": 4,
+    "submit": 2,
+    "review": 1,
+    "recommendations": 3,
+    "study_session": 2,
+    "admin_assignments": 1,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class EndpointSamples:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, elapsed_ms: float, status: int, ok: bool) -> None:
+        self.latencies_ms.append(elapsed_ms)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        values = sorted(self.latencies_ms)
+        return {
+            "count": len(values),
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughputRps": round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+            "meanMs": round(sum(values) / len(values), 3) if values else 0.0,
+            "p50Ms": round(percentile(values, 50), 3),
+            "p95Ms": round(percentile(values, 95), 3),
+            "p99Ms": round(percentile(values, 99), 3),
+            "maxMs": round(values[-1], 3) if values else 0.0,
+        }
+
+
+class LoadState:
+    """Shared tokens and work queues that keep the mix valid as it runs."""
+
+    def __init__(self, dataset: SyntheticDataset, rng: random.Random) -> None:
+        self.dataset = dataset
+        self.rng = rng
+        self.admin_token = ""
+        self.student_tokens: Dict[str, str] = {}
+        conn = db.connect(dataset.db_path)
+        try:
+            # Targets without a submission yet can be submitted exactly once.
+            self.open_targets = [
+                (row["assignment_id"], row["student_id"])
+                for row in conn.execute(
+                    "SELECT assignment_id, student_id FROM homework_assignment_targets "
+                    "WHERE latest_submission_id IS NULL ORDER BY assignment_id, student_id"
+                )
+            ]
+            self.pending_reviews = [
+                row["id"]
+                for row in conn.execute(
+                    "SELECT id FROM homework_submissions WHERE review_status = 'pending' ORDER BY id"
+                )
+            ]
+        finally:
+            conn.close()
+        rng.shuffle(self.open_targets)
+        rng.shuffle(self.pending_reviews)
+
+    def student(self) -> Tuple[str, str]:
+        username = self.rng.choice(self.dataset.student_usernames)
+        return username, self.student_tokens[username]
+
+
+Operation = Callable[[httpx.AsyncClient, LoadState], Awaitable[Optional[Tuple[str, httpx.Response]]]]
+
+
+def _auth(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> httpx.Response:
+    return await client.post("/api/auth/login", json={"username": username, "password": password})
+
+
+async def op_login(client: httpx.AsyncClient, state: LoadState):
+    username = state.rng.choice(state.dataset.student_usernames)
+    return "POST /api/auth/login", await _login(client, username, state.dataset.password)
+
+
+async def op_graph(client: httpx.AsyncClient, state: LoadState):
+    return "GET /api/graph/published", await client.get("/api/graph/published")
+
+
+async def op_homework_list(client: httpx.AsyncClient, state: LoadState):
+    username, token = state.student()
+    response = await client.get(
+        "/api/homework/assignments", params={"studentId": username}, headers=_auth(token)
+    )
+    return "GET /api/homework/assignments", response
+
+
+async def op_submit(client: httpx.AsyncClient, state: LoadState):
+    if not state.open_targets:
+        return None
+    assignment_id, student_id = state.open_targets.pop()
+    answers = {
+        f"p{index + 1}": state.rng.choice(("1", "2", "모름"))
+        for index in range(state.dataset.scale.problems_per_assignment)
+    }
+    response = await client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={"studentId": student_id, "answersJson": json.dumps(answers, ensure_ascii=False)},
+        headers=_auth(state.student_tokens[student_id]),
+    )
+    if response.status_code == 200:
+        state.pending_reviews.append(response.json()["submissionId"])
+    return "POST /api/homework/assignments/{assignment_id}/submit", response
+
+
+async def op_review(client: httpx.AsyncClient, state: LoadState):
+    if not state.pending_reviews:
+        return None
+    submission_id = state.pending_reviews.pop()
+    if state.rng.random() < 0.5:
+        body: Dict[str, Any] = {"status": "approved", "problemReviews": {}}
+    else:
+        body = {"status": "returned", "problemReviews": {"p1": {"comment": "다시 풀어보세요"}}}
+    response = await client.post(
+        f"/api/homework/submissions/{submission_id}/review",
+        json=body,
+        headers=_auth(state.admin_token),
+    )
+    return "POST /api/homework/submissions/{submission_id}/review", response
+
+
+async def op_recommendations(client: httpx.AsyncClient, state: LoadState):
+    _, token = state.student()
+    return "GET /api/recommendations", await client.get("/api/recommendations", headers=_auth(token))
+
+
+async def op_study_session(client: httpx.AsyncClient, state: LoadState):
+    _, token = state.student()
+    node_id = state.rng.choice(state.dataset.node_ids)
+    correct = [state.rng.random() < 0.8 for _ in range(4)]
+    response = await client.post(
+        "/api/study-sessions",
+        json={
+            "nodeId": node_id,
+            "status": "SUBMITTED",
+            "gradingJson": json.dumps({"cleared": all(correct)}),
+            "responses": [
+                {
+                    "problemId": f"{node_id}-p{index}",
+                    "inputRaw": "42",
+                    "isCorrect": is_correct,
+                    "timeSpentMs": 5000,
+                }
+                for index, is_correct in enumerate(correct)
+            ],
+        },
+        headers=_auth(token),
+    )
+    return "POST /api/study-sessions", response
+
+
+async def op_admin_assignments(client: httpx.AsyncClient, state: LoadState):
+    response = await client.get(
+        "/api/homework/admin/assignments",
+        params={"includeProblems": "false"},
+        headers=_auth(state.admin_token),
+    )
+    return "GET /api/homework/admin/assignments", response
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "login": op_login,
+    "graph": op_graph,
+    "homework_list": op_homework_list,
+    "submit": op_submit,
+    "review": op_review,
+    "recommendations": op_recommendations,
+    "study_session": op_study_session,
+    "admin_assignments": op_admin_assignments,
+}
+
+
+def parse_mix(raw: Optional[str]) -> Dict[str, int]:
+    """Parse ``name=weight,...``; unnamed operations keep their default weight."""
+    mix = dict(DEFAULT_MIX)
+    if not raw:
+        return mix
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (expected one of {sorted(OPERATIONS)})")
+        mix[name] = int(weight)
+    return mix
+
+
+async def _prepare(client: httpx.AsyncClient, state: LoadState) -> None:
+    from app.auth import create_access_token
+
+    dataset = state.dataset
+    response = await _login(client, dataset.admin_username, dataset.password)
+    response.raise_for_status()
+    state.admin_token = response.json()["accessToken"]
+    # Student tokens are minted directly so only the login operation pays for
+    # password hashing.
+    for user_id, username in zip(dataset.student_user_ids, dataset.student_usernames):
+        token, _claims = create_access_token(user_id=user_id, username=username, role="student")
+        state.student_tokens[username] = token
+
+
+async def drive(
+    app: Any,
+    dataset: SyntheticDataset,
+    *,
+    requests: int,
+    concurrency: int,
+    mix: Dict[str, int],
+    seed: int = 11,
+) -> Dict[str, Any]:
+    """Send ``requests`` operations through ``app`` with ``concurrency`` clients."""
+    rng = random.Random(seed)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    samples: Dict[str, EndpointSamples] = {}
+    remaining = requests
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            state = LoadState(dataset, rng)
+            await _prepare(client, state)
+
+            async def worker() -> None:
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    operation = OPERATIONS[rng.choices(names, weights)[0]]
+                    started = time.perf_counter()
+                    result = await operation(client, state)
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    if result is None:
+                        continue
+                    endpoint, response = result
+                    samples.setdefault(endpoint, EndpointSamples()).record(
+                        elapsed_ms, response.status_code, response.status_code < 400
+                    )
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+            wall_seconds = time.perf_counter() - started
+
+    overall = EndpointSamples()
+    for endpoint_samples in samples.values():
+        overall.latencies_ms.extend(endpoint_samples.latencies_ms)
+        overall.errors += endpoint_samples.errors
+        for status, count in endpoint_samples.statuses.items():
+            overall.statuses[status] = overall.statuses.get(status, 0) + count
+    return {
+        "wallSeconds": round(wall_seconds, 3),
+        "concurrency": concurrency,
+        "mix": mix,
+        "overall": overall.summary(wall_seconds),
+        "endpoints": {
+            endpoint: endpoint_samples.summary(wall_seconds)
+            for endpoint, endpoint_samples in sorted(samples.items())
+        },
+    }
+
+
+def compare_reports(current: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-endpoint p50/p95/p99 and throughput ratios (current / previous)."""
+    deltas: Dict[str, Any] = {}
+    for endpoint, result in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        deltas[endpoint] = {
+            key: round(result[key] / before[key], 3) if before[key] else None
+            for key in ("p50Ms", "p95Ms", "p99Ms", "throughputRps")
+        }
+    return deltas
+
+
+def configure_environment(db_path: Path, dataset: SyntheticDataset) -> None:
+    os.environ["DATABASE_PATH"] = str(db_path)
+    os.environ.setdefault("JWT_SECRET", "bench-secret-please-use-at-least-32-bytes")
+    os.environ["DISABLE_RATE_LIMITS"] = "1"
+    os.environ["ADMIN_USERNAME"] = dataset.admin_username
+    os.environ["ADMIN_PASSWORD"] = dataset.password
+    os.environ.setdefault("ADMIN_AUTH_EMAIL", "perf-admin@example.com")
+
+
+def run_benchmark(
+    *,
+    scale: SyntheticScale,
+    requests: int,
+    concurrency: int,
+    mix: Dict[str, int],
+    seed: int = 7,
+    work_dir: Optional[Path] = None,
+) -> Dict[str, Any]:
+    from app.main import create_app
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        db_path = Path(tmp) / "bench.db"
+        started = time.perf_counter()
+        dataset = build_synthetic_db(db_path, scale, seed=seed)
+        build_seconds = time.perf_counter() - started
+        configure_environment(db_path, dataset)
+        results = asyncio.run(
+            drive(
+                create_app(),
+                dataset,
+                requests=requests,
+                concurrency=concurrency,
+                mix=mix,
+                seed=seed,
+            )
+        )
+    summary = dataset.summary()
+    summary.pop("dbPath", None)
+    summary["buildSeconds"] = round(build_seconds, 3)
+    return {"dataset": summary, **results}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = SyntheticScale()
+    parser = argparse.ArgumentParser(description="Benchmark the API against a synthetic database.")
+    parser.add_argument("--students", type=int, default=defaults.students)
+    parser.add_argument("--assignments", type=int, default=defaults.assignments)
+    parser.add_argument("--targets-per-assignment", type=int, default=defaults.targets_per_assignment)
+    parser.add_argument("--sessions-per-student", type=int, default=defaults.sessions_per_student)
+    parser.add_argument("--problem-batches", type=int, default=defaults.problem_batches)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default=None, help="Operation weights, e.g. graph=5,submit=1")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="Previous report to diff against")
+    args = parser.parse_args(argv)
+
+    scale = SyntheticScale(
+        students=args.students,
+        assignments=args.assignments,
+        targets_per_assignment=args.targets_per_assignment,
+        sessions_per_student=args.sessions_per_student,
+        problem_batches=args.problem_batches,
+    )
+    report = run_benchmark(
+        scale=scale,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        mix=parse_mix(args.mix),
+        seed=args.seed,
+    )
+    if args.compare:
+        previous = json.loads(args.compare.read_text(encoding="utf-8"))
+        report["comparedTo"] = str(args.compare)
+        report["ratios"] = compare_reports(report, previous)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
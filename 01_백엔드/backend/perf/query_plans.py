@@ -0,0 +1,355 @@
+"""Query-plan guard and latency baselines for the hot db.py queries.
+
+Each hot query runs through the real helper against a synthetic database while
+``db.trace_statements`` captures the SQL it issues. Every captured SELECT is
+then passed through ``EXPLAIN QUERY PLAN``; any ``SCAN`` of a table (including a
+walk over a whole index) is reported as a full scan unless the query
+explicitly allows it. Bounded lookups show up as ``SEARCH``.
+
+Run ``python -m perf.query_plans`` from the backend directory to build a
+full-scale database, check plans and compare latencies against
+``perf/baselines/query_plans.json``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app import db  # noqa: E402
+from perf.synthetic import SMALL_SCALE, SyntheticDataset, SyntheticScale, build_synthetic_db  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines" / "query_plans.json"
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    run: Callable[[SyntheticDataset], Any]
+    # Table aliases this query may scan in full, e.g. an unpaginated list of
+    # every assignment.
+    allowed_scans: FrozenSet[str] = frozenset()
+
+
+def _list_study_sessions(ds: SyntheticDataset) -> Any:
+    from app import api
+
+    user = SimpleNamespace(user_id=ds.student_user_ids[0])
+    return api.list_study_sessions(
+        limit=20, cursor=None, since=None, includeScratchpad=False, user=user
+    )
+
+
+def _recommendations(ds: SyntheticDataset) -> Any:
+    from app import api
+
+    conn = db.connect(ds.db_path)
+    try:
+        return api._compute_recommendations(
+            ds.student_user_ids[0], ds.student_usernames[0], conn
+        )
+    finally:
+        conn.close()
+
+
+def _first_submission(ds: SyntheticDataset) -> Tuple[str, str, str]:
+    # Synthetic submission ids are "sub-<assignment>-<student>-<attempt>".
+    submission_id = ds.submission_ids[0]
+    _, assignment_number, student_id, _attempt = submission_id.rsplit("-", 3)
+    return f"hw-{assignment_number}", student_id, submission_id
+
+
+HOT_QUERIES: Tuple[HotQuery, ...] = (
+    HotQuery(
+        "auth.user_by_username",
+        lambda ds: db.get_user_by_username(ds.student_usernames[0], path=ds.db_path),
+    ),
+    HotQuery(
+        "auth.refresh_token_by_hash",
+        lambda ds: db.get_refresh_token_by_hash("0" * 64, path=ds.db_path),
+    ),
+    HotQuery(
+        "homework.problems_by_label",
+        lambda ds: db.list_homework_problems_admin(
+            label_key=ds.label_keys[0], limit=50, path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.problems_by_week",
+        lambda ds: db.list_homework_problems_admin(
+            week_key=ds.week_keys[0], limit=50, path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.student_assignments",
+        lambda ds: db.list_homework_assignments_for_student(
+            _first_submission(ds)[1], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.student_assignments_admin",
+        lambda ds: db.list_homework_assignments_for_student_admin(
+            _first_submission(ds)[1], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.wrong_problems",
+        lambda ds: db.list_wrong_problems_for_student_admin(
+            student_id=_first_submission(ds)[1], limit=50, path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.daily_summary",
+        lambda ds: db.list_admin_daily_homework_summary_for_student(
+            _first_submission(ds)[1], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.pending_count",
+        lambda ds: db.get_pending_homework_count(_first_submission(ds)[1], path=ds.db_path),
+    ),
+    HotQuery(
+        "homework.assignment_for_student",
+        lambda ds: db.get_homework_assignment(
+            *_first_submission(ds)[:2], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.submission_exists",
+        lambda ds: db.check_homework_submission_exists(
+            *_first_submission(ds)[:2], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.submission_for_review",
+        lambda ds: db.get_homework_submission_for_review(
+            _first_submission(ds)[2], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.submission_with_files",
+        lambda ds: db.get_homework_submission_with_files(
+            _first_submission(ds)[2], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.assignment_admin_detail",
+        lambda ds: db.get_homework_assignment_admin(
+            _first_submission(ds)[0], path=ds.db_path
+        ),
+    ),
+    HotQuery(
+        "homework.assignment_admin_list",
+        lambda ds: db.list_all_homework_assignments_admin(
+            path=ds.db_path, include_problems=False
+        ),
+        allowed_scans=frozenset({"ha"}),
+    ),
+    HotQuery(
+        "praise.summary",
+        lambda ds: db.get_praise_sticker_summary(ds.student_usernames[0], path=ds.db_path),
+    ),
+    HotQuery("study.list_sessions", _list_study_sessions),
+    HotQuery("study.recommendations", _recommendations),
+)
+
+
+_SCAN_RE = re.compile(r"^SCAN (\S+)(.*)$")
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Return the tables an EXPLAIN QUERY PLAN reads in full."""
+    derived = {
+        detail.split(" ", 1)[1]
+        for detail in plan
+        if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))
+    }
+    scans = []
+    for detail in plan:
+        match = _SCAN_RE.match(detail)
+        if not match:
+            continue
+        name, rest = match.groups()
+        if "VIRTUAL TABLE" in rest:
+            continue
+        if name.startswith("(") or name in derived or name == "CONSTANT":
+            continue
+        scans.append(name)
+    return scans
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> List[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def _is_query(sql: str) -> bool:
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    return head in {"SELECT", "WITH"}
+
+
+@contextmanager
+def _database_env(db_path: Path) -> Iterator[None]:
+    # API-level helpers resolve the database from DATABASE_PATH.
+    previous = os.environ.get("DATABASE_PATH")
+    os.environ["DATABASE_PATH"] = str(db_path)
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("DATABASE_PATH", None)
+        else:
+            os.environ["DATABASE_PATH"] = previous
+
+
+def collect_query_plans(
+    dataset: SyntheticDataset,
+    *,
+    queries: Tuple[HotQuery, ...] = HOT_QUERIES,
+    repeat: int = 5,
+) -> Dict[str, Any]:
+    """Run every hot query, explain what it executed and time it."""
+    results: Dict[str, Any] = {}
+    explain_conn = sqlite3.connect(dataset.db_path)
+    try:
+        with _database_env(dataset.db_path):
+            for query in queries:
+                with db.trace_statements() as statements:
+                    query.run(dataset)
+                plans = []
+                unexpected: List[str] = []
+                for sql in dict.fromkeys(s for s in statements if _is_query(s)):
+                    plan = explain(explain_conn, sql)
+                    scans = full_scans(plan)
+                    unexpected.extend(s for s in scans if s not in query.allowed_scans)
+                    plans.append({"sql": " ".join(sql.split()), "plan": plan, "fullScans": scans})
+
+                timings = []
+                for _ in range(max(1, repeat)):
+                    started = time.perf_counter()
+                    query.run(dataset)
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                results[query.name] = {
+                    "statements": len(plans),
+                    "unexpectedFullScans": sorted(set(unexpected)),
+                    "medianMs": round(statistics.median(timings), 3),
+                    "maxMs": round(timings[-1], 3),
+                    "plans": plans,
+                }
+    finally:
+        explain_conn.close()
+    return {
+        "generatedAt": datetime.now(timezone.utc).isoformat(),
+        "dataset": dataset.summary(),
+        "queries": results,
+    }
+
+
+def find_regressions(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    tolerance: float = 2.0,
+    floor_ms: float = 2.0,
+) -> List[str]:
+    """Describe plan and latency regressions of ``report`` against ``baseline``.
+
+    A query regresses on latency when its median exceeds ``tolerance`` times
+    the baseline median and is also above ``floor_ms`` (to ignore noise on
+    sub-millisecond lookups).
+    """
+    problems: List[str] = []
+    baseline_queries = baseline.get("queries", {})
+    for name, result in report["queries"].items():
+        for table in result["unexpectedFullScans"]:
+            problems.append(f"{name}: full scan of {table}")
+        reference = baseline_queries.get(name)
+        if not reference:
+            continue
+        median = result["medianMs"]
+        limit = reference["medianMs"] * tolerance
+        if median > limit and median > floor_ms:
+            problems.append(
+                f"{name}: median {median:.2f} ms exceeds {limit:.2f} ms "
+                f"({tolerance}x baseline {reference['medianMs']:.2f} ms)"
+            )
+    return problems
+
+
+def _baseline_from_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "generatedAt": report["generatedAt"],
+        "dataset": {k: v for k, v in report["dataset"].items() if k != "dbPath"},
+        "queries": {
+            name: {"medianMs": result["medianMs"], "statements": result["statements"]}
+            for name, result in report["queries"].items()
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Check hot query plans for full scans and compare latencies to a baseline."
+    )
+    parser.add_argument("--scale", choices=("small", "full"), default="full")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=2.0)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", type=Path, default=None, help="Write the full report here")
+    args = parser.parse_args(argv)
+
+    scale = SMALL_SCALE if args.scale == "small" else SyntheticScale()
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        dataset = build_synthetic_db(Path(tmp) / "perf.db", scale)
+        build_seconds = time.perf_counter() - started
+        report = collect_query_plans(dataset, repeat=args.repeat)
+        db.close_connection_pools()
+    report["dataset"]["buildSeconds"] = round(build_seconds, 3)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(_baseline_from_report(report), ensure_ascii=False, indent=2) + "\n",
+            encoding="utf-8",
+        )
+
+    baseline: Dict[str, Any] = {}
+    if args.baseline.exists() and not args.update_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    problems = find_regressions(report, baseline, tolerance=args.tolerance)
+
+    summary = {
+        name: {
+            "medianMs": result["medianMs"],
+            "unexpectedFullScans": result["unexpectedFullScans"],
+        }
+        for name, result in report["queries"].items()
+    }
+    print(json.dumps({"queries": summary, "regressions": problems}, ensure_ascii=False, indent=2))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,451 @@
+"""Deterministic synthetic datasets at production-like scale.
+
+Rows are bulk-inserted into a freshly migrated database. Derived tables
+(per-problem results, assignment counters, latest-submission pointers and
+study aggregates) are filled through the same db helpers the write paths use,
+so the data has the shape a long-running deployment would have.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import bcrypt
+
+from app import db
+
+DEFAULT_PASSWORD = "password123"
+ADMIN_USERNAME = "perf-admin"
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri")
+
+
+@dataclass(frozen=True)
+class SyntheticScale:
+    students: int = 2000
+    assignments: int = 300
+    targets_per_assignment: int = 80
+    problems_per_assignment: int = 5
+    # Share of targets with a submission, and of those with a second one.
+    submission_rate: float = 0.8
+    resubmission_rate: float = 0.3
+    problem_batches: int = 400
+    problems_per_batch: int = 50
+    labels: int = 60
+    labels_per_problem: int = 2
+    sessions_per_student: int = 5
+    responses_per_session: int = 5
+
+
+# Small enough for the test suite, large enough that every table has rows.
+SMALL_SCALE = SyntheticScale(
+    students=60,
+    assignments=20,
+    targets_per_assignment=15,
+    problem_batches=10,
+    problems_per_batch=20,
+    labels=8,
+    sessions_per_student=3,
+    responses_per_session=3,
+)
+
+
+@dataclass
+class SyntheticDataset:
+    db_path: Path
+    scale: SyntheticScale
+    password: str
+    admin_username: str
+    student_usernames: List[str] = field(default_factory=list)
+    student_user_ids: List[str] = field(default_factory=list)
+    assignment_ids: List[str] = field(default_factory=list)
+    submission_ids: List[str] = field(default_factory=list)
+    label_keys: List[str] = field(default_factory=list)
+    week_keys: List[str] = field(default_factory=list)
+    node_ids: List[str] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"dbPath": str(self.db_path), "scale": asdict(self.scale), "counts": self.counts}
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat()
+
+
+def build_synthetic_db(
+    db_path: Path,
+    scale: SyntheticScale = SyntheticScale(),
+    *,
+    seed: int = 7,
+    password: str = DEFAULT_PASSWORD,
+    seed_path: Optional[Path] = None,
+) -> SyntheticDataset:
+    """Create ``db_path`` from scratch and fill it according to ``scale``."""
+    rng = random.Random(seed)
+    db.init_db(db_path)
+    db.seed_db(db_path, seed_path)
+    _publish_seed_graph(db_path, seed_path or db.get_seed_path())
+
+    dataset = SyntheticDataset(
+        db_path=db_path,
+        scale=scale,
+        password=password,
+        admin_username=ADMIN_USERNAME,
+    )
+    # One hash for every account: bcrypt cost is paid at login, not here.
+    password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=30)
+
+    with db.transaction(db_path) as conn:
+        _insert_users(conn, dataset, password_hash, now)
+        _insert_homework(conn, dataset, rng, start)
+        _insert_problem_bank(conn, dataset, rng, start)
+        _insert_study_sessions(conn, dataset, rng, now)
+
+    dataset.counts = _table_counts(db_path)
+    return dataset
+
+
+def _publish_seed_graph(db_path: Path, seed_path: Path) -> None:
+    """Publish the seed graph, which ships as a draft, like a live deployment."""
+    if not seed_path.exists():
+        return
+    data = json.loads(seed_path.read_text(encoding="utf-8"))
+    if data.get("published"):
+        return
+    graph = data.get("draft") or {"nodes": data.get("nodes", []), "edges": data.get("edges", [])}
+    payload = {
+        key: value
+        for key, value in data.items()
+        if key not in {"nodes", "edges", "draft", "problems"}
+    }
+    payload["published"] = graph
+    with db.transaction(db_path) as conn:
+        db.import_graph_versions(conn, payload)
+
+
+def _insert_users(conn, dataset: SyntheticDataset, password_hash: str, now: datetime) -> None:
+    created_at = _iso(now - timedelta(days=60))
+    rows = [
+        (
+            "perf-admin-id",
+            dataset.admin_username,
+            "perf-admin@example.com",
+            "Perf Admin",
+            "0",
+            password_hash,
+            "admin",
+            created_at,
+            created_at,
+        )
+    ]
+    for index in range(dataset.scale.students):
+        username = f"student{index:05d}"
+        user_id = f"user-{index:05d}"
+        dataset.student_usernames.append(username)
+        dataset.student_user_ids.append(user_id)
+        rows.append(
+            (
+                user_id,
+                username,
+                f"{username}@example.com",
+                f"학생 {index}",
+                str(1 + index % 6),
+                password_hash,
+                "student",
+                created_at,
+                created_at,
+            )
+        )
+    conn.executemany(
+        """
+        INSERT INTO users (
+            id, username, email, name, grade, password_hash, role, created_at, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+
+
+def _assignment_problems(assignment_index: int, count: int) -> List[Dict[str, Any]]:
+    problems = []
+    for index in range(count):
+        left = assignment_index + index
+        problems.append(
+            {
+                "id": f"p{index + 1}",
+                "type": "objective",
+                "question": f"{left} + 1 = ?",
+                "options": [str(left), str(left + 1), str(left + 2)],
+                "answer": str(left + 1),
+            }
+        )
+    return problems
+
+
+def _insert_homework(conn, dataset: SyntheticDataset, rng: random.Random, start: datetime) -> None:
+    scale = dataset.scale
+    targets_per_assignment = min(scale.targets_per_assignment, len(dataset.student_usernames))
+    for index in range(scale.assignments):
+        assignment_id = f"hw-{index:05d}"
+        created = start + timedelta(minutes=index * 7)
+        problems = _assignment_problems(index, scale.problems_per_assignment)
+        problems_json = json.dumps(problems, ensure_ascii=False)
+        conn.execute(
+            """
+            INSERT INTO homework_assignments (
+                id, title, description, problems_json, due_at, created_by, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                assignment_id,
+                f"숙제 {index}",
+                None,
+                problems_json,
+                _iso(created + timedelta(days=3)),
+                dataset.admin_username,
+                _iso(created),
+            ),
+        )
+        dataset.assignment_ids.append(assignment_id)
+
+        students = rng.sample(dataset.student_usernames, targets_per_assignment)
+        conn.executemany(
+            """
+            INSERT INTO homework_assignment_targets (assignment_id, student_id, assigned_at)
+            VALUES (?, ?, ?)
+            """,
+            [(assignment_id, student_id, _iso(created)) for student_id in students],
+        )
+
+        for student_id in students:
+            if rng.random() >= scale.submission_rate:
+                continue
+            attempts = 2 if rng.random() < scale.resubmission_rate else 1
+            for attempt in range(attempts):
+                latest = attempt == attempts - 1
+                submitted_at = created + timedelta(hours=1 + attempt * 12, seconds=rng.randint(0, 3600))
+                answers = {
+                    problem["id"]: problem["answer"] if rng.random() < 0.7 else "모름"
+                    for problem in problems
+                }
+                submission_id = f"sub-{assignment_id}-{student_id}-{attempt}"
+                answers_json = json.dumps(answers, ensure_ascii=False)
+                conn.execute(
+                    """
+                    INSERT INTO homework_submissions (
+                        id, assignment_id, student_id, answers_json, submitted_at, review_status
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        submission_id,
+                        assignment_id,
+                        student_id,
+                        answers_json,
+                        _iso(submitted_at),
+                        rng.choice(("pending", "approved")) if latest else "returned",
+                    ),
+                )
+                db._write_submission_problem_results(
+                    conn,
+                    submission_id=submission_id,
+                    assignment_id=assignment_id,
+                    student_id=student_id,
+                    problems_json=problems_json,
+                    answers_json=answers_json,
+                    problem_reviews_json=None,
+                )
+                if latest:
+                    db._set_latest_submission(
+                        conn,
+                        assignment_id=assignment_id,
+                        student_id=student_id,
+                        submission_id=submission_id,
+                    )
+                dataset.submission_ids.append(submission_id)
+        db.refresh_homework_assignment_stats(conn, assignment_id)
+
+
+def _insert_problem_bank(conn, dataset: SyntheticDataset, rng: random.Random, start: datetime) -> None:
+    scale = dataset.scale
+    created_at = _iso(start)
+    label_ids: List[str] = []
+    label_rows = []
+    for index in range(scale.labels):
+        label_id = f"label-{index:04d}"
+        key = f"label_{index:04d}"
+        label_ids.append(label_id)
+        dataset.label_keys.append(key)
+        label_rows.append((label_id, key, f"라벨 {index}", "concept", dataset.admin_username, created_at))
+    conn.executemany(
+        """
+        INSERT INTO homework_labels (id, key, label, kind, created_by, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        label_rows,
+    )
+
+    batch_rows = []
+    problem_rows = []
+    problem_label_rows = []
+    for batch_index in range(scale.problem_batches):
+        batch_id = f"batch-{batch_index:05d}"
+        week_key = f"{2025 + batch_index // 260}-W{(batch_index // 5) % 52 + 1:02d}"
+        day_key = _WEEKDAYS[batch_index % 5]
+        if week_key not in dataset.week_keys:
+            dataset.week_keys.append(week_key)
+        batch_rows.append(
+            (
+                batch_id,
+                week_key,
+                day_key,
+                f"{batch_index:064x}",
+                f"{week_key} {day_key}",
+                dataset.admin_username,
+                created_at,
+            )
+        )
+        for order_index in range(scale.problems_per_batch):
+            problem_id = f"{batch_id}-q{order_index:03d}"
+            problem_rows.append(
+                (
+                    problem_id,
+                    batch_id,
+                    day_key,
+                    order_index,
+                    "objective",
+                    f"{order_index} × 2 = ?",
+                    json.dumps([str(order_index * 2), str(order_index * 2 + 1)]),
+                    str(order_index * 2),
+                    created_at,
+                )
+            )
+            if label_ids:
+                for label_id in rng.sample(label_ids, min(scale.labels_per_problem, len(label_ids))):
+                    problem_label_rows.append((problem_id, label_id, created_at))
+
+    conn.executemany(
+        """
+        INSERT INTO homework_import_batches (
+            id, week_key, day_key, payload_sha256, title, imported_by, imported_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        batch_rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO homework_problems (
+            id, batch_id, day_key, order_index, type, question, options_json, answer, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        problem_rows,
+    )
+    conn.executemany(
+        "INSERT INTO homework_problem_labels (problem_id, label_id, created_at) VALUES (?, ?, ?)",
+        problem_label_rows,
+    )
+
+
+def _insert_study_sessions(conn, dataset: SyntheticDataset, rng: random.Random, now: datetime) -> None:
+    scale = dataset.scale
+    version_row = conn.execute(
+        "SELECT id FROM graph_versions WHERE status='published' ORDER BY created_at DESC LIMIT 1"
+    ).fetchone()
+    if version_row:
+        dataset.node_ids = [
+            row["id"]
+            for row in conn.execute(
+                "SELECT id FROM nodes WHERE graph_version_id = ? ORDER BY rowid",
+                (version_row["id"],),
+            )
+        ]
+    if not dataset.node_ids:
+        dataset.node_ids = [f"node-{index}" for index in range(20)]
+
+    session_rows = []
+    response_rows = []
+    for user_index, user_id in enumerate(dataset.student_user_ids):
+        for session_index in range(scale.sessions_per_student):
+            session_id = f"session-{user_index:05d}-{session_index:03d}"
+            node_id = rng.choice(dataset.node_ids)
+            updated = now - timedelta(days=rng.randint(0, 28), seconds=rng.randint(0, 86400))
+            correctness = [rng.random() < 0.75 for _ in range(scale.responses_per_session)]
+            cleared = all(correctness)
+            session_rows.append(
+                (
+                    session_id,
+                    user_id,
+                    node_id,
+                    "SUBMITTED",
+                    json.dumps({"cleared": cleared}),
+                    _iso(updated),
+                    _iso(updated),
+                )
+            )
+            for response_index, is_correct in enumerate(correctness):
+                response_rows.append(
+                    (
+                        f"{session_id}-r{response_index}",
+                        session_id,
+                        f"{node_id}-p{response_index}",
+                        "42",
+                        "42",
+                        int(is_correct),
+                        rng.randint(2000, 60000),
+                        _iso(updated),
+                    )
+                )
+            db.record_study_submission(
+                conn,
+                user_id=user_id,
+                node_id=node_id,
+                submitted_at=_iso(updated),
+                response_count=len(correctness),
+                wrong_count=correctness.count(False),
+                cleared=cleared,
+            )
+
+    conn.executemany(
+        """
+        INSERT INTO study_sessions (id, user_id, node_id, status, grading_json, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        session_rows,
+    )
+    conn.executemany(
+        """
+        INSERT INTO study_responses (
+            id, session_id, problem_id, input_raw, input_normalized, is_correct,
+            time_spent_ms, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        response_rows,
+    )
+
+
+def _table_counts(db_path: Path) -> Dict[str, int]:
+    tables = (
+        "users",
+        "homework_assignments",
+        "homework_assignment_targets",
+        "homework_submissions",
+        "homework_submission_problem_results",
+        "homework_problems",
+        "homework_problem_labels",
+        "study_sessions",
+        "study_responses",
+    )
+    conn = db.connect(db_path)
+    try:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in tables
+        }
+    finally:
+        conn.close()
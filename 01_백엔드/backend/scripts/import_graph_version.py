@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.db import (
+    get_database_path,
+    import_graph_versions,
+    init_db,
+    resolve_database_path,
+    transaction,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Import the graph versions and problems of a curriculum JSON file. "
+            "Running API processes serve the new version on their next request."
+        )
+    )
+    parser.add_argument("curriculum", type=Path)
+    parser.add_argument("--sqlite-path", default=None)
+    args = parser.parse_args()
+
+    sqlite_path = (
+        resolve_database_path(Path(args.sqlite_path))
+        if args.sqlite_path
+        else resolve_database_path(get_database_path())
+    )
+    data = json.loads(args.curriculum.read_text(encoding="utf-8"))
+
+    init_db(sqlite_path)
+    with transaction(sqlite_path) as conn:
+        stats = import_graph_versions(conn, data)
+
+    print(
+        "Graph import complete: "
+        f"graphVersions={stats['graphVersions']} "
+        f"nodes={stats['nodes']} "
+        f"edges={stats['edges']} "
+        f"problems={stats['problems']} "
+        f"validateSeconds={stats['validateSeconds']} "
+        f"insertSeconds={stats['insertSeconds']}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.db import get_database_path, init_db, resolve_database_path
+from app.migrations import MIGRATIONS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--sqlite-path", default=None)
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="List pending migrations without applying them.",
+    )
+    args = parser.parse_args()
+
+    sqlite_path = (
+        resolve_database_path(Path(args.sqlite_path))
+        if args.sqlite_path
+        else resolve_database_path(get_database_path())
+    )
+
+    ids = init_db(sqlite_path, dry_run=args.plan)
+    descriptions = {migration.id: migration.description for migration in MIGRATIONS}
+    verb = "Pending" if args.plan else "Applied"
+    if not ids:
+        print("Schema is up to date.")
+    for migration_id in ids:
+        print(f"{verb}: {migration_id} - {descriptions[migration_id]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.api import UPLOAD_BASE_DIR
+from app.blob_store import DEFAULT_GC_GRACE_SECONDS, adopt_legacy_files, collect_garbage
+from app.db import get_database_path, init_db, resolve_database_path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain the submission file blob store.")
+    parser.add_argument("command", choices=("gc", "adopt-legacy"))
+    parser.add_argument("--sqlite-path", default=None)
+    parser.add_argument("--upload-dir", default=None)
+    parser.add_argument(
+        "--grace-seconds",
+        type=float,
+        default=DEFAULT_GC_GRACE_SECONDS,
+        help="Only collect blobs unreferenced for at least this long (gc).",
+    )
+    args = parser.parse_args()
+
+    sqlite_path = (
+        resolve_database_path(Path(args.sqlite_path))
+        if args.sqlite_path
+        else resolve_database_path(get_database_path())
+    )
+    upload_dir = Path(args.upload_dir) if args.upload_dir else UPLOAD_BASE_DIR
+    init_db(sqlite_path)
+
+    if args.command == "adopt-legacy":
+        stats = adopt_legacy_files(upload_dir, sqlite_path)
+    else:
+        stats = collect_garbage(upload_dir, sqlite_path, grace_seconds=args.grace_seconds)
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
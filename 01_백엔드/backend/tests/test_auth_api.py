@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import threading
+import time
+
+import pytest
 from fastapi.testclient import TestClient
 
 
@@ -60,3 +64,320 @@ def test_change_password_rejects_invalid_current_password(client: tuple[TestClie
         headers=_auth_headers(access_token),
     )
     assert response.status_code == 401
+
+
+def test_login_rehashes_password_when_bcrypt_cost_changes(
+    client: tuple[TestClient, object], monkeypatch
+) -> None:
+    from app.db import get_user_by_username
+
+    test_client, db_path = client
+    monkeypatch.setenv("BCRYPT_ROUNDS", "4")
+    _register_student(test_client, username="student3", password="password123")
+    assert get_user_by_username("student3", db_path)["password_hash"].startswith("$2b$04$")
+
+    monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+    login = test_client.post(
+        "/api/auth/login",
+        json={"username": "student3", "password": "password123"},
+    )
+
+    assert login.status_code == 200
+    assert get_user_by_username("student3", db_path)["password_hash"].startswith("$2b$05$")
+    again = test_client.post(
+        "/api/auth/login",
+        json={"username": "student3", "password": "password123"},
+    )
+    assert again.status_code == 200
+
+
+def test_login_returns_503_when_password_queue_is_full(
+    client: tuple[TestClient, object], monkeypatch
+) -> None:
+    from app import auth
+
+    test_client, _db_path = client
+
+    def _busy(*_args, **_kwargs):
+        raise auth.PasswordHasherBusy("password hashing queue is full")
+
+    monkeypatch.setattr(auth.PasswordHasher, "run", _busy)
+    response = test_client.post(
+        "/api/auth/login",
+        json={"username": "admin", "password": "admin"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["error"]["code"] == "AUTH_BUSY"
+
+
+def test_password_hasher_rejects_beyond_queue_limit() -> None:
+    from app.auth import PasswordHasher, PasswordHasherBusy
+
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def _blocking() -> str:
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results: list[str] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(hasher.run("hash", _blocking)))
+        for _ in range(2)
+    ]
+    try:
+        threads[0].start()
+        assert started.wait(5)
+        threads[1].start()
+        while hasher.stats()["queued"] < 1:
+            pass
+        with pytest.raises(PasswordHasherBusy):
+            hasher.run("hash", lambda: "rejected")
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        hasher.shutdown()
+    assert results == ["done", "done"]
+
+
+def test_warm_access_token_skips_jwt_and_user_queries(
+    client: tuple[TestClient, object], monkeypatch
+) -> None:
+    from app import auth
+
+    test_client, _db_path = client
+    registration = _register_student(test_client, username="student4", password="password123")
+    headers = _auth_headers(registration["accessToken"])
+    assert test_client.get("/api/auth/me", headers=headers).status_code == 200
+
+    def _no_decode(*_args, **_kwargs):
+        raise AssertionError("cached access token should not be decoded again")
+
+    monkeypatch.setattr(auth.jwt, "decode", _no_decode)
+    response = test_client.get("/api/auth/me", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "student4"
+    assert 'desc="0 queries"' in response.headers["server-timing"]
+
+
+def test_cached_access_token_still_expires() -> None:
+    from app.auth import AccessTokenCache
+
+    cache = AccessTokenCache(max_entries=2)
+    assert cache.get("k", "secret") is None
+    cache.put("k", "secret", {"type": "access", "exp": time.time() + 60})
+    assert cache.get("k", "secret") is not None
+    assert cache.get("k", "rotated-secret") is None
+
+    cache.put("k", "rotated-secret", {"type": "access", "exp": time.time() - 1})
+    assert cache.get("k", "rotated-secret") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_user_cache_is_invalidated_on_password_change(
+    client: tuple[TestClient, object],
+) -> None:
+    from app.db import get_user_by_id, get_user_cache
+
+    test_client, db_path = client
+    registration = _register_student(test_client, username="student5", password="password123")
+    user_id = registration["user"]["id"]
+    before = get_user_by_id(user_id, db_path)["password_hash"]
+    hits = get_user_cache().stats()["hits"]
+    assert get_user_by_id(user_id, db_path)["password_hash"] == before
+    assert get_user_cache().stats()["hits"] == hits + 1
+
+    response = test_client.post(
+        "/api/auth/password",
+        json={"currentPassword": "password123", "newPassword": "newpassword123"},
+        headers=_auth_headers(registration["accessToken"]),
+    )
+
+    assert response.status_code == 200
+    assert get_user_by_id(user_id, db_path)["password_hash"] != before
+
+
+def test_refresh_rotation_detects_reuse_and_revokes_family(
+    client: tuple[TestClient, object], monkeypatch
+) -> None:
+    import app.db as db_module
+
+    test_client, _db_path = client
+    # Every replay is outside the grace window.
+    monkeypatch.setattr(db_module, "REFRESH_REUSE_GRACE_SECONDS", -1)
+    registration = _register_student(test_client, username="student6", password="password123")
+    first = registration["refreshToken"]
+
+    rotated = test_client.post("/api/auth/refresh", json={"refreshToken": first})
+    assert rotated.status_code == 200
+    second = rotated.json()["refreshToken"]
+
+    replayed = test_client.post("/api/auth/refresh", json={"refreshToken": first})
+    assert replayed.status_code == 401
+    # The replay revoked the whole family, including the legitimate successor.
+    assert test_client.post("/api/auth/refresh", json={"refreshToken": second}).status_code == 401
+
+    login = test_client.post(
+        "/api/auth/login",
+        json={"username": "student6", "password": "password123"},
+    )
+    fresh = test_client.post(
+        "/api/auth/refresh", json={"refreshToken": login.json()["refreshToken"]}
+    )
+    assert fresh.status_code == 200
+
+
+def test_concurrent_refresh_with_one_token_keeps_the_family(
+    client: tuple[TestClient, object],
+) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    test_client, _db_path = client
+    registration = _register_student(test_client, username="student8", password="password123")
+    token = registration["refreshToken"]
+
+    # Two tabs refresh with the same token at the same moment.
+    barrier = threading.Barrier(2)
+
+    def _refresh(_: int):
+        barrier.wait()
+        return test_client.post("/api/auth/refresh", json={"refreshToken": token})
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(_refresh, range(2)))
+
+    assert sorted(r.status_code for r in responses) == [200, 401]
+    winner = next(r for r in responses if r.status_code == 200)
+    # The loser was not treated as reuse: the issued token still works.
+    follow_up = test_client.post(
+        "/api/auth/refresh", json={"refreshToken": winner.json()["refreshToken"]}
+    )
+    assert follow_up.status_code == 200
+
+
+def test_cleanup_deletes_expired_and_revoked_tokens_in_batches(
+    client: tuple[TestClient, object],
+) -> None:
+    from datetime import datetime, timedelta, timezone
+
+    from app.db import cleanup_expired_refresh_tokens, connect, store_refresh_token
+
+    test_client, db_path = client
+    user_id = _register_student(test_client, username="student7", password="password123")["user"]["id"]
+    now = datetime.now(timezone.utc)
+    for index in range(5):
+        store_refresh_token(
+            user_id=user_id,
+            token_hash=f"expired-{index}",
+            expires_at=(now - timedelta(minutes=1)).isoformat(),
+            path=db_path,
+        )
+    store_refresh_token(
+        user_id=user_id,
+        token_hash="logged-out",
+        expires_at=(now + timedelta(days=1)).isoformat(),
+        path=db_path,
+    )
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE refresh_tokens SET revoked_at = ? WHERE token_hash = 'logged-out'",
+            ((now - timedelta(days=8)).isoformat(),),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert cleanup_expired_refresh_tokens(db_path, batch_size=2) == 6
+
+    conn = connect(db_path)
+    try:
+        remaining = [row[0] for row in conn.execute("SELECT token_hash FROM refresh_tokens")]
+    finally:
+        conn.close()
+    assert len(remaining) == 1  # the live token from registration
+
+
+def test_sweeper_deletes_stale_tokens_in_batches(
+    client: tuple[TestClient, object], monkeypatch
+) -> None:
+    import asyncio
+    from datetime import datetime, timedelta, timezone
+
+    import app.db as db_module
+    from app.db import connect, set_app_metadata, store_refresh_token, trace_statements
+    from app.main import TOKEN_CLEANUP_AT_KEY, _sweep_refresh_tokens_forever
+
+    test_client, db_path = client
+    user_id = _register_student(test_client, username="student8", password="password123")["user"]["id"]
+    now = datetime.now(timezone.utc)
+    for index in range(5):
+        store_refresh_token(
+            user_id=user_id,
+            token_hash=f"expired-{index}",
+            expires_at=(now - timedelta(minutes=1)).isoformat(),
+            path=db_path,
+        )
+    for token_hash in ("revoked-old-0", "revoked-old-1", "revoked-recent", "rotated-old"):
+        store_refresh_token(
+            user_id=user_id,
+            token_hash=token_hash,
+            expires_at=(now + timedelta(days=1)).isoformat(),
+            path=db_path,
+        )
+    conn = connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE refresh_tokens SET revoked_at = ? "
+            "WHERE token_hash IN ('revoked-old-0', 'revoked-old-1', 'rotated-old')",
+            ((now - timedelta(days=8)).isoformat(),),
+        )
+        conn.execute(
+            "UPDATE refresh_tokens SET revoked_at = ? WHERE token_hash = 'revoked-recent'",
+            ((now - timedelta(days=1)).isoformat(),),
+        )
+        # Rotated tokens are kept until they expire so replays are still caught.
+        conn.execute(
+            "UPDATE refresh_tokens SET replaced_by_id = "
+            "(SELECT id FROM refresh_tokens WHERE token_hash = 'revoked-recent') "
+            "WHERE token_hash = 'rotated-old'"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    set_app_metadata(TOKEN_CLEANUP_AT_KEY, "2000-01-01T00:00:00+00:00", db_path)
+    monkeypatch.setattr(db_module, "REFRESH_TOKEN_CLEANUP_BATCH_SIZE", 2)
+
+    async def _run_one_sweep() -> None:
+        task = asyncio.create_task(_sweep_refresh_tokens_forever(db_path, 0.01))
+        try:
+            for _ in range(200):
+                await asyncio.sleep(0.01)
+                if db_module.get_app_metadata(TOKEN_CLEANUP_AT_KEY, db_path) != (
+                    "2000-01-01T00:00:00+00:00"
+                ):
+                    break
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    with trace_statements() as statements:
+        asyncio.run(_run_one_sweep())
+
+    deletes = [sql for sql in statements if sql.lstrip().startswith("DELETE FROM refresh_tokens")]
+    # 5 expired rows in batches of 2 (2, 2, 1), then 2 old revoked rows (2, 0).
+    assert len(deletes) == 5
+    conn = connect(db_path)
+    try:
+        remaining = {row[0] for row in conn.execute("SELECT token_hash FROM refresh_tokens")}
+    finally:
+        conn.close()
+    assert {"revoked-recent", "rotated-old"} <= remaining
+    assert not any(token.startswith(("expired-", "revoked-old-")) for token in remaining)
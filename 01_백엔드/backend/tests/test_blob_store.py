@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from app.blob_store import adopt_legacy_files, blob_path, collect_garbage
+from app.db import get_homework_blob, save_homework_submission_file
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _register_student(client: TestClient, student_id: str) -> str:
+    response = client.post(
+        "/api/auth/register",
+        json={
+            "username": student_id,
+            "password": "password123",
+            "name": f"{student_id} 이름",
+            "grade": "3",
+            "email": f"{student_id}@example.com",
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["accessToken"]
+
+
+def _login_admin(client: TestClient) -> str:
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "admin"})
+    assert response.status_code == 200, response.text
+    return response.json()["accessToken"]
+
+
+def _create_assignment(client: TestClient, admin_token: str, student_ids: list[str]) -> str:
+    response = client.post(
+        "/api/homework/assignments",
+        json={
+            "title": "사진 숙제",
+            "dueAt": "2099-02-01T23:59:59",
+            "targetStudentIds": student_ids,
+            "problems": [{"id": "p1", "type": "subjective", "question": "풀이를 찍어 올리세요"}],
+        },
+        headers=_auth_headers(admin_token),
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _submit(client: TestClient, token: str, assignment_id: str, student_id: str) -> str:
+    response = client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={"studentId": student_id, "answersJson": json.dumps({"p1": "사진 참고"})},
+        files=[("images", ("photo.png", PNG, "image/png"))],
+        headers=_auth_headers(token),
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["submissionId"]
+
+
+def _backdate_releases(db_path: Path) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            "UPDATE homework_blobs SET released_at = '2000-01-01T00:00:00+00:00' "
+            "WHERE released_at IS NOT NULL"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_identical_uploads_share_one_blob_until_released(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    sha256 = hashlib.sha256(PNG).hexdigest()
+
+    admin_token = _login_admin(test_client)
+    tokens = {sid: _register_student(test_client, sid) for sid in ("blob_a", "blob_b")}
+    assignment_id = _create_assignment(test_client, admin_token, list(tokens))
+    submission_ids = [
+        _submit(test_client, token, assignment_id, sid) for sid, token in tokens.items()
+    ]
+
+    stored = [p for p in upload_dir.rglob("*") if p.is_file()]
+    assert stored == [blob_path(upload_dir, sha256, "image/png")]
+    assert stored[0].relative_to(upload_dir).parts[:3] == ("blobs", sha256[:2], sha256[2:4])
+    assert get_homework_blob(sha256, db_path)["refCount"] == 2
+
+    for submission_id in submission_ids:
+        detail = test_client.get(
+            f"/api/homework/admin/submissions/{submission_id}",
+            headers=_auth_headers(admin_token),
+        ).json()
+        download = test_client.get(
+            f"/api/homework/admin/submissions/{submission_id}/files/{detail['files'][0]['id']}",
+            headers=_auth_headers(admin_token),
+        )
+        assert download.status_code == 200
+        assert download.content == PNG
+
+    # Still referenced: nothing to collect.
+    assert collect_garbage(upload_dir, db_path, grace_seconds=0)["blobsRemoved"] == 0
+
+    # Deleting the assignment cascades to the file rows; the triggers release the blob.
+    response = test_client.delete(
+        f"/api/homework/admin/assignments/{assignment_id}",
+        headers=_auth_headers(admin_token),
+    )
+    assert response.status_code == 200, response.text
+    blob = get_homework_blob(sha256, db_path)
+    assert blob["refCount"] == 0 and blob["releasedAt"] is not None
+
+    # Released less than the grace period ago: kept.
+    assert collect_garbage(upload_dir, db_path)["blobsRemoved"] == 0
+    _backdate_releases(db_path)
+    stats = collect_garbage(upload_dir, db_path)
+    assert stats["blobsRemoved"] == 1
+    assert stats["bytesFreed"] == len(PNG)
+    assert get_homework_blob(sha256, db_path) is None
+    assert not stored[0].exists()
+
+
+def test_garbage_collector_removes_files_without_rows(
+    client: tuple[TestClient, Any], tmp_path
+) -> None:
+    _test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    orphan = blob_path(upload_dir, "ab" * 32, "image/png")
+    orphan.parent.mkdir(parents=True)
+    orphan.write_bytes(PNG)
+    staged = upload_dir / ".staging" / "abandoned.part"
+    staged.parent.mkdir()
+    staged.write_bytes(b"partial")
+
+    assert collect_garbage(upload_dir, db_path)["orphanFilesRemoved"] == 0
+    old = time.time() - 7200
+    for path in (orphan, staged):
+        os.utime(path, (old, old))
+
+    stats = collect_garbage(upload_dir, db_path)
+    assert stats["orphanFilesRemoved"] == 1
+    assert stats["stagingFilesRemoved"] == 1
+    assert not orphan.exists() and not staged.exists()
+
+
+def test_adopt_legacy_files_deduplicates_into_blobs(
+    client: tuple[TestClient, Any], tmp_path
+) -> None:
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    admin_token = _login_admin(test_client)
+    tokens = {sid: _register_student(test_client, sid) for sid in ("legacy_a", "legacy_b")}
+    assignment_id = _create_assignment(test_client, admin_token, list(tokens))
+
+    legacy_paths = []
+    for student_id, token in tokens.items():
+        response = test_client.post(
+            f"/api/homework/assignments/{assignment_id}/submit",
+            data={"studentId": student_id, "answersJson": json.dumps({"p1": "사진 참고"})},
+            headers=_auth_headers(token),
+        )
+        submission_id = response.json()["submissionId"]
+        legacy_path = upload_dir / submission_id / "legacy.png"
+        legacy_path.parent.mkdir(parents=True)
+        legacy_path.write_bytes(PNG)
+        legacy_paths.append(legacy_path)
+        save_homework_submission_file(
+            submission_id=submission_id,
+            stored_path=str(legacy_path),
+            original_name="photo.png",
+            content_type="image/png",
+            size_bytes=len(PNG),
+            path=db_path,
+        )
+
+    stats = adopt_legacy_files(upload_dir, db_path)
+    assert stats == {"adopted": 2, "deduplicated": 1, "missing": 0, "skipped": 0}
+    sha256 = hashlib.sha256(PNG).hexdigest()
+    assert get_homework_blob(sha256, db_path)["refCount"] == 2
+    assert [p for p in upload_dir.rglob("*") if p.is_file()] == [
+        blob_path(upload_dir, sha256, "image/png")
+    ]
+    assert not any(path.parent.exists() for path in legacy_paths)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import app.db as db
+from app.db import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(tmp_path / "pool.db", max_size=2, timeout=0.2)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE items (value TEXT)")
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close()
+
+
+def test_close_returns_connection_and_discards_uncommitted_work(pool) -> None:
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items VALUES ('uncommitted')")
+    conn.close()
+
+    again = pool.acquire()
+    try:
+        assert again is conn
+        assert not again.in_transaction
+        assert again.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    finally:
+        again.close()
+    stats = pool.stats()
+    assert stats["inUse"] == 0 and stats["idle"] == 1 and stats["created"] == 1
+
+
+def test_exhausted_pool_times_out(pool) -> None:
+    held = [pool.acquire(), pool.acquire()]
+    started = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError, match="pool exhausted"):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.2
+
+    # A release wakes a waiting caller.
+    threading.Timer(0.05, held.pop().close).start()
+    conn = pool.acquire()
+    conn.close()
+    held.pop().close()
+    assert pool.stats()["waits"] == 2
+
+
+def test_pragmas_are_applied_once_per_physical_connection(pool, monkeypatch) -> None:
+    applied: list[sqlite3.Connection] = []
+    original = db._apply_connection_pragmas
+
+    def _counting(conn: sqlite3.Connection) -> None:
+        applied.append(conn)
+        original(conn)
+
+    monkeypatch.setattr(db, "_apply_connection_pragmas", _counting)
+    for _ in range(5):
+        pool.acquire().close()
+    assert applied == []  # The fixture's connection is reused.
+
+    first, second = pool.acquire(), pool.acquire()
+    assert applied == [second]
+    assert second.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert second.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    first.close()
+    second.close()
+    for _ in range(5):
+        pool.acquire().close()
+    assert len(applied) == 1
+
+
+def test_trace_callback_is_installed_only_while_tracing(pool) -> None:
+    conn = pool.acquire()
+    try:
+        conn.execute("SELECT 1").fetchone()
+        assert not conn._traced
+
+        with db.trace_statements() as statements:
+            conn.execute("SELECT ? + 1", (1,)).fetchone()
+            assert conn._traced
+        conn.execute("SELECT 3").fetchone()
+        assert not conn._traced
+    finally:
+        conn.close()
+    assert statements == ["SELECT 1 + 1"]
@@ -63,3 +63,164 @@ def test_resolve_database_path_rejects_empty_env(monkeypatch):
 def test_database_path_exposed_on_app_state(client):
     test_client, db_path = client
     assert test_client.app.state.database_path == str(db_path)
+
+
+def test_connection_is_reused_after_close(tmp_path: Path):
+    db_path = tmp_path / "pool.db"
+
+    first = connect(db_path)
+    first.close()
+    second = connect(db_path)
+    second.close()
+
+    assert first is second
+
+
+def test_closed_connection_discards_uncommitted_work(tmp_path: Path):
+    db_path = tmp_path / "rollback.db"
+    conn = connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t (x) VALUES (1)")
+    conn.close()
+
+    conn = connect(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_pooled_connection_pragmas(tmp_path: Path):
+    conn = connect(tmp_path / "pragmas.db")
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    finally:
+        conn.close()
+
+
+def test_db_pool_stats_endpoint(client):
+    test_client, db_path = client
+    login = test_client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin"}
+    )
+    token = login.json()["accessToken"]
+
+    response = test_client.get(
+        "/api/admin/db/pool", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200
+    pools = {pool["path"]: pool for pool in response.json()["pools"]}
+    stats = pools[str(db_path)]
+    assert stats["created"] >= 1
+    assert stats["reused"] >= 1
+    assert stats["inUse"] == 0
+
+
+def test_restart_skips_completed_startup_work(client, monkeypatch):
+    import app.db as db_module
+    import app.main as main_module
+    from fastapi.testclient import TestClient
+
+    test_client, db_path = client
+    first_timings = test_client.app.state.startup_timings_ms
+    assert {"init_db", "seed", "admin", "token_cleanup", "total"} <= set(first_timings)
+
+    def _fail(*_args, **_kwargs):
+        raise AssertionError("startup work should have been skipped")
+
+    monkeypatch.setattr(db_module, "import_graph_versions", _fail)
+    monkeypatch.setattr(main_module, "cleanup_expired_refresh_tokens", _fail)
+
+    app = main_module.create_app()
+    with TestClient(app) as restarted:
+        assert restarted.get("/api/graph/draft").status_code == 200
+
+    assert db_module.init_db(db_path) == []
+
+
+def test_admin_password_change_in_env_is_applied_on_restart(client, monkeypatch):
+    import app.main as main_module
+    from fastapi.testclient import TestClient
+
+    _test_client, db_path = client
+    monkeypatch.setenv("ADMIN_PASSWORD", "rotated-password")
+
+    app = main_module.create_app()
+    with TestClient(app) as restarted:
+        response = restarted.post(
+            "/api/auth/login",
+            json={"username": "admin", "password": "rotated-password"},
+        )
+
+    assert response.status_code == 200
+    # Nothing derived from the plaintext password is persisted.
+    conn = connect(db_path)
+    try:
+        keys = {row["key"] for row in conn.execute("SELECT key FROM app_metadata")}
+    finally:
+        conn.close()
+    assert "admin_account_fingerprint" not in keys
+
+
+def _add_expired_refresh_token(db_path: Path, token_hash: str) -> None:
+    from datetime import datetime, timedelta, timezone
+
+    from app.db import get_user_by_username, store_refresh_token
+
+    store_refresh_token(
+        user_id=get_user_by_username("admin", db_path)["id"],
+        token_hash=token_hash,
+        expires_at=(datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat(),
+        path=db_path,
+    )
+
+
+def _token_hashes(db_path: Path) -> set[str]:
+    conn = connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT token_hash FROM refresh_tokens")}
+    finally:
+        conn.close()
+
+
+def test_token_cleanup_runs_at_most_once_per_interval(client):
+    from app.db import get_app_metadata, set_app_metadata
+    from app.main import TOKEN_CLEANUP_AT_KEY, _cleanup_refresh_tokens_if_due
+
+    _test_client, db_path = client
+    # Due: the last run was long ago.
+    set_app_metadata(TOKEN_CLEANUP_AT_KEY, "2000-01-01T00:00:00+00:00", db_path)
+    _add_expired_refresh_token(db_path, "expired-1")
+
+    _cleanup_refresh_tokens_if_due(db_path)
+
+    assert "expired-1" not in _token_hashes(db_path)
+    last_run = get_app_metadata(TOKEN_CLEANUP_AT_KEY, db_path)
+    assert last_run > "2000-01-01T00:00:00+00:00"
+
+    _add_expired_refresh_token(db_path, "expired-2")
+    _cleanup_refresh_tokens_if_due(db_path)
+
+    assert "expired-2" in _token_hashes(db_path)
+    assert get_app_metadata(TOKEN_CLEANUP_AT_KEY, db_path) == last_run
+
+
+def test_startup_cleans_up_expired_refresh_tokens(client):
+    import app.main as main_module
+    from fastapi.testclient import TestClient
+
+    from app.db import get_app_metadata, set_app_metadata
+
+    _test_client, db_path = client
+    set_app_metadata(main_module.TOKEN_CLEANUP_AT_KEY, "2000-01-01T00:00:00+00:00", db_path)
+    _add_expired_refresh_token(db_path, "expired-at-boot")
+
+    with TestClient(main_module.create_app()):
+        pass
+
+    assert "expired-at-boot" not in _token_hashes(db_path)
+    assert get_app_metadata(main_module.TOKEN_CLEANUP_AT_KEY, db_path) > "2000-01-01T00:00:00+00:00"
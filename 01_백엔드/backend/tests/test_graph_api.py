@@ -3,6 +3,8 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from uuid import uuid4
 
+import pytest
+
 from app.db import connect
 
 
@@ -116,3 +118,120 @@ def test_graph_backend_status_reports_sqlite(client):
     assert payload["backend"] == "sqlite"
     assert payload["ready"] is True
     assert "publishedGraphAvailable" in payload
+
+
+def test_draft_graph_is_served_from_cache_when_warm(client, monkeypatch):
+    test_client, _ = client
+
+    first = test_client.get("/api/graph/draft")
+    assert first.status_code == 200
+
+    def _fail_fetch(*_args, **_kwargs):
+        raise AssertionError("warm graph request must not reload the graph")
+
+    monkeypatch.setattr("app.db._fetch_latest_graph_sqlite", _fail_fetch)
+    second = test_client.get("/api/graph/draft")
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_graph_cache_picks_up_version_written_out_of_process(client):
+    test_client, db_path = client
+    assert test_client.get("/api/graph/draft").status_code == 200
+
+    # Like scripts/import_graph_version.py: a write that never touches this
+    # process's cache.
+    conn = connect(db_path)
+    _insert_graph_version(
+        conn,
+        status="draft",
+        published_at=None,
+        nodes=[{"id": "IMPORTED-NODE", "label": "Imported"}],
+    )
+    conn.close()
+
+    response = test_client.get("/api/graph/draft")
+
+    assert response.status_code == 200
+    node_ids = {node["id"] for node in response.json()["nodes"]}
+    assert "IMPORTED-NODE" in node_ids
+
+
+def test_graph_cache_invalidation_picks_up_new_version(client):
+    from app.graph_cache import invalidate_graph_cache
+
+    test_client, db_path = client
+    assert test_client.get("/api/graph/draft").status_code == 200
+
+    conn = connect(db_path)
+    _insert_graph_version(
+        conn,
+        status="draft",
+        published_at=None,
+        nodes=[{"id": "CACHED-NEW-NODE", "label": "Newest"}],
+    )
+    conn.close()
+    invalidate_graph_cache(db_path)
+
+    response = test_client.get("/api/graph/draft")
+
+    assert response.status_code == 200
+    node_ids = {node["id"] for node in response.json()["nodes"]}
+    assert "CACHED-NEW-NODE" in node_ids
+
+
+def test_draft_graph_sets_etag_and_honours_if_none_match(client):
+    test_client, _ = client
+
+    first = test_client.get("/api/graph/draft")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"graph-')
+
+    revalidated = test_client.get("/api/graph/draft", headers={"If-None-Match": etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+def test_draft_graph_gzip_and_identity_bodies_match(client):
+    test_client, _ = client
+
+    gzipped = test_client.get("/api/graph/draft", headers={"Accept-Encoding": "gzip"})
+    identity = test_client.get(
+        "/api/graph/draft", headers={"Accept-Encoding": "identity"}
+    )
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+    assert gzipped.json() == identity.json()
+
+    stale = test_client.get(
+        "/api/graph/draft", headers={"If-None-Match": '"graph-stale-version"'}
+    )
+    assert stale.status_code == 200
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "gzipped"),
+    [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, identity", False),
+        ("*;q=0.5, gzip;q=0", False),
+        ("identity", False),
+    ],
+)
+def test_draft_graph_honours_accept_encoding_qvalues(client, accept_encoding, gzipped):
+    test_client, _ = client
+
+    response = test_client.get("/api/graph/draft", headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert (response.headers.get("content-encoding") == "gzip") is gzipped
+    assert response.json()["nodes"]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import hashlib
 import json
 from typing import Any
 
+import pytest
 from fastapi.testclient import TestClient
 
 MAX_FILE_SIZE_BYTES = 5 * 1024 * 1024
@@ -94,7 +96,7 @@ def test_homework_submit_rejects_large_file(client: tuple[TestClient, Any]) -> N
     student_token = _register_student(test_client, student_id="student2")
     assignment_id = _create_assignment(test_client, student_ids=["student2"])
 
-    too_large = b"x" * (MAX_FILE_SIZE_BYTES + 1)
+    too_large = b"\xff\xd8\xff" + b"x" * MAX_FILE_SIZE_BYTES
     response = test_client.post(
         f"/api/homework/assignments/{assignment_id}/submit",
         data={
@@ -416,3 +418,214 @@ def test_admin_assignment_due_at_patch_updates_due_date(
     assert detail_response.status_code == 200, detail_response.text
     detail_json = detail_response.json()
     assert detail_json["dueAt"] == "2026-02-08T23:59:59"
+
+
+def test_homework_submit_is_atomic_when_file_record_fails(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+
+    student_token = _register_student(test_client, student_id="student_atomic")
+    assignment_id = _create_assignment(test_client, student_ids=["student_atomic"])
+
+    def _fail(**_kwargs: Any) -> str:
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(api_module, "save_homework_submission_file", _fail)
+
+    with pytest.raises(RuntimeError):
+        test_client.post(
+            f"/api/homework/assignments/{assignment_id}/submit",
+            data={
+                "studentId": "student_atomic",
+                "answersJson": json.dumps({"p1": "답안"}),
+            },
+            files=[("images", ("photo.png", b"\x89PNG\r\n\x1a\n", "image/png"))],
+            headers=_auth_headers(student_token),
+        )
+
+    detail_response = test_client.get(
+        f"/api/homework/assignments/{assignment_id}",
+        params={"studentId": "student_atomic"},
+        headers=_auth_headers(student_token),
+    )
+    assert detail_response.status_code == 200
+    assert detail_response.json()["submission"] is None
+    assert not [p for p in upload_dir.rglob("*") if p.is_file()]
+
+
+def test_homework_submit_streams_upload_and_sniffs_type(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+
+    student_token = _register_student(test_client, student_id="student_stream")
+    admin_token = _login_admin(test_client)
+    assignment_id = _create_assignment(test_client, student_ids=["student_stream"])
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 1024
+
+    response = test_client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={
+            "studentId": "student_stream",
+            "answersJson": json.dumps({"p1": "답안"}),
+        },
+        # The declared type is wrong; the stored type comes from the bytes.
+        files=[("images", ("photo.jpg", png, "image/jpeg"))],
+        headers=_auth_headers(student_token),
+    )
+    assert response.status_code == 200, response.text
+    submission_id = response.json()["submissionId"]
+
+    detail = test_client.get(
+        f"/api/homework/admin/submissions/{submission_id}",
+        headers=_auth_headers(admin_token),
+    ).json()
+    (file_info,) = detail["files"]
+    assert file_info["contentType"] == "image/png"
+    assert file_info["sizeBytes"] == len(png)
+    download = test_client.get(
+        f"/api/homework/admin/submissions/{submission_id}/files/{file_info['id']}",
+        headers=_auth_headers(admin_token),
+    )
+    assert download.content == png
+    stored = [p for p in upload_dir.rglob("*") if p.is_file()]
+    assert [p.name for p in stored] == [f"{hashlib.sha256(png).hexdigest()}.png"]
+
+
+def test_admin_wrong_problems_paginate_and_follow_resubmission(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+
+    student_token = _register_student(test_client, student_id="student_page")
+    admin_token = _login_admin(test_client)
+    problems = [
+        {
+            "id": f"p{i}",
+            "type": "objective",
+            "question": f"{i} + 1 = ?",
+            "options": [str(i), str(i + 1)],
+            "answer": str(i + 1),
+        }
+        for i in range(1, 5)
+    ]
+    create_response = test_client.post(
+        "/api/homework/assignments",
+        json={
+            "title": "페이지 테스트",
+            "targetStudentIds": ["student_page"],
+            "problems": problems,
+        },
+        headers=_auth_headers(admin_token),
+    )
+    assert create_response.status_code == 200, create_response.text
+    assignment_id = create_response.json()["id"]
+
+    def _submit(answers: dict[str, str]) -> str:
+        response = test_client.post(
+            f"/api/homework/assignments/{assignment_id}/submit",
+            data={"studentId": "student_page", "answersJson": json.dumps(answers)},
+            headers=_auth_headers(student_token),
+        )
+        assert response.status_code == 200, response.text
+        return response.json()["submissionId"]
+
+    # All four answers wrong on the first attempt.
+    first_id = _submit({f"p{i}": "모름" for i in range(1, 5)})
+
+    def _wrong(**params: Any) -> list[str]:
+        response = test_client.get(
+            "/api/homework/admin/students/student_page/wrong-problems",
+            params=params,
+            headers=_auth_headers(admin_token),
+        )
+        assert response.status_code == 200, response.text
+        return [item["problemId"] for item in response.json()["wrongProblems"]]
+
+    assert _wrong() == ["p1", "p2", "p3", "p4"]
+    assert _wrong(limit=2, offset=1) == ["p2", "p3"]
+
+    review_response = test_client.post(
+        f"/api/homework/submissions/{first_id}/review",
+        json={
+            "status": "returned",
+            "problemReviews": {"p1": {"needsRevision": True, "comment": "다시"}},
+        },
+        headers=_auth_headers(admin_token),
+    )
+    assert review_response.status_code == 200, review_response.text
+
+    # Resubmission fixes everything but p4; only the latest submission counts.
+    _submit({"p1": "2", "p2": "3", "p3": "4", "p4": "모름"})
+    assert _wrong() == ["p4"]
+
+
+def test_admin_assignment_list_counts_follow_submit_and_review(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+
+    token_a = _register_student(test_client, student_id="student_stats_a")
+    _register_student(test_client, student_id="student_stats_b")
+    assignment_id = _create_assignment(
+        test_client, student_ids=["student_stats_a", "student_stats_b"]
+    )
+    admin_token = _login_admin(test_client)
+
+    def _summary(**params: Any) -> dict[str, Any]:
+        response = test_client.get(
+            "/api/homework/admin/assignments",
+            params=params,
+            headers=_auth_headers(admin_token),
+        )
+        assert response.status_code == 200, response.text
+        return next(
+            item
+            for item in response.json()["assignments"]
+            if item["id"] == assignment_id
+        )
+
+    def _counts(item: dict[str, Any]) -> tuple[int, int, int, int, int]:
+        return (
+            item["totalStudents"],
+            item["submittedCount"],
+            item["pendingCount"],
+            item["approvedCount"],
+            item["returnedCount"],
+        )
+
+    assert _counts(_summary()) == (2, 0, 0, 0, 0)
+
+    submit_response = test_client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={"studentId": "student_stats_a", "answersJson": json.dumps({"p1": "답"})},
+        headers=_auth_headers(token_a),
+    )
+    assert submit_response.status_code == 200, submit_response.text
+    assert _counts(_summary()) == (2, 1, 1, 0, 0)
+
+    review_response = test_client.post(
+        f"/api/homework/submissions/{submit_response.json()['submissionId']}/review",
+        json={"status": "approved", "problemReviews": {}},
+        headers=_auth_headers(admin_token),
+    )
+    assert review_response.status_code == 200, review_response.text
+
+    full = _summary()
+    assert _counts(full) == (2, 1, 0, 1, 0)
+    assert full["problemCount"] == 1
+    assert [p["id"] for p in full["problems"]] == ["p1"]
+
+    lite = _summary(includeProblems="false")
+    assert _counts(lite) == (2, 1, 0, 1, 0)
+    assert lite["problemCount"] == 1
+    assert lite["problems"] is None
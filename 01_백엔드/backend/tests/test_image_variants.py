@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import io
+import json
+from typing import Any
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.image_variants import get_variant, render_variants, variant_path
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _image_bytes(size: tuple[int, int], fmt: str, mode: str = "RGB", **save_args: Any) -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128)[: len(mode)]).save(buffer, fmt, **save_args)
+    return buffer.getvalue()
+
+
+def _submit_photo(test_client: TestClient, data: bytes) -> tuple[str, str, str]:
+    """Submit one photo as a fresh student; returns (admin token, submission id, file id)."""
+    admin_token = test_client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin"}
+    ).json()["accessToken"]
+    student_token = test_client.post(
+        "/api/auth/register",
+        json={
+            "username": "variant_student",
+            "password": "password123",
+            "name": "변형 학생",
+            "grade": "3",
+            "email": "variant_student@example.com",
+        },
+    ).json()["accessToken"]
+    assignment_id = test_client.post(
+        "/api/homework/assignments",
+        json={
+            "title": "사진 숙제",
+            "dueAt": "2099-02-01T23:59:59",
+            "targetStudentIds": ["variant_student"],
+            "problems": [{"id": "p1", "type": "subjective", "question": "풀이를 찍어 올리세요"}],
+        },
+        headers=_auth_headers(admin_token),
+    ).json()["id"]
+    response = test_client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={"studentId": "variant_student", "answersJson": json.dumps({"p1": "사진 참고"})},
+        files=[("images", ("photo.png", data, "image/png"))],
+        headers=_auth_headers(student_token),
+    )
+    assert response.status_code == 200, response.text
+    submission_id = response.json()["submissionId"]
+    detail = test_client.get(
+        f"/api/homework/admin/submissions/{submission_id}",
+        headers=_auth_headers(admin_token),
+    ).json()
+    return admin_token, submission_id, detail["files"][0]["id"]
+
+
+def test_render_variants_downscales_rotates_and_flattens(tmp_path) -> None:
+    # EXIF orientation 6: stored landscape, displayed portrait.
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    jpeg_path = tmp_path / "photo.jpg"
+    jpeg_path.write_bytes(_image_bytes((3000, 2000), "JPEG", exif=exif.tobytes()))
+    png_path = tmp_path / "alpha.png"
+    png_path.write_bytes(_image_bytes((400, 100), "PNG", mode="RGBA"))
+
+    rendered = render_variants(jpeg_path)
+    flattened = render_variants(png_path)
+
+    review = Image.open(io.BytesIO(rendered["review"]))
+    thumb = Image.open(io.BytesIO(rendered["thumb"]))
+    assert review.format == "JPEG" and review.size == (1067, 1600)
+    assert thumb.size == (213, 320)
+    assert 0x0112 not in review.getexif()
+    # Never upscaled; transparency composited onto white.
+    small = Image.open(io.BytesIO(flattened["review"]))
+    assert small.size == (400, 100) and small.mode == "RGB"
+    assert Image.open(io.BytesIO(flattened["thumb"])).size == (320, 80)
+
+
+def test_download_serves_requested_variant(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    original = _image_bytes((2400, 1200), "PNG")
+    admin_token, submission_id, file_id = _submit_photo(test_client, original)
+    url = f"/api/homework/admin/submissions/{submission_id}/files/{file_id}"
+
+    thumb = test_client.get(url, params={"variant": "thumb"}, headers=_auth_headers(admin_token))
+    assert thumb.status_code == 200, thumb.text
+    assert thumb.headers["content-type"] == "image/jpeg"
+    assert "photo-thumb.jpg" in thumb.headers["content-disposition"]
+    assert Image.open(io.BytesIO(thumb.content)).size == (320, 160)
+
+    review = test_client.get(url, params={"variant": "review"}, headers=_auth_headers(admin_token))
+    assert Image.open(io.BytesIO(review.content)).size == (1600, 800)
+
+    assert test_client.get(url, headers=_auth_headers(admin_token)).content == original
+    invalid = test_client.get(url, params={"variant": "huge"}, headers=_auth_headers(admin_token))
+    assert invalid.status_code == 400
+    assert invalid.json()["error"]["code"] == "INVALID_VARIANT"
+
+
+def test_unrenderable_image_falls_back_to_original(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    # Right magic bytes, but not a decodable image.
+    corrupt = b"\x89PNG\r\n\x1a\n" + b"\x00" * 512
+    admin_token, submission_id, file_id = _submit_photo(test_client, corrupt)
+
+    response = test_client.get(
+        f"/api/homework/admin/submissions/{submission_id}/files/{file_id}",
+        params={"variant": "thumb"},
+        headers=_auth_headers(admin_token),
+    )
+    assert response.status_code == 200
+    assert response.content == corrupt
+    assert response.headers["content-type"] == "image/png"
+    # Not cached as the thumbnail: revalidated, with only a weak validator.
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert response.headers["etag"].startswith('W/"')
+    sha256 = next(upload_dir.rglob("*.png")).name.split(".")[0]
+    assert get_variant(upload_dir, sha256, "image/png", "thumb") is None
+    assert not variant_path(upload_dir, sha256, "thumb").exists()
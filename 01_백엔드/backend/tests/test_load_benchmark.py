@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from perf.load import DEFAULT_MIX, drive, parse_mix, percentile
+from perf.synthetic import SyntheticScale, build_synthetic_db
+
+TINY_SCALE = SyntheticScale(
+    students=12,
+    assignments=4,
+    targets_per_assignment=6,
+    problem_batches=2,
+    problems_per_batch=5,
+    labels=3,
+    sessions_per_student=2,
+    responses_per_session=2,
+)
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 99) == 0.0
+
+
+def test_parse_mix_overrides_defaults_and_rejects_unknown() -> None:
+    mix = parse_mix("graph=5,login=0")
+    assert mix["graph"] == 5 and mix["login"] == 0
+    assert mix["submit"] == DEFAULT_MIX["submit"]
+    with pytest.raises(ValueError):
+        parse_mix("teleport=1")
+
+
+def test_benchmark_reports_percentiles_per_endpoint(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from app.main import create_app
+
+    db_path = tmp_path / "bench.db"
+    dataset = build_synthetic_db(db_path, TINY_SCALE)
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    monkeypatch.setenv("JWT_SECRET", "test-secret-please-use-at-least-32-bytes")
+    monkeypatch.setenv("DISABLE_RATE_LIMITS", "1")
+    monkeypatch.setenv("ADMIN_USERNAME", dataset.admin_username)
+    monkeypatch.setenv("ADMIN_PASSWORD", dataset.password)
+    monkeypatch.setenv("ADMIN_AUTH_EMAIL", "perf-admin@example.com")
+
+    report = asyncio.run(
+        drive(
+            create_app(),
+            dataset,
+            requests=30,
+            concurrency=3,
+            mix=parse_mix("login=0"),
+        )
+    )
+
+    assert report["overall"]["count"] > 0
+    assert report["overall"]["errors"] == 0
+    assert "GET /api/graph/published" in report["endpoints"]
+    for result in report["endpoints"].values():
+        assert result["p50Ms"] <= result["p95Ms"] <= result["p99Ms"] <= result["maxMs"]
+        assert result["throughputRps"] > 0
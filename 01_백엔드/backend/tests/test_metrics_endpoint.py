@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import smtplib
+
+import pytest
+
+from app import email_service
+from app.metrics import EMAIL_SEND_RESULTS, Counter, Histogram, MetricsRegistry
+
+
+def _samples(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_exposes_request_db_bcrypt_and_cache_series(client):
+    test_client, db_path = client
+    test_client.post("/api/auth/login", json={"username": "admin", "password": "admin"})
+    test_client.get("/api/health")
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    samples = _samples(text)
+    health = 'method="GET",route="/api/health"'
+    assert samples[f'http_request_duration_seconds_count{{{health}}}'] >= 1
+    assert samples[f'http_request_duration_seconds_bucket{{{health},le="+Inf"}}'] >= 1
+    assert samples["sqlite_query_duration_seconds_count"] >= 1
+    assert samples["sqlite_pool_wait_seconds_count"] >= 1
+    assert samples['bcrypt_duration_seconds_count{operation="verify"}'] >= 1
+    assert f'sqlite_pool_max_size{{path="{db_path}"}}' in samples
+    assert 'graph_snapshot_cache_lookups_total{result="hit"}' in samples
+    assert "graph_adjacency_cache_hit_ratio" in samples
+
+
+def test_metrics_token_is_enforced_when_configured(client, monkeypatch):
+    test_client, _ = client
+    monkeypatch.setenv("METRICS_TOKEN", "scrape-secret")
+
+    assert test_client.get("/metrics").status_code == 401
+    response = test_client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+
+
+def test_email_send_failures_are_counted(monkeypatch):
+    monkeypatch.setenv("SMTP_USER", "user")
+    monkeypatch.setenv("SMTP_PASS", "pass")
+    monkeypatch.setenv("SMTP_FROM", "from@example.com")
+    monkeypatch.setenv("ADMIN_EMAIL", "admin@example.com")
+
+    class FailingSMTP:
+        def __init__(self, *_args, **_kwargs):
+            raise smtplib.SMTPConnectError(421, "unavailable")
+
+    monkeypatch.setattr(email_service.smtplib, "SMTP", FailingSMTP)
+    before = EMAIL_SEND_RESULTS.value(outcome="failed")
+
+    sent = email_service.send_homework_notification("s1", None, "hw", [], {}, [])
+
+    assert sent is False
+    assert EMAIL_SEND_RESULTS.value(outcome="failed") == before + 1
+
+
+def test_text_format_rendering():
+    registry = MetricsRegistry()
+    hist = registry.register(Histogram("op_seconds", "Op time.", ("kind",), buckets=(0.1, 1.0)))
+    total = registry.register(Counter("op_total", 'Ops "done".', ("kind",)))
+    hist.observe(0.05, kind='a"b')
+    hist.observe(5, kind='a"b')
+    total.inc(kind="x")
+
+    assert registry.render().splitlines() == [
+        "# HELP op_seconds Op time.",
+        "# TYPE op_seconds histogram",
+        'op_seconds_bucket{kind="a\\"b",le="0.1"} 1',
+        'op_seconds_bucket{kind="a\\"b",le="1"} 1',
+        'op_seconds_bucket{kind="a\\"b",le="+Inf"} 2',
+        'op_seconds_sum{kind="a\\"b"} 5.05',
+        'op_seconds_count{kind="a\\"b"} 2',
+        '# HELP op_total Ops "done".',
+        "# TYPE op_total counter",
+        'op_total{kind="x"} 1',
+    ]
+    with pytest.raises(ValueError):
+        hist.observe(1.0)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from app import db as db_module
+from app import migrations
+from app.db import connect, init_db
+
+
+def _table_names(db_path: Path) -> set[str]:
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    finally:
+        conn.close()
+    return {row["name"] for row in rows}
+
+
+def test_fresh_database_applies_all_migrations_in_order(tmp_path: Path):
+    db_path = tmp_path / "fresh.db"
+
+    applied = init_db(db_path)
+
+    assert applied == [m.id for m in migrations.MIGRATIONS]
+    assert init_db(db_path) == []
+    conn = connect(db_path)
+    try:
+        recorded = [
+            row["id"]
+            for row in conn.execute("SELECT id FROM schema_migrations ORDER BY id")
+        ]
+    finally:
+        conn.close()
+    assert recorded == sorted(applied)
+
+
+def test_dry_run_reports_pending_without_changes(tmp_path: Path):
+    db_path = tmp_path / "plan.db"
+
+    planned = init_db(db_path, dry_run=True)
+
+    assert planned == [m.id for m in migrations.MIGRATIONS]
+    assert "users" not in _table_names(db_path)
+
+
+def test_legacy_database_without_migration_records_is_upgraded(tmp_path: Path):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE homework_assignments (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            problems_json TEXT NOT NULL,
+            due_at TEXT,
+            created_by TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        INSERT INTO homework_assignments (id, title, problems_json, created_by, created_at)
+        VALUES ('hw-1', 'Legacy', '[]', 'admin', '2024-01-01T00:00:00+00:00');
+        """
+    )
+    conn.close()
+
+    init_db(db_path)
+
+    conn = connect(db_path)
+    try:
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(homework_assignments)")}
+        row = conn.execute(
+            "SELECT sticker_reward_count FROM homework_assignments WHERE id = 'hw-1'"
+        ).fetchone()
+    finally:
+        conn.close()
+    assert {"scheduled_at", "sticker_reward_count"} <= columns
+    assert row["sticker_reward_count"] == 2
+
+
+def test_failed_migration_rolls_back_whole_batch(tmp_path: Path, monkeypatch):
+    db_path = tmp_path / "broken.db"
+
+    def _boom(conn: sqlite3.Connection) -> None:
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("migration failed")
+
+    monkeypatch.setattr(
+        migrations,
+        "MIGRATIONS",
+        migrations.MIGRATIONS + (migrations.Migration("9999_broken", "Broken", _boom),),
+    )
+
+    with pytest.raises(RuntimeError):
+        init_db(db_path)
+
+    tables = _table_names(db_path)
+    assert "half_done" not in tables
+    assert "schema_migrations" not in tables
+    assert "users" not in tables
+
+
+def test_open_caller_transaction_is_not_committed(tmp_path: Path):
+    db_path = tmp_path / "caller.db"
+    conn = connect(db_path)
+    try:
+        conn.execute("CREATE TABLE caller_work (id INTEGER)")
+        conn.execute("INSERT INTO caller_work VALUES (1)")
+        assert conn.in_transaction
+
+        with pytest.raises(RuntimeError, match="no open transaction"):
+            migrations.apply_migrations(conn)
+        conn.rollback()
+        assert migrations.apply_migrations(conn) == [m.id for m in migrations.MIGRATIONS]
+    finally:
+        conn.close()
+    assert "caller_work" in _table_names(db_path)
+    conn = connect(db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM caller_work").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+def test_homework_stats_and_latest_submission_are_backfilled(
+    tmp_path: Path, monkeypatch
+):
+    db_path = tmp_path / "backfill.db"
+    all_migrations = migrations.MIGRATIONS
+    cutoff = [m.id for m in all_migrations].index("0016_homework_assignment_stats")
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations[:cutoff])
+    # Several backfill batches, including a partial last one.
+    monkeypatch.setattr(db_module, "MIGRATION_BATCH_SIZE", 2)
+    init_db(db_path)
+
+    conn = connect(db_path)
+    try:
+        conn.executescript(
+            """
+            INSERT INTO homework_assignments (id, title, problems_json, created_by, created_at)
+            VALUES ('hw-1', 'Old', '[{"id": "p1"}, {"id": "p2"}]', 'admin', '2024-01-01T00:00:00'),
+                   ('hw-2', 'Old', '[]', 'admin', '2024-01-01T00:00:00'),
+                   ('hw-3', 'Old', '[]', 'admin', '2024-01-01T00:00:00'),
+                   ('hw-4', 'Old', '[]', 'admin', '2024-01-01T00:00:00'),
+                   ('hw-5', 'Old', '[]', 'admin', '2024-01-01T00:00:00');
+            INSERT INTO homework_assignment_targets (assignment_id, student_id, assigned_at)
+            VALUES ('hw-1', 's1', '2024-01-01T00:00:00'),
+                   ('hw-1', 's2', '2024-01-01T00:00:00');
+            INSERT INTO homework_submissions
+                (id, assignment_id, student_id, answers_json, submitted_at, review_status)
+            VALUES ('sub-old', 'hw-1', 's1', '{}', '2024-01-02T00:00:00', 'returned'),
+                   ('sub-new', 'hw-1', 's1', '{}', '2024-01-03T00:00:00', 'pending');
+            """
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations)
+    applied = init_db(db_path)
+    assert applied == [m.id for m in all_migrations[cutoff:]]
+
+    conn = connect(db_path)
+    try:
+        stats = conn.execute(
+            "SELECT * FROM homework_assignment_stats WHERE assignment_id = 'hw-1'"
+        ).fetchone()
+        pointers = dict(
+            conn.execute(
+                "SELECT student_id, latest_submission_id FROM homework_assignment_targets"
+            ).fetchall()
+        )
+        stats_count = conn.execute(
+            "SELECT COUNT(*) FROM homework_assignment_stats"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert stats_count == 5
+    assert (
+        stats["problem_count"],
+        stats["total_students"],
+        stats["submitted_count"],
+        stats["pending_count"],
+        stats["returned_count"],
+    ) == (2, 2, 1, 1, 1)
+    assert pointers == {"s1": "sub-new", "s2": None}
+
+
+def test_refresh_tokens_get_families_and_covering_index(tmp_path: Path, monkeypatch):
+    db_path = tmp_path / "families.db"
+    all_migrations = migrations.MIGRATIONS
+    cutoff = [m.id for m in all_migrations].index("0019_refresh_token_families")
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations[:cutoff])
+    init_db(db_path)
+
+    conn = connect(db_path)
+    try:
+        conn.executescript(
+            """
+            INSERT INTO users (id, username, email, name, grade, password_hash, role, status,
+                               created_at, updated_at)
+            VALUES ('u1', 'u1', 'u1@example.com', 'U', '3', 'x', 'student', 'active',
+                    '2024-01-01T00:00:00', '2024-01-01T00:00:00');
+            INSERT INTO refresh_tokens (id, user_id, token_hash, expires_at, created_at)
+            VALUES ('rt-1', 'u1', 'hash-1', '2099-01-01T00:00:00', '2024-01-01T00:00:00');
+            """
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", all_migrations)
+    init_db(db_path)
+
+    conn = connect(db_path)
+    try:
+        family = conn.execute(
+            "SELECT family_id FROM refresh_tokens WHERE id = 'rt-1'"
+        ).fetchone()[0]
+        plan = [
+            row[3]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id, user_id, family_id, replaced_by_id, "
+                "expires_at, revoked_at FROM refresh_tokens WHERE token_hash = ?",
+                ("hash-1",),
+            )
+        ]
+    finally:
+        conn.close()
+    assert family == "rt-1"
+    assert plan == ["SEARCH refresh_tokens USING COVERING INDEX idx_refresh_tokens_lookup (token_hash=?)"]
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import smtplib
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.email_service as email_service
+from app.db import get_notification_outbox_counts, transaction
+from app.notification_outbox import NotificationSender
+
+PHOTO = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture(autouse=True)
+def _no_background_sender(monkeypatch) -> None:
+    # Tests drain the outbox themselves.
+    monkeypatch.setenv("NOTIFICATION_POLL_SECONDS", "0")
+
+
+@pytest.fixture
+def smtp_configured(monkeypatch) -> None:
+    monkeypatch.setenv("SMTP_USER", "user")
+    monkeypatch.setenv("SMTP_PASS", "pass")
+    monkeypatch.setenv("SMTP_FROM", "from@example.com")
+    monkeypatch.setenv("ADMIN_EMAIL", "admin@example.com")
+
+
+class FakeSMTP:
+    connections: list["FakeSMTP"] = []
+    fail_with: list[BaseException] = []
+
+    def __init__(self, *_args: Any, **_kwargs: Any) -> None:
+        self.sent: list[Any] = []
+        FakeSMTP.connections.append(self)
+
+    def starttls(self) -> None:
+        pass
+
+    def login(self, *_args: Any) -> None:
+        pass
+
+    def send_message(self, msg: Any) -> None:
+        if FakeSMTP.fail_with:
+            raise FakeSMTP.fail_with.pop(0)
+        self.sent.append(msg)
+
+    def quit(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch) -> type[FakeSMTP]:
+    FakeSMTP.connections = []
+    FakeSMTP.fail_with = []
+    monkeypatch.setattr(email_service.smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+def _auth_headers(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _submit_many(test_client: TestClient, count: int) -> list[str]:
+    """Have ``count`` fresh students submit one photo each; returns submission ids."""
+    admin_token = test_client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin"}
+    ).json()["accessToken"]
+    students = [f"outbox_student{i}" for i in range(count)]
+    tokens = [
+        test_client.post(
+            "/api/auth/register",
+            json={
+                "username": student,
+                "password": "password123",
+                "name": "알림 학생",
+                "grade": "3",
+                "email": f"{student}@example.com",
+            },
+        ).json()["accessToken"]
+        for student in students
+    ]
+    assignment_id = test_client.post(
+        "/api/homework/assignments",
+        json={
+            "title": "알림 숙제",
+            "dueAt": "2099-02-01T23:59:59",
+            "targetStudentIds": students,
+            "problems": [{"id": "p1", "type": "subjective", "question": "풀이를 올리세요"}],
+        },
+        headers=_auth_headers(admin_token),
+    ).json()["id"]
+    submission_ids = []
+    for student, token in zip(students, tokens):
+        response = test_client.post(
+            f"/api/homework/assignments/{assignment_id}/submit",
+            data={"studentId": student, "answersJson": json.dumps({"p1": "사진 참고"})},
+            files=[("images", ("photo.png", PHOTO, "image/png"))],
+            headers=_auth_headers(token),
+        )
+        assert response.status_code == 200, response.text
+        submission_ids.append(response.json()["submissionId"])
+    return submission_ids
+
+
+def _outbox_rows(db_path) -> list[sqlite3.Row]:
+    with transaction(db_path) as conn:
+        return conn.execute(
+            "SELECT * FROM notification_outbox ORDER BY created_at"
+        ).fetchall()
+
+
+def test_submission_enqueues_notification(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, db_path = client
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", tmp_path / "uploads")
+    (submission_id,) = _submit_many(test_client, 1)
+
+    (row,) = _outbox_rows(db_path)
+    assert row["kind"] == "homework_submitted"
+    assert json.loads(row["payload_json"]) == {"submissionId": submission_id}
+    assert row["status"] == "pending" and row["attempts"] == 0
+
+
+def test_sender_reuses_one_connection_for_a_batch(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, smtp_configured, fake_smtp
+) -> None:
+    import app.api as api_module
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    _submit_many(test_client, 3)
+
+    counts = NotificationSender(db_path, upload_dir, batch_size=2).drain_once()
+
+    assert counts == {"sent": 3, "retried": 0, "failed": 0, "skipped": 0, "lost": 0}
+    assert len(fake_smtp.connections) == 1
+    sent = fake_smtp.connections[0].sent
+    assert len(sent) == 3
+    assert all("알림 숙제" in msg["Subject"] for msg in sent)
+    assert all(msg.get_payload()[1].get_filename() for msg in sent)
+    assert get_notification_outbox_counts(db_path) == {"sent": 3}
+    # Nothing left to send.
+    assert NotificationSender(db_path, upload_dir).drain_once()["sent"] == 0
+
+
+def test_failed_send_is_retried_later_and_outage_releases_batch(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, smtp_configured, fake_smtp
+) -> None:
+    import app.api as api_module
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    _submit_many(test_client, 3)
+    sender = NotificationSender(db_path, upload_dir)
+
+    # A rejected message is retried later; the rest of the batch still goes out.
+    fake_smtp.fail_with = [smtplib.SMTPDataError(554, "rejected")]
+    assert sender.drain_once() == {"sent": 2, "retried": 1, "failed": 0, "skipped": 0, "lost": 0}
+    (retried,) = [row for row in _outbox_rows(db_path) if row["status"] == "pending"]
+    assert retried["attempts"] == 1
+    assert "SMTPDataError" in retried["last_error"]
+    assert datetime.fromisoformat(retried["next_attempt_at"]) > datetime.now(timezone.utc)
+
+    # Not due yet, so the next drain leaves it alone.
+    assert sender.drain_once()["retried"] == 0
+
+    with transaction(db_path) as conn:
+        conn.execute(
+            "UPDATE notification_outbox SET status = 'pending', next_attempt_at = ?",
+            (datetime.now(timezone.utc).isoformat(),),
+        )
+    # The server going away stops the batch and hands the rest back untried.
+    fake_smtp.fail_with = [smtplib.SMTPConnectError(421, "unavailable")]
+    assert sender.drain_once()["retried"] == 1
+    rows = _outbox_rows(db_path)
+    assert [row["status"] for row in rows] == ["pending"] * 3
+    assert sorted(row["attempts"] for row in rows) == [1, 1, 2]
+
+
+def test_notifications_are_skipped_without_smtp(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, fake_smtp
+) -> None:
+    import app.api as api_module
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    monkeypatch.delenv("SMTP_USER", raising=False)
+    _submit_many(test_client, 2)
+
+    counts = NotificationSender(db_path, upload_dir).drain_once()
+
+    assert counts["skipped"] == 2
+    assert fake_smtp.connections == []
+    assert get_notification_outbox_counts(db_path) == {"skipped": 2}
+
+
+def test_malformed_and_poison_notifications_end_up_failed(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, smtp_configured, fake_smtp
+) -> None:
+    import app.api as api_module
+    import app.notification_outbox as outbox_module
+    from app.db import enqueue_notification
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    _submit_many(test_client, 1)
+    with transaction(db_path) as conn:
+        malformed = enqueue_notification(conn, "homework_submitted", {})
+        # A row a sender died on every time: still leased, lease expired.
+        poison = enqueue_notification(conn, "homework_submitted", {"submissionId": "x"})
+        conn.execute(
+            "UPDATE notification_outbox SET status = 'sending', attempts = ?, "
+            "locked_until = '2000-01-01T00:00:00+00:00' WHERE id = ?",
+            (outbox_module.MAX_ATTEMPTS, poison),
+        )
+
+    counts = NotificationSender(db_path, upload_dir).drain_once()
+
+    assert counts == {"sent": 1, "retried": 0, "failed": 1, "skipped": 0, "lost": 0}
+    rows = {row["id"]: row for row in _outbox_rows(db_path)}
+    assert rows[malformed]["status"] == "failed"
+    assert "KeyError" in rows[malformed]["last_error"]
+    assert rows[poison]["status"] == "failed"
+    assert rows[poison]["attempts"] == outbox_module.MAX_ATTEMPTS
+
+
+def test_unexpected_error_releases_rest_of_batch(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, smtp_configured, fake_smtp
+) -> None:
+    import app.api as api_module
+    import app.notification_outbox as outbox_module
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    _submit_many(test_client, 3)
+
+    def _locked(*_args: Any, **_kwargs: Any) -> None:
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(outbox_module, "finish_notification", _locked)
+    with pytest.raises(sqlite3.OperationalError):
+        NotificationSender(db_path, upload_dir).drain_once()
+
+    rows = _outbox_rows(db_path)
+    # The row in flight keeps its lease; the untried ones are free again.
+    assert sorted((row["status"], row["attempts"]) for row in rows) == [
+        ("pending", 0),
+        ("pending", 0),
+        ("sending", 1),
+    ]
+
+
+def test_row_reclaimed_after_lease_expiry_is_not_sent_twice(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path, smtp_configured, fake_smtp
+) -> None:
+    import app.api as api_module
+    import app.notification_outbox as outbox_module
+    from app.db import claim_notifications
+
+    test_client, db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    _submit_many(test_client, 2)
+    sender = NotificationSender(db_path, upload_dir)
+    original_build = sender._build_message
+    taken_over: list[str] = []
+
+    def _slow_build(notification: dict[str, Any]) -> Any:
+        # Building the first email outlives the batch's lease and a second
+        # sender claims the other row meanwhile.
+        if not taken_over:
+            with transaction(db_path) as conn:
+                conn.execute(
+                    "UPDATE notification_outbox SET locked_until = '2000-01-01T00:00:00+00:00'"
+                    " WHERE id != ?",
+                    (notification["id"],),
+                )
+            taken_over.extend(
+                row["id"]
+                for row in claim_notifications(
+                    limit=10,
+                    lease_seconds=outbox_module.LEASE_SECONDS,
+                    max_attempts=outbox_module.MAX_ATTEMPTS,
+                    path=db_path,
+                )
+            )
+        return original_build(notification)
+
+    monkeypatch.setattr(sender, "_build_message", _slow_build)
+
+    counts = sender.drain_once()
+
+    assert counts == {"sent": 1, "retried": 0, "failed": 0, "skipped": 0, "lost": 1}
+    assert len(fake_smtp.connections[0].sent) == 1
+    (other,) = taken_over
+    rows = {row["id"]: row for row in _outbox_rows(db_path)}
+    # Still leased to the second sender, which will send it once.
+    assert rows[other]["status"] == "sending"
+    assert rows[other]["attempts"] == 2
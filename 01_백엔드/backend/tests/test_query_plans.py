@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.db import connect, trace_statements
+from perf.query_plans import HOT_QUERIES, collect_query_plans, find_regressions, full_scans
+from perf.synthetic import SMALL_SCALE, build_synthetic_db
+
+
+@pytest.fixture(scope="module")
+def plan_report(tmp_path_factory: pytest.TempPathFactory) -> dict:
+    db_path = tmp_path_factory.mktemp("query-plans") / "perf.db"
+    dataset = build_synthetic_db(db_path, SMALL_SCALE)
+    return collect_query_plans(dataset, repeat=1)
+
+
+def test_hot_queries_do_not_scan_full_tables(plan_report: dict) -> None:
+    offenders = {
+        name: result["unexpectedFullScans"]
+        for name, result in plan_report["queries"].items()
+        if result["unexpectedFullScans"]
+    }
+    assert offenders == {}
+
+
+def test_every_hot_query_is_traced(plan_report: dict) -> None:
+    assert set(plan_report["queries"]) == {query.name for query in HOT_QUERIES}
+    for name, result in plan_report["queries"].items():
+        assert result["statements"] >= 1, name
+
+
+def test_full_scan_detection() -> None:
+    assert full_scans(["SCAN hp", "SEARCH hl USING INDEX idx (key=?)"]) == ["hp"]
+    assert full_scans(["SCAN t USING COVERING INDEX i"]) == ["t"]
+    assert full_scans(["MATERIALIZE w", "SCAN w", "SCAN json_each VIRTUAL TABLE INDEX 1:"]) == []
+
+
+def test_regressions_flag_scans_and_slow_queries() -> None:
+    report = {
+        "queries": {
+            "fast": {"unexpectedFullScans": [], "medianMs": 0.5},
+            "slow": {"unexpectedFullScans": [], "medianMs": 30.0},
+            "scan": {"unexpectedFullScans": ["hp"], "medianMs": 1.0},
+        }
+    }
+    baseline = {"queries": {"fast": {"medianMs": 0.1}, "slow": {"medianMs": 10.0}}}
+
+    problems = find_regressions(report, baseline)
+
+    assert problems == [
+        "slow: median 30.00 ms exceeds 20.00 ms (2.0x baseline 10.00 ms)",
+        "scan: full scan of hp",
+    ]
+
+
+def test_trace_statements_inlines_bound_values(tmp_path: Path) -> None:
+    conn = connect(tmp_path / "trace.db")
+    try:
+        with trace_statements() as statements:
+            conn.execute("SELECT ? + 1", (41,)).fetchone()
+        conn.execute("SELECT 2").fetchone()
+    finally:
+        conn.close()
+    assert statements == ["SELECT 41 + 1"]
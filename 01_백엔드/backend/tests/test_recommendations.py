@@ -150,11 +150,17 @@ def _seed_session(conn, user_id: str, node_id: str, *, cleared: bool) -> None:
         "INSERT INTO study_sessions (id, user_id, node_id, status, grading_json, created_at, updated_at) VALUES (?,?,?,?,?,?,?)",
         (sid, user_id, node_id, "SUBMITTED", json.dumps(grading), now, now),
     )
-    # Insert one response so the JOIN in _compute_recommendations returns a row
+    # Insert one response so the session counts as an attempt
     conn.execute(
         "INSERT INTO study_responses (id, session_id, problem_id, input_raw, is_correct, created_at) VALUES (?,?,?,?,?,?)",
         (str(uuid.uuid4()), sid, "p1", "42", 1 if cleared else 0, now),
     )
+    # Mirror what upsert_study_session does for SUBMITTED sessions
+    from app.db import record_study_submission
+    record_study_submission(
+        conn, user_id=user_id, node_id=node_id, submitted_at=now,
+        response_count=1, wrong_count=0 if cleared else 1, cleared=cleared,
+    )
     conn.commit()
 
 
@@ -202,3 +208,117 @@ def test_prepares_for_recommends_next_node_after_clear():
     assert "CS.INTRO" not in node_ids  # cleared node excluded
     assert "CS.NEXT" in node_ids
     assert "이전 단원을 마쳤어요" in reasons["CS.NEXT"]
+
+
+def test_requires_skill_recommends_node_when_all_skills_ready():
+    """A node whose required skills are all at level >= 1 is recommended."""
+    import os
+    from datetime import datetime, timezone
+    conn, path = _make_db()
+
+    now = datetime.now(timezone.utc).isoformat()
+    gv_id = "gv-rs"
+    conn.execute(
+        "INSERT INTO graph_versions (id, graph_id, status, schema_version, created_at) VALUES (?,?,?,?,?)",
+        (gv_id, "g1", "published", 1, now),
+    )
+    conn.executemany(
+        "INSERT INTO edges (graph_version_id, id, edge_type, source, target) VALUES (?,?,?,?,?)",
+        [
+            (gv_id, "e1", "requires_skill", "AS.ADD", "CS.READY"),
+            (gv_id, "e2", "requires_skill", "AS.SUB", "CS.READY"),
+            (gv_id, "e3", "requires_skill", "AS.MUL", "CS.NOT_READY"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO student_skill_levels (user_id, skill_id, level, updated_at) VALUES (?,?,?,?)",
+        [("u3", "AS.ADD", 1, now), ("u3", "AS.SUB", 2, now)],
+    )
+    conn.commit()
+
+    from app.api import _compute_recommendations
+    result = _compute_recommendations("u3", None, conn)
+    conn.close()
+    os.unlink(path)
+
+    node_ids = [r["nodeId"] for r in result]
+    assert node_ids == ["CS.READY"]
+
+
+def test_graph_adjacency_is_reused_for_same_version():
+    """The adjacency index is built once per published graph version."""
+    import os
+    from datetime import datetime, timezone
+    from app.graph_adjacency import get_published_graph_adjacency
+    conn, path = _make_db()
+
+    now = datetime.now(timezone.utc).isoformat()
+    conn.execute(
+        "INSERT INTO graph_versions (id, graph_id, status, schema_version, created_at) VALUES (?,?,?,?,?)",
+        ("gv-a", "g1", "published", 1, now),
+    )
+    conn.execute(
+        "INSERT INTO edges (graph_version_id, id, edge_type, source, target) VALUES (?,?,?,?,?)",
+        ("gv-a", "e1", "prepares_for", "CS.A", "CS.B"),
+    )
+    conn.commit()
+
+    first = get_published_graph_adjacency(conn)
+    second = get_published_graph_adjacency(conn)
+    assert first is second
+    assert first.prepares_for == {"CS.A": ("CS.B",)}
+
+    conn.execute(
+        "INSERT INTO graph_versions (id, graph_id, status, schema_version, created_at) VALUES (?,?,?,?,?)",
+        ("gv-b", "g1", "published", 1, "9999-01-01T00:00:00+00:00"),
+    )
+    conn.commit()
+    third = get_published_graph_adjacency(conn)
+    conn.close()
+    os.unlink(path)
+
+    assert third.graph_version_id == "gv-b"
+    assert third.prepares_for == {}
+
+
+def test_uncleared_wrong_session_is_recommended_with_wrong_count():
+    """A submitted session with wrong answers surfaces its node."""
+    import os
+    conn, path = _make_db()
+    _seed_session(conn, "u4", "NODE-W", cleared=False)
+    _seed_session(conn, "u4", "NODE-W", cleared=False)
+    from app.api import _compute_recommendations
+    result = _compute_recommendations("u4", None, conn)
+    conn.close()
+    os.unlink(path)
+    assert [r["nodeId"] for r in result] == ["NODE-W"]
+    assert result[0]["reason"] == "최근 2번 틀렸어요"
+
+
+def test_node_stats_backfilled_from_existing_history():
+    """Sessions recorded before the aggregates existed are backfilled."""
+    import os, uuid, json
+    from datetime import datetime, timezone
+    from app.db import create_study_node_stats_tables
+    conn, path = _make_db()
+    conn.execute("DROP TABLE study_node_stats")
+    conn.execute("DROP TABLE study_node_wrong_events")
+    now = datetime.now(timezone.utc).isoformat()
+    sid = str(uuid.uuid4())
+    conn.execute(
+        "INSERT INTO study_sessions (id, user_id, node_id, status, grading_json, created_at, updated_at) VALUES (?,?,?,?,?,?,?)",
+        (sid, "u5", "NODE-H", "SUBMITTED", json.dumps({"cleared": False}), now, now),
+    )
+    conn.execute(
+        "INSERT INTO study_responses (id, session_id, problem_id, input_raw, is_correct, created_at) VALUES (?,?,?,?,?,?)",
+        (str(uuid.uuid4()), sid, "p1", "1", 0, now),
+    )
+    create_study_node_stats_tables(conn)
+    conn.commit()
+
+    from app.api import _compute_recommendations
+    result = _compute_recommendations("u5", None, conn)
+    conn.close()
+    os.unlink(path)
+    assert [r["nodeId"] for r in result] == ["NODE-H"]
+    assert result[0]["reason"] == "최근 1번 틀렸어요"
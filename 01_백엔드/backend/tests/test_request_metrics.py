@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import logging
+
+from app.db import StatementStats
+from app.request_metrics import (
+    LATENCY_BUCKETS_MS,
+    UNMATCHED_ROUTE,
+    RequestMetricsRegistry,
+    get_request_metrics,
+)
+
+
+def _admin_headers(test_client) -> dict:
+    login = test_client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin"}
+    )
+    return {"Authorization": f"Bearer {login.json()['accessToken']}"}
+
+
+def test_responses_carry_server_timing(client):
+    test_client, _ = client
+    headers = _admin_headers(test_client)
+
+    response = test_client.get("/api/auth/me", headers=headers)
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    assert "db;dur=" in timing
+    assert 'queries"' in timing
+
+
+def test_admin_metrics_aggregate_by_route_template(client, caplog):
+    test_client, db_path = client
+    get_request_metrics().reset()
+    headers = _admin_headers(test_client)
+
+    with caplog.at_level(logging.INFO, logger="app.request_metrics"):
+        test_client.get("/api/homework/admin/assignments/missing", headers=headers)
+        test_client.get("/api/homework/admin/assignments/also-missing", headers=headers)
+        test_client.get("/api/no-such-route")
+
+    assert test_client.get("/api/admin/metrics").status_code == 401
+    response = test_client.get("/api/admin/metrics", headers=headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    routes = {(r["method"], r["route"]): r for r in body["routes"]}
+    detail = routes[("GET", "/api/homework/admin/assignments/{assignment_id}")]
+    assert detail["count"] == 2
+    assert detail["sqlStatements"] >= 2
+    assert detail["latencyBucketsMs"]["+Inf"] == 2
+    assert routes[("GET", UNMATCHED_ROUTE)]["count"] == 1
+    assert "total" in body["startupTimingsMs"]
+    assert any(pool["path"] == str(db_path) for pool in body["connectionPools"])
+    assert {"hits", "misses"} <= set(body["graphCache"])
+
+    lines = [json.loads(r.getMessage()) for r in caplog.records if r.name == "app.request_metrics"]
+    logged = [line for line in lines if line["route"] == detail["route"]]
+    assert [line["path"] for line in logged] == [
+        "/api/homework/admin/assignments/missing",
+        "/api/homework/admin/assignments/also-missing",
+    ]
+    assert all(line["sqlStatements"] >= 1 for line in logged)
+
+
+def test_registry_histogram_is_cumulative():
+    registry = RequestMetricsRegistry()
+    stats = StatementStats()
+    registry.observe("GET", "/x", 200, 3.0, stats)
+    registry.observe("GET", "/x", 503, 70.0, stats)
+    registry.observe("GET", "/x", 200, LATENCY_BUCKETS_MS[-1] + 1, stats)
+
+    (route,) = registry.snapshot()["routes"]
+
+    assert route["count"] == 3
+    assert route["serverErrors"] == 1
+    buckets = route["latencyBucketsMs"]
+    assert buckets["5"] == 1
+    assert buckets["50"] == 1
+    assert buckets["100"] == 2
+    assert buckets[str(LATENCY_BUCKETS_MS[-1])] == 2
+    assert buckets["+Inf"] == 3
@@ -189,3 +189,64 @@ def test_seed_loader_rejects_duplicate_edges(tmp_path: Path):
 
     with pytest.raises(ValueError, match="Duplicate edge id"):
         seed_db(db_path, seed_path=seed_path)
+
+
+def test_seed_loader_reports_stats(tmp_path: Path):
+    db_path = tmp_path / "test.db"
+    seed_path = tmp_path / "seed.json"
+    init_db(db_path)
+
+    payload = {
+        "schemaVersion": 1,
+        "graphId": "test",
+        "draft": {
+            "nodes": [
+                {"id": "node-1", "label": "Node 1"},
+                {"id": "node-2", "label": "Node 2"},
+            ],
+            "edges": [
+                {"id": "edge-1", "edgeType": "prereq", "source": "node-1", "target": "node-2"},
+            ],
+        },
+        "problems": [
+            {"problemId": "p-1", "nodeId": "node-1", "order": 1, "prompt": "1+1"},
+        ],
+    }
+    seed_path.write_text(json.dumps(payload), encoding="utf-8")
+
+    stats = seed_db(db_path, seed_path=seed_path)
+
+    assert stats is not None
+    assert (stats["graphVersions"], stats["nodes"], stats["edges"], stats["problems"]) == (
+        1,
+        2,
+        1,
+        1,
+    )
+    assert stats["totalSeconds"] >= stats["insertSeconds"] >= 0
+    assert seed_db(db_path, seed_path=seed_path) is None
+
+
+def test_seed_loader_rejects_duplicate_problems_before_writing(tmp_path: Path):
+    db_path = tmp_path / "test.db"
+    seed_path = tmp_path / "seed.json"
+    init_db(db_path)
+
+    payload = {
+        "schemaVersion": 1,
+        "graphId": "test",
+        "draft": {"nodes": [{"id": "node-1", "label": "Node 1"}], "edges": []},
+        "problems": [
+            {"problemId": "p-1", "nodeId": "node-1", "order": 1, "prompt": "a"},
+            {"problemId": "p-1", "nodeId": "node-1", "order": 2, "prompt": "b"},
+        ],
+    }
+    seed_path.write_text(json.dumps(payload), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Duplicate problem id"):
+        seed_db(db_path, seed_path=seed_path)
+
+    conn = connect(db_path)
+    count = conn.execute("SELECT COUNT(*) AS count FROM graph_versions").fetchone()["count"]
+    conn.close()
+    assert count == 0
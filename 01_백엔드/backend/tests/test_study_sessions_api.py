@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+
+def _register_student(client: TestClient, *, student_id: str) -> dict[str, str]:
+    response = client.post(
+        "/api/auth/register",
+        json={
+            "username": student_id,
+            "password": "password123",
+            "name": f"{student_id} 이름",
+            "grade": "3",
+            "email": f"{student_id}@example.com",
+        },
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['accessToken']}"}
+
+
+def _submit_session(client: TestClient, headers: dict[str, str], node_id: str) -> str:
+    response = client.post(
+        "/api/study-sessions",
+        json={
+            "nodeId": node_id,
+            "status": "SUBMITTED",
+            "responses": [
+                {
+                    "problemId": f"{node_id}-p1",
+                    "inputRaw": "42",
+                    "isCorrect": True,
+                    "scratchpadStrokesJson": "[[1,2],[3,4]]",
+                },
+                {"problemId": f"{node_id}-p2", "inputRaw": "7", "isCorrect": False},
+            ],
+        },
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["sessionId"]
+
+
+def test_list_study_sessions_returns_all_with_responses(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+    headers = _register_student(test_client, student_id="study_all")
+    first = _submit_session(test_client, headers, "n1")
+    second = _submit_session(test_client, headers, "n2")
+
+    response = test_client.get("/api/study-sessions", headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [s["id"] for s in data["sessions"]] == [second, first]
+    assert data["nextCursor"] is None
+    responses = data["sessions"][0]["responses"]
+    assert [r["problemId"] for r in responses] == ["n2-p1", "n2-p2"]
+    assert responses[0]["scratchpadStrokesJson"] == "[[1,2],[3,4]]"
+
+
+def test_list_study_sessions_paginates_with_cursor(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+    headers = _register_student(test_client, student_id="study_page")
+    ids = [_submit_session(test_client, headers, f"n{i}") for i in range(5)]
+
+    seen: list[str] = []
+    cursor = None
+    pages = 0
+    while True:
+        params: dict[str, Any] = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = test_client.get(
+            "/api/study-sessions", params=params, headers=headers
+        ).json()
+        seen.extend(s["id"] for s in data["sessions"])
+        pages += 1
+        cursor = data["nextCursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == list(reversed(ids))
+
+
+def test_list_study_sessions_since_and_without_scratchpad(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+    headers = _register_student(test_client, student_id="study_since")
+    _submit_session(test_client, headers, "old")
+    full = test_client.get("/api/study-sessions", headers=headers).json()
+    since = full["sessions"][0]["updatedAt"]
+    newer = _submit_session(test_client, headers, "new")
+
+    data = test_client.get(
+        "/api/study-sessions",
+        params={"since": since, "includeScratchpad": "false"},
+        headers=headers,
+    ).json()
+
+    assert [s["id"] for s in data["sessions"]] == [newer]
+    assert all(
+        "scratchpadStrokesJson" not in r for r in data["sessions"][0]["responses"]
+    )
+
+
+def test_list_study_sessions_rejects_invalid_cursor(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+    headers = _register_student(test_client, student_id="study_cursor")
+
+    response = test_client.get(
+        "/api/study-sessions", params={"cursor": "not-a-cursor"}, headers=headers
+    )
+
+    assert response.status_code == 400
+    assert response.json()["error"]["code"] == "INVALID_CURSOR"
+
+
+def test_submitted_session_feeds_recommendations(
+    client: tuple[TestClient, Any],
+) -> None:
+    test_client, _db_path = client
+    headers = _register_student(test_client, student_id="study_reco")
+    _submit_session(test_client, headers, "n-wrong")
+
+    response = test_client.get("/api/recommendations", headers=headers)
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0]["nodeId"] == "n-wrong"
+    assert items[0]["reason"] == "최근 1번 틀렸어요"
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import zipfile
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+PHOTOS = [
+    ("풀이1.png", b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40),
+    ("풀이2.jpg", b"\xff\xd8\xff\xe0" + bytes(reversed(range(256))) * 30),
+]
+
+
+def _auth_headers(token: str, **extra: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}", **extra}
+
+
+def _submit(test_client: TestClient) -> tuple[str, str, list[dict[str, Any]]]:
+    """Submit PHOTOS as a fresh student; returns (admin token, submission id, files)."""
+    admin_token = test_client.post(
+        "/api/auth/login", json={"username": "admin", "password": "admin"}
+    ).json()["accessToken"]
+    student_token = test_client.post(
+        "/api/auth/register",
+        json={
+            "username": "download_student",
+            "password": "password123",
+            "name": "다운로드 학생",
+            "grade": "3",
+            "email": "download_student@example.com",
+        },
+    ).json()["accessToken"]
+    assignment_id = test_client.post(
+        "/api/homework/assignments",
+        json={
+            "title": "사진 숙제",
+            "dueAt": "2099-02-01T23:59:59",
+            "targetStudentIds": ["download_student"],
+            "problems": [{"id": "p1", "type": "subjective", "question": "풀이를 찍어 올리세요"}],
+        },
+        headers=_auth_headers(admin_token),
+    ).json()["id"]
+    response = test_client.post(
+        f"/api/homework/assignments/{assignment_id}/submit",
+        data={"studentId": "download_student", "answersJson": json.dumps({"p1": "사진 참고"})},
+        files=[("images", (name, data, "application/octet-stream")) for name, data in PHOTOS],
+        headers=_auth_headers(student_token),
+    )
+    assert response.status_code == 200, response.text
+    submission_id = response.json()["submissionId"]
+    detail = test_client.get(
+        f"/api/homework/admin/submissions/{submission_id}",
+        headers=_auth_headers(admin_token),
+    ).json()
+    return admin_token, submission_id, detail["files"]
+
+
+def test_download_supports_conditional_and_range_requests(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", tmp_path / "uploads")
+    admin_token, submission_id, files = _submit(test_client)
+    png = PHOTOS[0][1]
+    file_info = next(f for f in files if f["originalName"] == PHOTOS[0][0])
+    url = f"/api/homework/admin/submissions/{submission_id}/files/{file_info['id']}"
+
+    full = test_client.get(url, headers=_auth_headers(admin_token))
+    assert full.status_code == 200
+    assert full.content == png
+    etag = full.headers["etag"]
+    assert etag == f'"{hashlib.sha256(png).hexdigest()}"'
+    assert "immutable" in full.headers["cache-control"]
+    assert full.headers["accept-ranges"] == "bytes"
+    assert "filename*=utf-8''" in full.headers["content-disposition"]
+
+    cached = test_client.get(url, headers=_auth_headers(admin_token, **{"If-None-Match": etag}))
+    assert cached.status_code == 304
+    assert cached.content == b""
+    since = test_client.get(
+        url,
+        headers=_auth_headers(admin_token, **{"If-Modified-Since": full.headers["last-modified"]}),
+    )
+    assert since.status_code == 304
+
+    partial = test_client.get(url, headers=_auth_headers(admin_token, Range="bytes=8-15"))
+    assert partial.status_code == 206
+    assert partial.content == png[8:16]
+    assert partial.headers["content-range"] == f"bytes 8-15/{len(png)}"
+
+    suffix = test_client.get(url, headers=_auth_headers(admin_token, Range="bytes=-4"))
+    assert suffix.status_code == 206 and suffix.content == png[-4:]
+
+    stale = test_client.get(
+        url, headers=_auth_headers(admin_token, Range="bytes=0-3", **{"If-Range": '"other"'})
+    )
+    assert stale.status_code == 200 and stale.content == png
+
+    unsatisfiable = test_client.get(
+        url, headers=_auth_headers(admin_token, Range=f"bytes={len(png)}-")
+    )
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(png)}"
+
+
+def test_submission_files_stream_as_zip(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", tmp_path / "uploads")
+    admin_token, submission_id, _files = _submit(test_client)
+    url = f"/api/homework/admin/submissions/{submission_id}/files.zip"
+
+    response = test_client.get(url, headers=_auth_headers(admin_token))
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        contents = {name.split("_", 1)[1]: archive.read(name) for name in archive.namelist()}
+    assert contents == dict(PHOTOS)
+
+    # Same files, same bytes; the ETag lets the browser skip the download.
+    again = test_client.get(url, headers=_auth_headers(admin_token))
+    assert again.content == response.content
+    cached = test_client.get(
+        url, headers=_auth_headers(admin_token, **{"If-None-Match": response.headers["etag"]})
+    )
+    assert cached.status_code == 304
+
+    missing = test_client.get(
+        "/api/homework/admin/submissions/nope/files.zip", headers=_auth_headers(admin_token)
+    )
+    assert missing.status_code == 404
+    assert missing.json()["error"]["code"] == "SUBMISSION_NOT_FOUND"
+
+
+def test_zip_with_fallbacks_or_missing_files_is_not_cached(
+    client: tuple[TestClient, Any], monkeypatch, tmp_path
+) -> None:
+    import app.api as api_module
+
+    test_client, _db_path = client
+    upload_dir = tmp_path / "uploads"
+    monkeypatch.setattr(api_module, "UPLOAD_BASE_DIR", upload_dir)
+    admin_token, submission_id, _files = _submit(test_client)
+    url = f"/api/homework/admin/submissions/{submission_id}/files.zip"
+
+    # PHOTOS are not decodable, so "thumb" falls back to the originals.
+    thumbs = test_client.get(url, params={"variant": "thumb"}, headers=_auth_headers(admin_token))
+    assert thumbs.status_code == 200
+    assert "etag" not in thumbs.headers
+    assert thumbs.headers["cache-control"] == "private, no-cache"
+
+    original = test_client.get(url, headers=_auth_headers(admin_token))
+    assert "immutable" in original.headers["cache-control"]
+    next(upload_dir.rglob("*.png")).unlink()
+    partial = test_client.get(url, headers=_auth_headers(admin_token))
+    assert partial.status_code == 200
+    assert "etag" not in partial.headers
+    assert partial.headers["cache-control"] == "private, no-cache"
+    with zipfile.ZipFile(io.BytesIO(partial.content)) as archive:
+        assert len(archive.namelist()) == len(PHOTOS) - 1
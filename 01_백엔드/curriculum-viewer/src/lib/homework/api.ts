@@ -230,7 +230,9 @@ export async function reviewSubmission(
 export async function listAssignmentsAdmin(
   signal?: AbortSignal
 ): Promise<AdminAssignmentSummary[]> {
-  const response = await authFetch(`${API_BASE}/homework/admin/assignments`, { signal })
+  const response = await authFetch(`${API_BASE}/homework/admin/assignments?includeProblems=false`, {
+    signal
+  })
 
   const json = await response.json()
 
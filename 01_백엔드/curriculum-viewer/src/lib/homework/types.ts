@@ -184,7 +184,8 @@ export type AdminAssignmentSummary = {
   id: string
   title: string
   description?: string | null
-  problems: AdminHomeworkProblem[]
+  problems?: AdminHomeworkProblem[] | null
+  problemCount?: number
   dueAt?: string | null
   scheduledAt?: string | null
   stickerRewardCount?: number
@@ -1107,7 +1107,7 @@ export default function AuthorHomeworkStatusPage() {
                 <p className="admin-assignment-desc">{renderMathText(assignment.description)}</p>
               )}
               <div className="admin-assignment-meta">
-                <span className="muted">문제: {assignment.problems.length}개</span>
+                <span className="muted">문제: {assignment.problemCount ?? assignment.problems?.length ?? 0}개</span>
                 <span className="muted">출제일: {formatDate(assignment.createdAt)}</span>
                 {assignment.scheduledAt && (
                   <span className="muted">예약: {formatDateTime(assignment.scheduledAt)}</span>
@@ -12,7 +12,11 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from backend.app.db import connect, get_database_path
+from backend.app.db import (
+    connect,
+    get_database_path,
+    refresh_homework_assignment_stats,
+)
 from backend.app.homework_grading import is_objective_answer_correct
 
 
@@ -132,6 +136,7 @@ def main() -> None:
 
         total = len(rows)
         updated = 0
+        touched_assignments: set[str] = set()
 
         for row in rows:
             problems = _load_json_list(row["problems_json"])
@@ -168,8 +173,12 @@ def main() -> None:
                 """,
                 (next_status, _now_iso(), "system_regrade_objective", row["id"]),
             )
+            touched_assignments.add(row["assignment_id"])
 
         if not args.dry_run:
+            # The admin list reads status counts from homework_assignment_stats.
+            for assignment_id in sorted(touched_assignments):
+                refresh_homework_assignment_stats(conn, assignment_id)
             conn.commit()
 
         mode = "dry-run" if args.dry_run else "apply"